@@ -0,0 +1,189 @@
+from sqlalchemy import func, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+from .models import StudentAppData
+from .schemas import (
+    StudentAppDataCreate,
+    StudentAppDataKey,
+    StudentAppDataPatch,
+    StudentAppDataResponse
+)
+
+# Columns returned to clients for every app data write
+RESPONSE_COLUMNS = (
+    StudentAppData.app_key,
+    StudentAppData.data_key,
+    StudentAppData.data_value,
+    StudentAppData.created_at,
+    StudentAppData.updated_at
+)
+
+# Matches unique(student_id, app_key, data_key) on student_app_data
+CONFLICT_COLUMNS = [StudentAppData.student_id, StudentAppData.app_key, StudentAppData.data_key]
+
+
+def to_response(row) -> StudentAppDataResponse:
+    """Build a response from a RETURNING row or StudentAppData instance"""
+    return StudentAppDataResponse(
+        app_key=row.app_key,
+        data_key=row.data_key,
+        data_value=row.data_value,
+        created_at=row.created_at,
+        updated_at=row.updated_at
+    )
+
+
+def _upsert_stmt(rows: List[Dict[str, Any]]):
+    stmt = pg_insert(StudentAppData).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=CONFLICT_COLUMNS,
+        set_={"data_value": stmt.excluded.data_value, "updated_at": func.now()}
+    ).returning(*RESPONSE_COLUMNS)
+
+
+async def upsert_app_data(
+    db: AsyncSession,
+    student_id,
+    app_key: str,
+    data_key: str,
+    data_value: Dict[str, Any]
+) -> StudentAppDataResponse:
+    """Insert or replace one app data value in a single INSERT ... ON CONFLICT statement"""
+    row = (await db.execute(_upsert_stmt([{
+        "student_id": student_id,
+        "app_key": app_key,
+        "data_key": data_key,
+        "data_value": data_value
+    }]))).one()
+    await db.commit()
+    return to_response(row)
+
+
+async def upsert_app_data_batch(
+    db: AsyncSession,
+    student_id,
+    items: List[StudentAppDataCreate]
+) -> List[StudentAppDataResponse]:
+    """Insert or replace many app data values in one statement and one transaction"""
+    # A single ON CONFLICT statement cannot touch the same row twice, so the
+    # last value for a repeated (app_key, data_key) wins
+    rows = {}
+    for item in items:
+        rows[(item.app_key, item.data_key)] = {
+            "student_id": student_id,
+            "app_key": item.app_key,
+            "data_key": item.data_key,
+            "data_value": item.data_value
+        }
+
+    result = await db.execute(_upsert_stmt(list(rows.values())))
+    saved = {(row.app_key, row.data_key): to_response(row) for row in result}
+    await db.commit()
+    return [saved[key] for key in rows]
+
+
+async def get_app_data_batch(
+    db: AsyncSession,
+    student_id,
+    keys: List[StudentAppDataKey]
+) -> List[StudentAppDataResponse]:
+    """Fetch an explicit list of (app_key, data_key) pairs in one query; missing keys are omitted"""
+    result = await db.execute(
+        select(*RESPONSE_COLUMNS).where(
+            StudentAppData.student_id == student_id,
+            tuple_(StudentAppData.app_key, StudentAppData.data_key).in_(
+                [(key.app_key, key.data_key) for key in keys]
+            )
+        )
+    )
+    found = {(row.app_key, row.data_key): to_response(row) for row in result}
+    # Preserve request order and drop duplicates
+    return [found[pair] for pair in dict.fromkeys((key.app_key, key.data_key) for key in keys) if pair in found]
+
+
+async def replace_app_data(
+    db: AsyncSession,
+    student_id,
+    app_key: str,
+    data_key: str,
+    data_value: Dict[str, Any]
+) -> Optional[StudentAppDataResponse]:
+    """Replace an existing app data value; returns None if the key does not exist"""
+    row = (await db.execute(
+        update(StudentAppData).where(
+            StudentAppData.student_id == student_id,
+            StudentAppData.app_key == app_key,
+            StudentAppData.data_key == data_key
+        ).values(
+            data_value=data_value,
+            updated_at=func.now()
+        ).returning(*RESPONSE_COLUMNS).execution_options(synchronize_session=False)
+    )).one_or_none()
+
+    if row is None:
+        return None
+
+    await db.commit()
+    return to_response(row)
+
+
+def patch_expression(patch: StudentAppDataPatch, target=StudentAppData.data_value):
+    """Build a SQL expression applying a merge patch and path operations to target"""
+    expr = target
+
+    if patch.merge is not None:
+        expr = func.jsonb_merge_patch(expr, literal(patch.merge, JSONB), type_=JSONB)
+
+    if patch.operations:
+        # Operations run inside Postgres (jsonb_apply_operations), so counters and
+        # appends are evaluated against the current row under its row lock
+        operations = [
+            {
+                "op": operation.op,
+                "path": [str(part) for part in operation.path],
+                "value": operation.value,
+                "limit": operation.limit
+            }
+            for operation in patch.operations
+        ]
+        expr = func.jsonb_apply_operations(expr, literal(operations, JSONB), type_=JSONB)
+
+    return expr
+
+
+async def patch_app_data(
+    db: AsyncSession,
+    student_id,
+    app_key: str,
+    data_key: str,
+    patch: StudentAppDataPatch
+) -> Optional[StudentAppDataResponse]:
+    """Apply a partial update inside Postgres; returns None if the key does not exist and upsert is off"""
+    if patch.upsert:
+        stmt = pg_insert(StudentAppData).values(
+            student_id=student_id,
+            app_key=app_key,
+            data_key=data_key,
+            data_value=patch_expression(patch, target=literal({}, JSONB))
+        ).on_conflict_do_update(
+            index_elements=CONFLICT_COLUMNS,
+            set_={"data_value": patch_expression(patch), "updated_at": func.now()}
+        ).returning(*RESPONSE_COLUMNS)
+    else:
+        stmt = update(StudentAppData).where(
+            StudentAppData.student_id == student_id,
+            StudentAppData.app_key == app_key,
+            StudentAppData.data_key == data_key
+        ).values(
+            data_value=patch_expression(patch),
+            updated_at=func.now()
+        ).returning(*RESPONSE_COLUMNS).execution_options(synchronize_session=False)
+
+    row = (await db.execute(stmt)).one_or_none()
+
+    if row is None:
+        return None
+
+    await db.commit()
+    return to_response(row)
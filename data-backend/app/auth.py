@@ -1,13 +1,20 @@
-from fastapi import HTTPException, Depends, Request
+from fastapi import HTTPException, Depends, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from supabase import create_client, Client
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 from typing import Optional
+from .cache import SharedCache
+from .metrics import observe_auth
 from .database import get_db
 from .models import Student, Teacher
-from sqlalchemy.orm import Session
+from . import schemas
+from sqlalchemy import select, or_, case, event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 load_dotenv()
 
@@ -16,11 +23,67 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 
+# Verified token cache configuration
+JWT_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", "10000"))
+JWT_CACHE_TTL_SECONDS = float(os.getenv("JWT_CACHE_TTL_SECONDS", "300"))
+
+# Student identity cache configuration
+STUDENT_CACHE_MAX_SIZE = int(os.getenv("STUDENT_CACHE_MAX_SIZE", "10000"))
+STUDENT_CACHE_TTL_SECONDS = float(os.getenv("STUDENT_CACHE_TTL_SECONDS", "300"))
+
+# Teacher app-data workspaces (synthetic "Teacher Account" student rows)
+TEACHER_WORKSPACE_SCHOOL_ID = os.getenv("TEACHER_WORKSPACE_SCHOOL_ID", "00000000-0000-4000-8000-000000000001")
+TEACHER_WORKSPACE_CACHE_TTL_SECONDS = float(os.getenv("TEACHER_WORKSPACE_CACHE_TTL_SECONDS", "3600"))
+
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
 security = HTTPBearer()
+# Event streams also accept ?access_token=, since browser EventSource cannot set headers
+optional_security = HTTPBearer(auto_error=False)
+
+def _dump_student(student: Student) -> str:
+    return schemas.Student.model_validate(student).model_dump_json()
+
+
+def _load_student(raw: str) -> Student:
+    return Student(**schemas.Student.model_validate_json(raw).model_dump())
+
+
+# Verified payloads keyed by raw token; entries never outlive the token's exp.
+# Kept per worker: an HS256 check is cheaper than a round trip to a shared
+# cache, and raw bearer tokens should not be copied into one
+token_cache = SharedCache("jwt", max_size=JWT_CACHE_MAX_SIZE, ttl=JWT_CACHE_TTL_SECONDS, shared=False)
+
+# Resolved (detached) Student rows keyed by token sub
+student_cache = SharedCache(
+    "student",
+    max_size=STUDENT_CACHE_MAX_SIZE,
+    ttl=STUDENT_CACHE_TTL_SECONDS,
+    dumps=_dump_student,
+    loads=_load_student
+)
+
+# Teacher sub -> id of the student row that owns the teacher's app data
+teacher_workspace_cache = SharedCache(
+    "teacher-workspace",
+    max_size=STUDENT_CACHE_MAX_SIZE,
+    ttl=TEACHER_WORKSPACE_CACHE_TTL_SECONDS,
+    dumps=str,
+    loads=uuid.UUID
+)
+
 
+@event.listens_for(Student, "after_insert")
+@event.listens_for(Student, "after_update")
+@event.listens_for(Student, "after_delete")
+def invalidate_student_identity(mapper, connection, target):
+    """Drop cached identities that point at a student row written through the ORM"""
+    if target.supabase_user_id is not None:
+        student_cache.invalidate(str(target.supabase_user_id))
+    student_cache.invalidate_where(lambda student: student.id == target.id)
+    teacher_workspace_cache.invalidate_where(lambda student_id: student_id == target.id)
 
-def verify_token(token: str) -> dict:
+
+async def verify_token(token: str) -> dict:
     """Verify JWT token and return payload"""
     if not JWT_SECRET_KEY:
         raise HTTPException(
@@ -28,6 +91,12 @@ def verify_token(token: str) -> dict:
             detail="JWT secret not configured"
         )
     
+    started = time.perf_counter()
+    payload = await token_cache.get(token)
+    if payload is not None:
+        observe_auth(started, "cached")
+        return payload
+    
     try:
         payload = jwt.decode(
             token, 
@@ -35,8 +104,13 @@ def verify_token(token: str) -> dict:
             algorithms=["HS256"],
             options={"verify_signature": True, "verify_exp": True, "verify_aud": False}
         )
+        exp = payload.get("exp")
+        ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+        await token_cache.set(token, payload, ttl=ttl)
+        observe_auth(started, "verified")
         return payload
     except JWTError as e:
+        observe_auth(started, "rejected")
         # Log the specific error for debugging
         print(f"JWT verification error: {str(e)}")
         raise HTTPException(
@@ -45,21 +119,47 @@ def verify_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+def _is_uuid(value) -> bool:
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+async def get_token_payload(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> dict:
-    """Get current authenticated user"""
-    token = credentials.credentials
-    payload = verify_token(token)
+    """Verify the bearer token (resolved once per request via FastAPI's dependency cache)"""
+    payload = await verify_token(credentials.credentials)
     
-    user_id = payload.get("sub")
-    if not user_id:
+    if not payload.get("sub"):
         raise HTTPException(
             status_code=401,
             detail="Invalid token payload"
         )
     
+    return payload
+
+
+async def get_stream_token_payload(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = Query(None, description="Token for clients that cannot send headers (EventSource)")
+) -> dict:
+    """Like get_token_payload, but the token may also come from the access_token query parameter"""
+    if credentials is None and not access_token:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated"
+        )
+    
+    return await get_token_payload(credentials or HTTPAuthorizationCredentials(scheme="Bearer", credentials=access_token))
+
+
+async def get_current_user(
+    payload: dict = Depends(get_token_payload)
+) -> dict:
+    """Get current authenticated user"""
     # Extract role from user_metadata or app_metadata
     user_metadata = payload.get("user_metadata", {})
     app_metadata = payload.get("app_metadata", {})
@@ -67,49 +167,65 @@ async def get_current_user(
     role = user_metadata.get("role") or app_metadata.get("role") or "student"
     
     return {
-        "user_id": user_id,
+        "user_id": payload["sub"],
         "email": payload.get("email"),
         "role": role
     }
 
 
-async def get_current_student(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Student:
-    """Get current student from database using user metadata or direct assignment"""
-    token = credentials.credentials
-    payload = verify_token(token)
-    
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid token payload")
+async def get_stream_user(
+    payload: dict = Depends(get_stream_token_payload)
+) -> dict:
+    """get_current_user for event stream endpoints"""
+    return await get_current_user(payload)
+
+
+async def get_current_teacher(
+    current_user: dict = Depends(get_current_user)
+) -> dict:
+    """Get current user, requiring the teacher role"""
+    if current_user["role"] != "teacher":
+        raise HTTPException(
+            status_code=403,
+            detail=f"Access denied. User role is '{current_user['role']}', expected 'teacher'"
+        )
     
-    # First try direct supabase_user_id match
-    student = db.query(Student).filter(
-        Student.supabase_user_id == user_id
-    ).first()
+    return current_user
+
+
+async def resolve_student(payload: dict, db: AsyncSession) -> Student:
+    """Resolve the Student for a verified token payload, using the identity cache"""
+    user_id = payload["sub"]
     
-    if student:
+    student = await student_cache.get(user_id)
+    if student is not None:
         return student
     
-    # Check if user has student assignment in metadata
     user_metadata = payload.get("user_metadata", {})
     app_metadata = payload.get("app_metadata", {})
-    
-    # Try student_id from metadata
     student_id = user_metadata.get("student_id") or app_metadata.get("student_id")
-    if student_id:
-        student = db.query(Student).filter(Student.id == student_id).first()
-        if student:
-            return student
-    
-    # Try username from metadata
     username = user_metadata.get("username") or app_metadata.get("username")
+    
+    # Match on supabase_user_id, then metadata student_id, then metadata username,
+    # in a single query ordered by that precedence
+    conditions = [Student.supabase_user_id == user_id]
+    precedence = [(Student.supabase_user_id == user_id, 0)]
+    if student_id and _is_uuid(student_id):
+        conditions.append(Student.id == student_id)
+        precedence.append((Student.id == student_id, 1))
     if username:
-        student = db.query(Student).filter(Student.username == username).first()
-        if student:
-            return student
+        conditions.append(Student.username == username)
+        precedence.append((Student.username == username, 2))
+    
+    student = await db.scalar(
+        select(Student).where(or_(*conditions)).order_by(
+            case(*precedence, else_=3)
+        ).limit(1)
+    )
+    
+    if student:
+        await student_cache.set(user_id, student)
+        return student
     
     # Try role-based assignment
     role = user_metadata.get("role") or app_metadata.get("role")
@@ -125,24 +241,83 @@ async def get_current_student(
     )
 
 
+async def get_current_student(
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_db)
+) -> Student:
+    """Get current student from database using user metadata or direct assignment"""
+    return await resolve_student(payload, db)
+
+
+async def resolve_teacher_workspace(current_user: dict, db: AsyncSession, create: bool = False) -> Optional[uuid.UUID]:
+    """Get the id of the student row that stores a teacher's app data
+
+    Returns None if the teacher has none yet, unless create is set (write
+    routes), in which case it is created on first use.
+    """
+    user_id = current_user["user_id"]
+    email = current_user["email"]
+    
+    workspace_id = await teacher_workspace_cache.get(user_id)
+    if workspace_id is not None:
+        return workspace_id
+    
+    # Match on supabase_user_id, then on email (how workspaces were found
+    # before they were keyed by user, so older rows are still picked up)
+    conditions = [Student.supabase_user_id == user_id]
+    precedence = [(Student.supabase_user_id == user_id, 0)]
+    if email:
+        conditions.append(Student.email == email)
+        precedence.append((Student.email == email, 1))
+    lookup = select(Student.id).where(or_(*conditions)).order_by(case(*precedence, else_=2)).limit(1)
+    
+    workspace_id = await db.scalar(lookup)
+    
+    if workspace_id is None:
+        if not create:
+            return None
+        # Create a special student record for this teacher; ON CONFLICT keeps
+        # concurrent first requests from racing on the unique supabase_user_id
+        workspace_id = await db.scalar(
+            pg_insert(Student).values(
+                school_id=TEACHER_WORKSPACE_SCHOOL_ID,
+                supabase_user_id=user_id,
+                email=email,
+                first_name="Teacher",
+                last_name="Account",
+                student_number=f"TEACHER-{user_id[:8]}",
+                grade_level=99  # Special grade level for teachers
+            ).on_conflict_do_nothing(
+                index_elements=[Student.supabase_user_id]
+            ).returning(Student.id)
+        )
+        await db.commit()
+        if workspace_id is None:
+            workspace_id = await db.scalar(lookup)
+    
+    await teacher_workspace_cache.set(user_id, workspace_id)
+    return workspace_id
+
+
 def require_student_access():
     """Dependency to ensure user is a student"""
     return get_current_student
 
 
-async def get_current_student_or_teacher(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> dict:
-    """Get current user (student or teacher) - teachers can access student data"""
-    current_user = await get_current_user(credentials, db)
-    
+async def _student_or_teacher(current_user: dict, payload: dict, db: AsyncSession, create_workspace: bool) -> dict:
     if current_user["role"] == "teacher":
-        # Teachers can access any student data, return teacher info
-        return current_user
+        # Teachers can access any student data, return teacher info along
+        # with the workspace that holds their own app data (None until created)
+        workspace_id = await resolve_teacher_workspace(current_user, db, create=create_workspace)
+        return {
+            "user_id": current_user["user_id"],
+            "email": current_user["email"],
+            "role": current_user["role"],
+            "workspace_id": workspace_id
+        }
     elif current_user["role"] == "student":
         # For students, get their student record
-        student = await get_current_student(credentials, db)
+        student = await resolve_student(payload, db)
         return {
             "user_id": current_user["user_id"],
             "email": current_user["email"],
@@ -156,6 +331,27 @@ async def get_current_student_or_teacher(
         )
 
 
+async def get_current_student_or_teacher(
+    current_user: dict = Depends(get_current_user),
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_db)
+) -> dict:
+    """Get current user (student or teacher) - teachers can access student data
+
+    Read-only: a teacher without an app-data workspace gets workspace_id None.
+    """
+    return await _student_or_teacher(current_user, payload, db, create_workspace=False)
+
+
+async def get_current_student_or_teacher_for_write(
+    current_user: dict = Depends(get_current_user),
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_db)
+) -> dict:
+    """Like get_current_student_or_teacher, creating the teacher's workspace on first use"""
+    return await _student_or_teacher(current_user, payload, db, create_workspace=True)
+
+
 def require_admin_access():
     """Dependency to ensure user has admin privileges (future implementation)"""
     # For now, just return current user - expand later for admin roles
@@ -0,0 +1,420 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+from dotenv import load_dotenv
+from redis import asyncio as redis_asyncio
+import asyncio
+import json
+import os
+import time
+import uuid
+
+load_dotenv()
+
+# Shared cache backend: "memory" (per-worker only) or "redis"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "edu-cache")
+
+# Identifies this worker on the invalidation channel
+WORKER_ID = uuid.uuid4().hex
+
+
+class TTLCache:
+    """Bounded in-memory cache with per-entry expiry and LRU eviction"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; ttl defaults to the cache-wide ttl"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches predicate; returns the number dropped"""
+        with self._lock:
+            keys = [key for key, (value, _) in self._entries.items() if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class MemoryBackend:
+    """Default backend: each worker only has its local tier and nothing is shared"""
+
+    name = "memory"
+    shared = False
+    listening = False
+
+    async def start(self, on_message: Callable[[dict], None], on_resubscribe: Callable[[], None]) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def get(self, key: str) -> Optional[str]:
+        return None
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def delete_prefix(self, prefix: str) -> None:
+        pass
+
+    async def publish(self, message: dict) -> None:
+        pass
+
+
+class RedisBackend:
+    """Shared tier in any Redis-protocol server, with pub/sub invalidation between workers"""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, client, key_prefix: str = CACHE_KEY_PREFIX):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.channel = f"{key_prefix}:invalidate"
+        self.listening = False
+        self._listener: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_url(cls, url: str, key_prefix: str = CACHE_KEY_PREFIX) -> "RedisBackend":
+        # Short timeouts: a slow cache must never be slower than the database
+        return cls(
+            redis_asyncio.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25, decode_responses=True),
+            key_prefix=key_prefix
+        )
+
+    async def start(self, on_message: Callable[[dict], None], on_resubscribe: Callable[[], None]) -> None:
+        self._listener = asyncio.create_task(self._listen(on_message, on_resubscribe))
+
+    async def _listen(self, on_message: Callable[[dict], None], on_resubscribe: Callable[[], None]) -> None:
+        """Stay subscribed to the invalidation channel, resubscribing with backoff"""
+        delay = 1.0
+        resubscribing = False
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self.listening = True
+                if resubscribing:
+                    # Invalidations published while unsubscribed were missed
+                    on_resubscribe()
+                delay = 1.0
+
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        on_message(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Redis down or connection dropped: keep serving, entries are still TTL bound
+                print(f"Cache invalidation listener error: {str(e)}")
+            finally:
+                self.listening = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+            resubscribing = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        await self.client.aclose()
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(self._key(key))
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self.client.set(self._key(key), value, px=max(int(ttl * 1000), 1))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self._key(key))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        keys = [key async for key in self.client.scan_iter(match=f"{self._key(prefix)}*", count=500)]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def publish(self, message: dict) -> None:
+        await self.client.publish(self.channel, json.dumps(message))
+
+
+def create_backend():
+    if CACHE_BACKEND == "redis":
+        return RedisBackend.from_url(REDIS_URL)
+    if CACHE_BACKEND != "memory":
+        raise ValueError(f"Unknown CACHE_BACKEND '{CACHE_BACKEND}' (expected 'memory' or 'redis')")
+    return MemoryBackend()
+
+
+backend = create_backend()
+
+# Every SharedCache by namespace, for routing invalidation messages
+_caches: Dict[str, "SharedCache"] = {}
+
+# Loop running the app; backend calls from other threads are handed to it
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_pending = set()
+
+# After a backend error, reads and writes skip the shared tier for a while
+# instead of paying a timeout on every request
+CACHE_BACKEND_RETRY_SECONDS = float(os.getenv("CACHE_BACKEND_RETRY_SECONDS", "5"))
+_backend_retry_at = 0.0
+
+
+def _spawn(coro) -> None:
+    """Run backend I/O for a synchronous caller (ORM events) without blocking it"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is not None:
+        task = loop.create_task(coro)
+        _pending.add(task)
+        task.add_done_callback(_pending.discard)
+    elif _loop is not None and _loop.is_running():
+        asyncio.run_coroutine_threadsafe(coro, _loop)
+    else:
+        coro.close()
+
+
+async def _guarded(coro, action: str):
+    """Await a backend call; cache failures degrade to a miss instead of failing the request"""
+    global _backend_retry_at
+    try:
+        return await coro
+    except Exception as e:
+        print(f"Cache backend {action} error: {str(e)}")
+        _backend_retry_at = time.monotonic() + CACHE_BACKEND_RETRY_SECONDS
+        return None
+
+
+class SharedCache:
+    """Two-tier cache: a local TTLCache per worker in front of the shared backend
+
+    Values cross the backend as strings (dumps/loads), so only JSON-safe data
+    goes there. Invalidations drop the local entry, the shared entry and,
+    through an invalidation message, the entry in every other worker.
+    shared=False keeps a cache in the local tier only (for values that are
+    cheaper to recompute than a network round trip).
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size: int = 1024,
+        ttl: float = 300.0,
+        dumps: Callable[[Any], str] = json.dumps,
+        loads: Callable[[str], Any] = json.loads,
+        shared: bool = True
+    ):
+        self.namespace = namespace
+        self.local = TTLCache(max_size=max_size, ttl=ttl)
+        self.dumps = dumps
+        self.loads = loads
+        self.shared = shared
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.invalidations_received = 0
+        _caches[namespace] = self
+
+    @property
+    def _backend_shared(self) -> bool:
+        return self.shared and backend.shared
+
+    def _shared_key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value from the local tier, then the shared tier; None on a miss"""
+        value = self.local.get(key)
+        if value is not None or not self._backend_shared or time.monotonic() < _backend_retry_at:
+            return value
+
+        raw = await _guarded(backend.get(self._shared_key(key)), "get")
+        if raw is None:
+            self.shared_misses += 1
+            return None
+
+        self.shared_hits += 1
+        value = self.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value in both tiers; ttl defaults to (and is capped at) the cache-wide ttl"""
+        self.local.set(key, value, ttl=ttl)
+        ttl = self.local.ttl if ttl is None else min(ttl, self.local.ttl)
+        if self._backend_shared and ttl > 0 and time.monotonic() >= _backend_retry_at:
+            await _guarded(backend.set(self._shared_key(key), self.dumps(value), ttl), "set")
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a key everywhere (safe to call from synchronous code such as ORM events)"""
+        self.local.invalidate(key)
+        if self._backend_shared:
+            _spawn(self._invalidate_shared(key))
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop matching local entries; other workers and the shared tier drop the whole namespace
+
+        Predicates cannot be sent to other workers, so they clear everything
+        in this namespace. Use it for rare writes only.
+        """
+        dropped = self.local.invalidate_where(predicate)
+        if self._backend_shared:
+            _spawn(self._invalidate_shared(None))
+        return dropped
+
+    def clear(self) -> None:
+        self.local.clear()
+        if self._backend_shared:
+            _spawn(self._invalidate_shared(None))
+
+    async def _invalidate_shared(self, key: Optional[Hashable]) -> None:
+        if key is None:
+            await _guarded(backend.delete_prefix(f"{self.namespace}:"), "delete")
+        else:
+            await _guarded(backend.delete(self._shared_key(key)), "delete")
+        await _guarded(backend.publish({
+            "origin": WORKER_ID,
+            "namespace": self.namespace,
+            "key": None if key is None else str(key)
+        }), "publish")
+
+    def _apply_invalidation(self, key: Optional[str]) -> None:
+        self.invalidations_received += 1
+        if key is None:
+            self.local.clear()
+        else:
+            # Keys travel as strings; local keys may be UUIDs
+            self.local.invalidate(key)
+            try:
+                self.local.invalidate(uuid.UUID(key))
+            except ValueError:
+                pass
+
+    def stats(self) -> dict:
+        """Local tier counters plus shared tier hits/misses"""
+        return {
+            **self.local.stats(),
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "invalidations_received": self.invalidations_received
+        }
+
+
+def _on_invalidation(message: dict) -> None:
+    """Apply an invalidation published by another worker"""
+    if message.get("origin") == WORKER_ID:
+        return
+    cache = _caches.get(message.get("namespace"))
+    if cache is not None:
+        cache._apply_invalidation(message.get("key"))
+
+
+def _on_resubscribe() -> None:
+    """Drop every local tier after missing invalidations (listener reconnected)"""
+    for cache in _caches.values():
+        if cache._backend_shared:
+            cache.local.clear()
+
+
+async def start_cache() -> None:
+    """Listen for invalidations (call on app startup)
+
+    The listener connects in the background and keeps retrying, so the app
+    starts (serving from the local tier) even while the backend is down.
+    """
+    global _loop
+    _loop = asyncio.get_running_loop()
+    await backend.start(_on_invalidation, _on_resubscribe)
+
+
+async def flush_pending() -> None:
+    """Wait for invalidations spawned on this loop (for scripts that exit right after writing)"""
+    while _pending:
+        await asyncio.gather(*list(_pending), return_exceptions=True)
+
+
+async def stop_cache() -> None:
+    """Stop listening and close backend connections (call on app shutdown)"""
+    await _guarded(backend.close(), "close")
+
+
+def cache_stats() -> dict:
+    """Per-namespace counters for every SharedCache"""
+    return {
+        "backend": backend.name,
+        "listening": backend.listening,
+        "caches": {namespace: cache.stats() for namespace, cache in _caches.items()}
+    }
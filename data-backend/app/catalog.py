@@ -0,0 +1,141 @@
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from pydantic import TypeAdapter
+from dotenv import load_dotenv
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+import os
+from .cache import SharedCache
+from .models import Class, ClassCatalogVersion, Teacher, Assignment
+from . import schemas
+
+load_dotenv()
+
+# Catalog cache configuration (entries are per class)
+CATALOG_CACHE_MAX_SIZE = int(os.getenv("CATALOG_CACHE_MAX_SIZE", "10000"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+
+# Entries are (version, value) pairs. Versions live in class_catalog_versions,
+# bumped by triggers on every write to a class, its teacher or its assignments;
+# callers pass the versions they just read (one primary key lookup per class),
+# so writes that bypass the ORM listeners (roster sync, migrations, Supabase
+# clients) are picked up on the next request instead of after the TTL
+_class_entry = TypeAdapter(Tuple[int, schemas.ClassWithTeacher])
+_assignments_entry = TypeAdapter(Tuple[int, Tuple[schemas.AssignmentWithClass, ...]])
+
+# class_id -> (version, ClassWithTeacher), shared by every student enrolled in the class
+class_cache = SharedCache(
+    "class",
+    max_size=CATALOG_CACHE_MAX_SIZE,
+    ttl=CATALOG_CACHE_TTL_SECONDS,
+    dumps=lambda entry: _class_entry.dump_json(entry).decode(),
+    loads=_class_entry.validate_json
+)
+
+# class_id -> (version, tuple of AssignmentWithClass) (empty tuple if the class has none)
+assignment_cache = SharedCache(
+    "class-assignments",
+    max_size=CATALOG_CACHE_MAX_SIZE,
+    ttl=CATALOG_CACHE_TTL_SECONDS,
+    dumps=lambda entry: _assignments_entry.dump_json(entry).decode(),
+    loads=_assignments_entry.validate_json
+)
+
+
+@event.listens_for(Class, "after_insert")
+@event.listens_for(Class, "after_update")
+@event.listens_for(Class, "after_delete")
+def invalidate_class(mapper, connection, target):
+    """Drop a class and its assignments (which embed the class) when it is written through the ORM"""
+    class_cache.invalidate(target.id)
+    assignment_cache.invalidate(target.id)
+
+
+@event.listens_for(Teacher, "after_update")
+@event.listens_for(Teacher, "after_delete")
+def invalidate_teacher(mapper, connection, target):
+    """Drop cached classes that embed a teacher written through the ORM"""
+    class_cache.invalidate_where(lambda entry: entry[1].teacher_id == target.id)
+
+
+@event.listens_for(Assignment, "after_insert")
+@event.listens_for(Assignment, "after_update")
+@event.listens_for(Assignment, "after_delete")
+def invalidate_assignment(mapper, connection, target):
+    """Drop the assignment list of the class an assignment belongs (or belonged) to"""
+    assignment_cache.invalidate(target.class_id)
+    assignment_cache.invalidate_where(
+        lambda entry: any(assignment.id == target.id for assignment in entry[1])
+    )
+
+
+async def load_classes(db: AsyncSession, class_ids: Iterable) -> Dict:
+    """Load {class_id: ClassWithTeacher} in one query, refreshing their cache entries"""
+    classes = {}
+    result = await db.execute(
+        select(Class, ClassCatalogVersion.class_version).options(joinedload(Class.teacher)).outerjoin(
+            ClassCatalogVersion, ClassCatalogVersion.class_id == Class.id
+        ).where(Class.id.in_(list(class_ids)))
+    )
+    for row, version in result:
+        class_ = schemas.ClassWithTeacher.model_validate(row)
+        if version is not None:
+            await class_cache.set(row.id, (version, class_))
+        classes[row.id] = class_
+    return classes
+
+
+def _current(cached, version: Optional[int]) -> bool:
+    return cached is not None and version is not None and cached[0] == version
+
+
+async def get_classes(db: AsyncSession, versions: Mapping) -> Dict:
+    """Return {class_id: ClassWithTeacher} for {class_id: class_version}, loading stale entries and misses in one query"""
+    classes = {}
+    missing = []
+    for class_id, version in versions.items():
+        cached = await class_cache.get(class_id)
+        if not _current(cached, version):
+            missing.append(class_id)
+        else:
+            classes[class_id] = cached[1]
+
+    if missing:
+        classes.update(await load_classes(db, missing))
+
+    return classes
+
+
+async def get_class_assignments(db: AsyncSession, versions: Mapping) -> List[schemas.AssignmentWithClass]:
+    """Return the assignments of every class in {class_id: assignments_version}, loading stale entries and misses in one query"""
+    assignments = []
+    missing = []
+    for class_id, version in versions.items():
+        cached = await assignment_cache.get(class_id)
+        if not _current(cached, version):
+            missing.append(class_id)
+        else:
+            assignments.extend(cached[1])
+
+    if missing:
+        # Versions are read in the same statement as the assignments, so a
+        # write landing in between cannot pair new rows with an old version
+        loaded = {class_id: [] for class_id in missing}
+        loaded_versions = {}
+        result = await db.execute(
+            select(ClassCatalogVersion.class_id, ClassCatalogVersion.assignments_version, Assignment).outerjoin(
+                Assignment, Assignment.class_id == ClassCatalogVersion.class_id
+            ).options(joinedload(Assignment.class_)).where(ClassCatalogVersion.class_id.in_(missing))
+        )
+        for class_id, version, row in result:
+            loaded_versions[class_id] = version
+            if row is not None:
+                loaded[class_id].append(schemas.AssignmentWithClass.model_validate(row))
+
+        for class_id, rows in loaded.items():
+            class_assignments = tuple(rows)
+            if class_id in loaded_versions:
+                await assignment_cache.set(class_id, (loaded_versions[class_id], class_assignments))
+            assignments.extend(class_assignments)
+
+    return assignments
@@ -0,0 +1,172 @@
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+from datetime import datetime, timedelta
+import os
+import uuid
+from .app_data import RESPONSE_COLUMNS, to_response
+from .models import Assignment, DeletedRecord, Enrollment, StudentAppData, Submission
+from .pagination import cursor_datetime, cursor_uuid, decode_cursor, encode_cursor
+from .schemas import ChangeFeed
+
+load_dotenv()
+
+# Rows changed less than this many seconds ago are held back until the next
+# poll. updated_at is the writing transaction's start time, so a row can
+# become visible after rows with later timestamps; the delay gives slow
+# transactions time to commit before the feed moves past them.
+CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "5"))
+# Tombstones are kept this long (purge_deleted_records); older cursors must resync
+CHANGES_TOMBSTONE_RETENTION_DAYS = int(os.getenv("CHANGES_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Order of the (timestamp, id) positions inside a changes cursor
+FEEDS = ("assignments", "submissions", "enrollments", "app_data", "deleted")
+
+# Position after every row older than a horizon
+NIL_ID = uuid.UUID(int=0)
+
+Position = Tuple[datetime, uuid.UUID]
+
+
+def decode_positions(cursor: str) -> Dict[str, Position]:
+    values = decode_cursor(cursor, 2 * len(FEEDS))
+    return {
+        feed: (cursor_datetime(values[2 * i]), cursor_uuid(values[2 * i + 1]))
+        for i, feed in enumerate(FEEDS)
+    }
+
+
+def encode_positions(positions: Dict[str, Position]) -> str:
+    return encode_cursor([value for feed in FEEDS for value in positions[feed]])
+
+
+async def read_feed(db: AsyncSession, query, changed_at, row_id, position: Optional[Position], horizon: datetime, limit: int):
+    """Rows of one feed after position and before horizon, oldest change first
+
+    Returns (rows, next position, more rows waiting).
+    """
+    query = query.where(changed_at < horizon)
+    if position is not None:
+        query = query.where(tuple_(changed_at, row_id) > tuple_(*position))
+    rows = (await db.execute(
+        query.add_columns(changed_at.label("changed_at"), row_id.label("row_id"))
+        .order_by(changed_at, row_id).limit(limit + 1)
+    )).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1].changed_at, rows[-1].row_id), True
+    return rows, (horizon, NIL_ID), False
+
+
+def assignment_changes(enrolled, position: Optional[Position], horizon: datetime, limit: int):
+    """The assignments feed as (query, changed_at, row_id) for read_feed
+
+    An assignment counts as changed when it is edited or when the student
+    (re)joins its class, so a new enrollment brings the class's existing
+    assignments; its change time is the later of the two updated_at values.
+    Each source is read by its own branch, with the keyset condition on its
+    own indexed column (assignments by class, enrollments by student), and
+    each (assignment, enrollment) pair comes only from the branch holding
+    the later timestamp, so it appears once.
+    """
+    edited = select(
+        Assignment.id.label("row_id"), Assignment.updated_at.label("changed_at")
+    ).join(Enrollment, Enrollment.class_id == Assignment.class_id).where(
+        enrolled,
+        Assignment.updated_at >= Enrollment.updated_at,
+        Assignment.updated_at < horizon
+    )
+    joined = select(
+        Assignment.id.label("row_id"), Enrollment.updated_at.label("changed_at")
+    ).join(Enrollment, Enrollment.class_id == Assignment.class_id).where(
+        enrolled,
+        Enrollment.updated_at > Assignment.updated_at,
+        Enrollment.updated_at < horizon
+    )
+    if position is not None:
+        edited = edited.where(tuple_(Assignment.updated_at, Assignment.id) > tuple_(*position))
+        joined = joined.where(
+            Enrollment.updated_at >= position[0],
+            tuple_(Enrollment.updated_at, Assignment.id) > tuple_(*position)
+        )
+
+    # Each branch stops after a page; read_feed orders and pages the union
+    changes = union_all(
+        edited.order_by(Assignment.updated_at, Assignment.id).limit(limit + 1),
+        joined.order_by(Enrollment.updated_at, Assignment.id).limit(limit + 1)
+    ).subquery("changes")
+    return (
+        select(Assignment).join(changes, changes.c.row_id == Assignment.id),
+        changes.c.changed_at, changes.c.row_id
+    )
+
+
+async def load_changes(db: AsyncSession, student_id, cursor: Optional[str], limit: int) -> ChangeFeed:
+    """Everything in the student's scope that changed after cursor (everything if cursor is None)
+
+    Each feed keeps its own position so one busy feed can be paged through
+    without re-sending the others.
+    """
+    now = await db.scalar(select(func.now()))
+    horizon = now - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+
+    if cursor:
+        positions = decode_positions(cursor)
+        if positions["deleted"][0] < now - timedelta(days=CHANGES_TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(status_code=410, detail="Changes cursor expired, sync again without a cursor")
+    else:
+        # A full sync has nothing to delete: start the tombstone feed at the horizon
+        positions = dict.fromkeys(FEEDS, None)
+        positions["deleted"] = (horizon, NIL_ID)
+
+    enrolled = and_(
+        Enrollment.student_id == student_id,
+        Enrollment.enrollment_status == "active"
+    )
+    active_class_ids = select(Enrollment.class_id).where(enrolled)
+
+    feeds = {
+        "assignments": assignment_changes(enrolled, positions["assignments"], horizon, limit),
+        "submissions": (
+            select(Submission).where(Submission.student_id == student_id),
+            Submission.updated_at, Submission.id
+        ),
+        "enrollments": (
+            select(Enrollment).where(Enrollment.student_id == student_id),
+            Enrollment.updated_at, Enrollment.id
+        ),
+        "app_data": (
+            select(StudentAppData.id, *RESPONSE_COLUMNS).where(StudentAppData.student_id == student_id),
+            StudentAppData.updated_at, StudentAppData.id
+        ),
+        "deleted": (
+            select(DeletedRecord).where(or_(
+                DeletedRecord.student_id == student_id,
+                and_(DeletedRecord.table_name == "assignments", DeletedRecord.class_id.in_(active_class_ids))
+            )),
+            DeletedRecord.deleted_at, DeletedRecord.id
+        )
+    }
+
+    results = {}
+    next_positions = {}
+    has_more = False
+    for feed, (query, changed_at, row_id) in feeds.items():
+        rows, next_positions[feed], more = await read_feed(
+            db, query, changed_at, row_id, positions[feed], horizon, limit
+        )
+        results[feed] = rows
+        has_more = has_more or more
+
+    return ChangeFeed(
+        assignments=[row[0] for row in results["assignments"]],
+        submissions=[row[0] for row in results["submissions"]],
+        enrollments=[row[0] for row in results["enrollments"]],
+        app_data=[to_response(row) for row in results["app_data"]],
+        deleted=[row[0] for row in results["deleted"]],
+        cursor=encode_positions(next_positions),
+        has_more=has_more
+    )
@@ -0,0 +1,71 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from .schemas import StudentDashboard
+
+# Builds the whole StudentDashboard document in one statement. Each section is
+# an independent subquery aggregated to JSON, so there is a single round trip
+# and no duplicated parent rows from joinedload chains. score is emitted as
+# text to keep its DECIMAL(5,2) scale when parsed back into Decimal.
+DASHBOARD_QUERY = text("""
+with enrolled as (
+    select *
+    from enrollments
+    where student_id = :student_id and enrollment_status = 'active'
+)
+select jsonb_build_object(
+    'student', (
+        select to_jsonb(s) || jsonb_build_object('school', to_jsonb(sc))
+        from students s
+        join schools sc on sc.id = s.school_id
+        where s.id = :student_id
+    ),
+    'enrolled_classes', coalesce((
+        select jsonb_agg(
+            to_jsonb(e) || jsonb_build_object(
+                'class_', to_jsonb(c) || jsonb_build_object('teacher', to_jsonb(t))
+            )
+        )
+        from enrolled e
+        join classes c on c.id = e.class_id
+        join teachers t on t.id = c.teacher_id
+    ), '[]'::jsonb),
+    'recent_assignments', coalesce((
+        select jsonb_agg(
+            to_jsonb(a) || jsonb_build_object('class_', to_jsonb(c))
+            order by a.due_date desc, a.id desc
+        )
+        from (
+            select *
+            from assignments
+            where class_id in (select class_id from enrolled)
+            order by due_date desc, id desc
+            limit 10
+        ) a
+        join classes c on c.id = a.class_id
+    ), '[]'::jsonb),
+    'recent_submissions', coalesce((
+        select jsonb_agg(
+            to_jsonb(sub) || jsonb_build_object(
+                'score', sub.score::text,
+                'assignment', to_jsonb(a) || jsonb_build_object('class_', to_jsonb(c))
+            )
+            order by sub.submitted_at desc, sub.id desc
+        )
+        from (
+            select *
+            from submissions
+            where student_id = :student_id
+            order by submitted_at desc, id desc
+            limit 10
+        ) sub
+        join assignments a on a.id = sub.assignment_id
+        join classes c on c.id = a.class_id
+    ), '[]'::jsonb)
+)::text
+""")
+
+
+async def load_dashboard(db: AsyncSession, student_id) -> StudentDashboard:
+    """Load the full student dashboard in a single query"""
+    document = await db.scalar(DASHBOARD_QUERY, {"student_id": student_id})
+    return StudentDashboard.model_validate_json(document)
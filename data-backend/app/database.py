@@ -1,14 +1,45 @@
-from sqlalchemy import create_engine
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from supabase import create_client, Client
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Convert postgresql:// to postgresql+asyncpg:// for the async request path
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1) if DATABASE_URL else None
+
+# Connection pool for the async request path (per worker)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Longest wait for a pooled connection before the request fails
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "5"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
+# Per-statement limits by request class (milliseconds, 0 = no limit)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+DB_EXPORT_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_EXPORT_STATEMENT_TIMEOUT_MS", "0"))
+
+# Admission control: at most DB_ADMISSION_LIMIT requests use a session at once
+# (defaults to the pool capacity); a request that cannot get in within
+# DB_ADMISSION_TIMEOUT_SECONDS is answered 503 with Retry-After instead of
+# queueing until the client gives up
+DB_ADMISSION_LIMIT = int(os.getenv("DB_ADMISSION_LIMIT", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+DB_ADMISSION_TIMEOUT_SECONDS = float(os.getenv("DB_ADMISSION_TIMEOUT_SECONDS", "1"))
+DB_RETRY_AFTER_SECONDS = int(os.getenv("DB_RETRY_AFTER_SECONDS", "2"))
+# Exports hold a session for the whole stream, so only this many run at once
+# (their slots count against DB_ADMISSION_LIMIT too)
+DB_EXPORT_CONCURRENCY = int(os.getenv("DB_EXPORT_CONCURRENCY", str(max(DB_ADMISSION_LIMIT // 4, 1))))
 
 # Supabase client configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -17,19 +48,169 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 # Initialize Supabase client for admin operations
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
-# SQLAlchemy setup
+# SQLAlchemy setup (sync engine is kept for admin tooling and scripts)
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by all API endpoints so queries never block the event loop
+# Sessions run in UTC so timestamps rendered by Postgres (e.g. to_jsonb) match
+# the UTC datetimes asyncpg returns for ORM queries
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    connect_args={"server_settings": {
+        "timezone": "UTC",
+        "statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)
+    }}
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+class QueryStats:
+    """SQL statements executed on behalf of one request"""
+
+    __slots__ = ("count", "seconds", "budget", "statements")
+
+    def __init__(self, record_statements: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        # Set by the route's query_budget dependency
+        self.budget: Optional[int] = None
+        # Statement texts, kept only when query budgets raise (tests, benchmarks)
+        self.statements: Optional[list] = [] if record_statements else None
+
+
+# Set by the metrics middleware for the duration of each request
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(conn, statement)
+
+
+@event.listens_for(async_engine.sync_engine, "handle_error")
+def _handle_error(context):
+    # A statement that raises (timeout, bad input, constraint violation)
+    # never reaches after_cursor_execute; count it here so its time is not
+    # lost and its start does not linger on the pooled connection
+    conn = context.connection
+    if conn is not None and conn.info.get("query_started"):
+        _record_statement(conn, context.statement)
+
+
+def _record_statement(conn, statement: str) -> None:
+    started = conn.info["query_started"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+        if stats.statements is not None:
+            stats.statements.append(statement)
+
+
+def overloaded(detail: str = "Service busy, retry shortly") -> HTTPException:
+    """503 telling clients when to retry"""
+    return HTTPException(
+        status_code=503,
+        detail=detail,
+        headers={"Retry-After": str(DB_RETRY_AFTER_SECONDS)}
+    )
+
+
+class AdmissionGate:
+    """Bounded concurrency with a wait budget; counters feed the pool gauges"""
+
+    def __init__(self, limit: int, timeout: float):
+        self.limit = limit
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_use = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+
+    async def acquire(self) -> None:
+        """Take a slot, raising 503 once the wait budget is spent; pair with release()"""
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise overloaded()
+        finally:
+            self.waiting -= 1
+            self.wait_seconds_total += time.perf_counter() - started
+
+        self.admitted += 1
+        self.in_use += 1
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def admit(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+admission = AdmissionGate(DB_ADMISSION_LIMIT, DB_ADMISSION_TIMEOUT_SECONDS)
+export_admission = AdmissionGate(DB_EXPORT_CONCURRENCY, DB_ADMISSION_TIMEOUT_SECONDS)
+
+
+async def get_db():
+    async with admission.admit():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+
+async def set_statement_timeout(db: AsyncSession, timeout_ms: int) -> None:
+    """Override statement_timeout for the rest of the session's current transaction"""
+    await db.execute(text("select set_config('statement_timeout', :timeout, true)"), {"timeout": str(timeout_ms)})
+
+
+def pool_stats() -> dict:
+    """Pool and admission gauges for this worker"""
+    pool = async_engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "admission_limit": admission.limit,
+        "admission_in_use": admission.in_use,
+        "admission_waiting": admission.waiting,
+        "admitted_total": admission.admitted,
+        "rejected_total": admission.rejected,
+        "admission_wait_seconds_total": round(admission.wait_seconds_total, 6),
+        "export_limit": export_admission.limit,
+        "export_in_use": export_admission.in_use,
+        "export_rejected_total": export_admission.rejected
+    }
 
 def get_supabase_client():
     """Get Supabase client for direct operations"""
-    return supabase
\ No newline at end of file
+    return supabase
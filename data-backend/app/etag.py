@@ -0,0 +1,188 @@
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+import hashlib
+from .models import Student, School, Enrollment, Class, Teacher, Assignment, Submission, StudentAppData, StudentGradeSummary
+
+# Clients may keep a copy but must revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # "*" matches any current representation (callers only get here if one exists)
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+async def conditional_response(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    fingerprint,
+    not_found: str = "Not found"
+) -> Optional[Response]:
+    """Evaluate a conditional GET against a cheap fingerprint query
+
+    fingerprint selects one row of values (row counts and max(updated_at)
+    of every table behind the response) that changes whenever the response
+    body would, or no row when the resource does not exist (answered 404
+    with not_found as the detail). Sets ETag/Last-Modified on response and
+    returns a 304 Response when the client's copy is still current,
+    otherwise None.
+
+    Only If-None-Match is evaluated. Last-Modified is informational: a
+    deleted row changes the counts in the ETag but does not move
+    max(updated_at), so If-Modified-Since could answer 304 for a stale copy.
+    """
+    row = (await db.execute(fingerprint)).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    row = tuple(row)
+
+    digest = hashlib.sha1(
+        f"{request.url.path}?{request.url.query}|{row!r}".encode()
+    ).hexdigest()
+    etag = f'W/"{digest}"'
+    last_modified = max((value for value in row if isinstance(value, datetime)), default=None)
+
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+# Fingerprint queries for student read endpoints
+
+def _enrollments(student_id):
+    return select(
+        func.count(Enrollment.id),
+        func.max(Enrollment.updated_at),
+        func.max(Class.updated_at),
+        func.max(Teacher.updated_at)
+    ).select_from(Enrollment).join(Enrollment.class_).join(Class.teacher).where(
+        Enrollment.student_id == student_id,
+        Enrollment.enrollment_status == "active"
+    )
+
+
+def _assignments(student_id):
+    enrolled_class_ids = select(Enrollment.class_id).where(
+        Enrollment.student_id == student_id,
+        Enrollment.enrollment_status == "active"
+    )
+    return select(
+        func.count(Assignment.id),
+        func.max(Assignment.updated_at),
+        func.max(Class.updated_at)
+    ).select_from(Assignment).join(Assignment.class_).where(
+        Assignment.class_id.in_(enrolled_class_ids)
+    )
+
+
+def _submissions(student_id):
+    return select(
+        func.count(Submission.id),
+        func.max(Submission.updated_at),
+        func.max(Assignment.updated_at),
+        func.max(Class.updated_at)
+    ).select_from(Submission).join(Submission.assignment).join(Assignment.class_).where(
+        Submission.student_id == student_id
+    )
+
+
+def _combine(*queries):
+    """Combine fingerprint selects into one row (one round trip)"""
+    columns = []
+    for query in queries:
+        subquery = query.subquery()
+        columns.extend(select(column).scalar_subquery() for column in subquery.c)
+    return select(*columns)
+
+
+def profile_fingerprint(student_id):
+    return select(Student.updated_at, School.updated_at).join(Student.school).where(
+        Student.id == student_id
+    )
+
+
+def classes_fingerprint(student_id):
+    return _enrollments(student_id)
+
+
+def assignments_fingerprint(student_id):
+    return _combine(_enrollments(student_id), _assignments(student_id))
+
+
+def grades_fingerprint(student_id):
+    return _submissions(student_id)
+
+
+def grade_summary_fingerprint(student_id):
+    return select(
+        func.count(StudentGradeSummary.class_id),
+        func.max(StudentGradeSummary.updated_at),
+        func.max(Class.updated_at),
+        func.max(Teacher.updated_at)
+    ).select_from(StudentGradeSummary).join(StudentGradeSummary.class_).join(Class.teacher).where(
+        StudentGradeSummary.student_id == student_id
+    )
+
+
+def gradebook_fingerprint(class_id):
+    """Changes with the class, its teacher, roster, assignments and any submission
+
+    Also counts assignments already past due: missing counts depend on the
+    clock, so a due date passing must change the ETag (and cache version).
+    """
+    return _combine(
+        select(Class.updated_at, Teacher.updated_at).join(Class.teacher).where(Class.id == class_id),
+        select(func.count(Enrollment.id), func.max(Enrollment.updated_at), func.max(Student.updated_at)).join(
+            Enrollment.student
+        ).where(Enrollment.class_id == class_id),
+        select(
+            func.count(Assignment.id),
+            func.max(Assignment.updated_at),
+            func.count(Assignment.id).filter(Assignment.due_date < func.now())
+        ).where(Assignment.class_id == class_id),
+        select(func.count(Submission.id), func.max(Submission.updated_at)).join(Submission.assignment).where(
+            Assignment.class_id == class_id
+        )
+    )
+
+
+def dashboard_fingerprint(student_id):
+    return _combine(
+        profile_fingerprint(student_id),
+        _enrollments(student_id),
+        _assignments(student_id),
+        _submissions(student_id)
+    )
+
+
+def app_data_fingerprint(student_id, app_key: str, data_key: Optional[str] = None):
+    """All of an app's data, or one key (no row if the key does not exist)"""
+    if data_key is not None:
+        return select(StudentAppData.updated_at).where(
+            StudentAppData.student_id == student_id,
+            StudentAppData.app_key == app_key,
+            StudentAppData.data_key == data_key
+        )
+    return select(
+        func.count(StudentAppData.id),
+        func.max(StudentAppData.updated_at)
+    ).where(
+        StudentAppData.student_id == student_id,
+        StudentAppData.app_key == app_key
+    )
@@ -0,0 +1,187 @@
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, Set
+from dotenv import load_dotenv
+import asyncio
+import asyncpg
+import json
+import os
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Channel the notify_change triggers publish on (see the change notifications migration)
+EVENTS_CHANNEL = "edu_changes"
+# Comment line sent to idle streams so proxies keep them open
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+# Events buffered per client; a client that falls further behind gets a resync event instead
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Sent when notifications may have been missed (listener reconnected, client
+# too slow); clients should refetch, e.g. with /student/changes
+RESYNC = {"type": "resync"}
+
+
+def subscription_keys(notification: dict) -> Iterable[str]:
+    """Subscriptions a notification is delivered to"""
+    if notification.get("student_id"):
+        yield f"student:{notification['student_id']}"
+    if notification.get("class_id"):
+        yield f"class:{notification['class_id']}"
+
+
+class Subscription:
+    """One connected client: a bounded queue of events for a set of keys"""
+
+    def __init__(self, keys: Set[str], accept: Optional[Callable[[dict], bool]] = None):
+        self.keys = keys
+        self.accept = accept
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+
+    def put(self, event: dict) -> None:
+        if event is not RESYNC and self.accept is not None and not self.accept(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the backlog rather than grow without bound; one resync replaces it
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class EventHub:
+    """Fans Postgres notifications out to subscribed clients of this worker
+
+    One LISTEN connection per worker, opened with the first subscription, so
+    the database sees one listener however many clients are connected.
+    """
+
+    def __init__(self, database_url: Optional[str] = DATABASE_URL, channel: str = EVENTS_CHANNEL):
+        self.database_url = database_url
+        self.channel = channel
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self.notifications_received = 0
+
+    async def subscribe(self, keys: Iterable[str], accept: Optional[Callable[[dict], bool]] = None) -> Subscription:
+        subscription = Subscription(set(keys), accept)
+        for key in subscription.keys:
+            self._subscriptions.setdefault(key, set()).add(subscription)
+
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        # Changes committed before LISTEN is active would never reach this client
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=5.0)
+        except asyncio.TimeoutError:
+            subscription.put(RESYNC)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for key in subscription.keys:
+            subscribers = self._subscriptions.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[key]
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        self.notifications_received += 1
+        try:
+            notification = json.loads(payload)
+        except ValueError:
+            print(f"Ignoring malformed change notification: {payload[:200]}")
+            return
+
+        delivered = set()
+        for key in subscription_keys(notification):
+            for subscription in self._subscriptions.get(key, ()):
+                # A subscription to both a student and their class gets the event once
+                if subscription not in delivered:
+                    delivered.add(subscription)
+                    subscription.put(notification)
+
+    def _broadcast(self, event: dict) -> None:
+        for subscription in {s for subscribers in self._subscriptions.values() for s in subscribers}:
+            subscription.put(event)
+
+    async def _listen(self) -> None:
+        """Hold the LISTEN connection open, reconnecting with backoff"""
+        delay = 1.0
+        reconnecting = False
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.database_url)
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _: closed.set())
+                await conn.add_listener(self.channel, self._on_notification)
+                self._connected.set()
+                if reconnecting:
+                    # Anything committed while disconnected was not delivered
+                    self._broadcast(RESYNC)
+                delay = 1.0
+
+                while not closed.is_set():
+                    try:
+                        await asyncio.wait_for(closed.wait(), timeout=EVENTS_HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        # Detect half-open connections that never report closing
+                        await conn.fetchval("select 1", timeout=5.0)
+                raise ConnectionError("listener connection closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Change notification listener error: {str(e)}")
+            finally:
+                self._connected.clear()
+                if conn is not None and not conn.is_closed():
+                    conn.terminate()
+
+            reconnecting = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {
+            "listening": self._connected.is_set(),
+            "subscriptions": len({s for subscribers in self._subscriptions.values() for s in subscribers}),
+            "notifications_received": self.notifications_received
+        }
+
+
+hub = EventHub()
+
+
+def format_event(event: dict) -> str:
+    """One Server-Sent Events message; resync gets its own event type"""
+    name = "resync" if event is RESYNC else "change"
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(subscription: Subscription) -> AsyncIterator[str]:
+    """SSE body for a subscription; unsubscribes when the client disconnects"""
+    try:
+        # Tells EventSource how long to wait before reconnecting
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
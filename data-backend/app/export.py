@@ -0,0 +1,120 @@
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from typing import AsyncIterator, Optional, Sequence, Type
+from pydantic import BaseModel
+from dotenv import load_dotenv
+import os
+import uuid
+from .database import (
+    AdmissionGate,
+    AsyncSessionLocal,
+    DB_EXPORT_STATEMENT_TIMEOUT_MS,
+    admission,
+    export_admission,
+    set_statement_timeout
+)
+from .models import Student, Submission, Assignment, StudentAppData
+from . import schemas
+
+load_dotenv()
+
+# Rows fetched per server-side cursor round trip
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class AdmittedStream:
+    """Response body that holds admission slots until the stream is over
+
+    Released when the stream is exhausted, fails or is cancelled (client
+    disconnect), or when the response is dropped before it was iterated.
+    """
+
+    def __init__(self, iterator: AsyncIterator[str], gates: Sequence[AdmissionGate]):
+        self._iterator = iterator
+        self._gates = tuple(gates)
+
+    def __aiter__(self) -> "AdmittedStream":
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            return await self._iterator.__anext__()
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        gates, self._gates = self._gates, ()
+        for gate in gates:
+            gate.release()
+
+    def __del__(self):
+        self.release()
+
+
+async def admitted(iterator: AsyncIterator[str]) -> AdmittedStream:
+    """Admit an export before its response starts, so a busy worker answers 503 rather than a cut-off stream
+
+    Takes an export slot (at most DB_EXPORT_CONCURRENCY at once) and a slot
+    of the shared admission gate, since the stream holds a pool connection
+    like any other request.
+    """
+    await export_admission.acquire()
+    try:
+        await admission.acquire()
+    except BaseException:
+        export_admission.release()
+        raise
+    return AdmittedStream(iterator, (admission, export_admission))
+
+
+async def stream_ndjson(query, schema: Type[BaseModel]) -> AsyncIterator[str]:
+    """Stream query results as NDJSON in constant memory using a server-side cursor
+
+    Uses its own session: the request's get_db session is closed before a
+    streaming body is sent.
+    """
+    async with AsyncSessionLocal() as db:
+        # Exports scan whole tables, so they get their own statement timeout
+        await set_statement_timeout(db, DB_EXPORT_STATEMENT_TIMEOUT_MS)
+        result = await db.stream_scalars(
+            query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            yield "".join(
+                schema.model_validate(row).model_dump_json() + "\n" for row in rows
+            )
+
+
+def students_query():
+    return select(Student).options(
+        joinedload(Student.school)
+    ).order_by(Student.id)
+
+
+def submissions_query(class_id: Optional[uuid.UUID] = None):
+    query = select(Submission)
+    if class_id:
+        query = query.join(Submission.assignment).where(Assignment.class_id == class_id)
+    return query.order_by(Submission.id)
+
+
+def app_data_query(app_key: Optional[str] = None):
+    query = select(StudentAppData)
+    if app_key:
+        query = query.where(StudentAppData.app_key == app_key)
+    return query.order_by(StudentAppData.id)
+
+
+async def export_students() -> AdmittedStream:
+    return await admitted(stream_ndjson(students_query(), schemas.StudentProfile))
+
+
+async def export_submissions(class_id: Optional[uuid.UUID] = None) -> AdmittedStream:
+    return await admitted(stream_ndjson(submissions_query(class_id), schemas.Submission))
+
+
+async def export_app_data(app_key: Optional[str] = None) -> AdmittedStream:
+    return await admitted(stream_ndjson(app_data_query(app_key), schemas.StudentAppData))
@@ -0,0 +1,174 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from typing import Optional
+import os
+import warnings
+import numpy as np
+from .cache import SharedCache
+from .catalog import load_classes
+from .models import Student, Enrollment, Assignment, Submission
+from .schemas import ClassGradebook, GradebookAssignment, GradebookStudent
+
+load_dotenv()
+
+# Gradebook cache configuration (entries are per class)
+GRADEBOOK_CACHE_MAX_SIZE = int(os.getenv("GRADEBOOK_CACHE_MAX_SIZE", "1000"))
+GRADEBOOK_CACHE_TTL_SECONDS = float(os.getenv("GRADEBOOK_CACHE_TTL_SECONDS", "3600"))
+
+# Letter bands by percent of points possible, lowest first
+GRADE_BANDS = ("F", "D", "C", "B", "A")
+GRADE_BAND_EDGES = (60, 70, 80, 90)
+
+# class_id -> {"version": fingerprint ETag, "body": serialised ClassGradebook}
+gradebook_cache = SharedCache("gradebook", max_size=GRADEBOOK_CACHE_MAX_SIZE, ttl=GRADEBOOK_CACHE_TTL_SECONDS)
+
+
+def _rounded(values) -> list:
+    return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+
+def compute_gradebook(class_, assignments, students, submissions, now: Optional[datetime] = None) -> ClassGradebook:
+    """Statistics over a students x assignments score matrix, computed column/row-wise with NumPy"""
+    now = now or datetime.now(timezone.utc)
+    n, m = len(students), len(assignments)
+
+    student_index = {student.id: i for i, student in enumerate(students)}
+    assignment_index = {assignment.id: j for j, assignment in enumerate(assignments)}
+
+    # NaN marks "no score": either not submitted or submitted but not graded yet
+    scores = np.full((n, m), np.nan)
+    submitted = np.zeros((n, m), dtype=bool)
+    if submissions:
+        rows = np.array([student_index[s.student_id] for s in submissions], dtype=np.intp)
+        cols = np.array([assignment_index[s.assignment_id] for s in submissions], dtype=np.intp)
+        submitted[rows, cols] = True
+        scores[rows, cols] = np.array([s.score for s in submissions], dtype=float)
+    graded = ~np.isnan(scores)
+
+    points = np.array([a.points_possible for a in assignments], dtype=float)
+    points = np.where(points > 0, points, np.nan)
+    past_due = np.array([a.due_date is not None and a.due_date < now for a in assignments], dtype=bool)
+
+    # Per-assignment statistics (columns); all-NaN columns yield NaN -> None.
+    # An empty roster or no assignments leaves nothing to reduce over
+    nan_column = np.full(m, np.nan)
+    if n and m:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(scores, axis=0)
+            p25, median, p75, p90 = np.nanpercentile(scores, [25, 50, 75, 90], axis=0)
+            low = np.nanmin(scores, axis=0)
+            high = np.nanmax(scores, axis=0)
+            std = np.nanstd(scores, axis=0)
+    else:
+        mean = p25 = median = p75 = p90 = low = high = std = nan_column
+
+    with np.errstate(invalid="ignore"):
+        percent = scores / points * 100
+    banded = ~np.isnan(percent)
+    bands = np.digitize(np.nan_to_num(percent), GRADE_BAND_EDGES)
+    # (band, student, assignment) one-hot, summed over students
+    distribution = ((bands[None, :, :] == np.arange(len(GRADE_BANDS))[:, None, None]) & banded).sum(axis=1)
+
+    # Per-student totals (rows); points possible only counts graded work
+    score_totals = np.nansum(scores, axis=1)
+    points_totals = np.where(graded, np.nan_to_num(points), 0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        student_percent = np.where(points_totals > 0, score_totals / points_totals * 100, np.nan)
+    missing = (~submitted & past_due).sum(axis=1)
+
+    mean, median, p25, p75, p90, low, high, std = (
+        _rounded(column) for column in (mean, median, p25, p75, p90, low, high, std)
+    )
+    student_percent = _rounded(student_percent)
+
+    return ClassGradebook(
+        class_=class_,
+        student_count=n,
+        assignment_count=m,
+        assignments=[
+            GradebookAssignment(
+                assignment_id=assignment.id,
+                name=assignment.name,
+                due_date=assignment.due_date,
+                points_possible=assignment.points_possible,
+                submitted_count=int(submitted[:, j].sum()),
+                graded_count=int(graded[:, j].sum()),
+                mean=mean[j],
+                median=median[j],
+                p25=p25[j],
+                p75=p75[j],
+                p90=p90[j],
+                min=low[j],
+                max=high[j],
+                std=std[j],
+                distribution={band: int(distribution[b, j]) for b, band in enumerate(GRADE_BANDS)}
+            ) for j, assignment in enumerate(assignments)
+        ],
+        students=[
+            GradebookStudent(
+                student_id=student.id,
+                first_name=student.first_name,
+                last_name=student.last_name,
+                submitted_count=int(submitted[i].sum()),
+                graded_count=int(graded[i].sum()),
+                missing_count=int(missing[i]),
+                score_total=round(float(score_totals[i]), 2),
+                points_possible_total=int(points_totals[i]),
+                percent=student_percent[i]
+            ) for i, student in enumerate(students)
+        ]
+    )
+
+
+async def load_gradebook(db: AsyncSession, class_id) -> Optional[ClassGradebook]:
+    """Load a class's roster, assignments and every score (one query each); None if the class does not exist"""
+    # Only reached when the fingerprint changed, so the class is loaded fresh (and recached)
+    classes = await load_classes(db, [class_id])
+    if class_id not in classes:
+        return None
+
+    enrolled_student_ids = select(Enrollment.student_id).where(
+        Enrollment.class_id == class_id,
+        Enrollment.enrollment_status == "active"
+    )
+
+    students = (await db.execute(
+        select(Student.id, Student.first_name, Student.last_name).where(
+            Student.id.in_(enrolled_student_ids)
+        ).order_by(Student.last_name, Student.first_name, Student.id)
+    )).all()
+
+    assignments = (await db.execute(
+        select(Assignment.id, Assignment.name, Assignment.due_date, Assignment.points_possible).where(
+            Assignment.class_id == class_id
+        ).order_by(Assignment.due_date.asc().nulls_last(), Assignment.name, Assignment.id)
+    )).all()
+
+    submissions = (await db.execute(
+        select(Submission.student_id, Submission.assignment_id, Submission.score).join(
+            Submission.assignment
+        ).where(
+            Assignment.class_id == class_id,
+            Submission.student_id.in_(enrolled_student_ids)
+        )
+    )).all()
+
+    return compute_gradebook(classes[class_id], assignments, students, submissions)
+
+
+async def gradebook_json(db: AsyncSession, class_id, version: str) -> Optional[str]:
+    """Serialised gradebook, recomputed only when version (the class's fingerprint ETag) changes"""
+    cached = await gradebook_cache.get(class_id)
+    if cached is not None and cached["version"] == version:
+        return cached["body"]
+
+    gradebook = await load_gradebook(db, class_id)
+    if gradebook is None:
+        return None
+
+    body = gradebook.model_dump_json()
+    await gradebook_cache.set(class_id, {"version": version, "body": body})
+    return body
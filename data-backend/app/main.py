@@ -1,30 +1,102 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session, joinedload
+from fastapi.responses import HTMLResponse, StreamingResponse
+from sqlalchemy import select, func, delete
+from sqlalchemy.exc import IntegrityError, DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import List
-from .database import get_db
-from .models import Student, Enrollment, Assignment, Submission, Class, Teacher, School, StudentAppData
+from .database import get_db, overloaded, pool_stats
+from .cache import start_cache, stop_cache
+from .models import Student, Enrollment, Assignment, Submission, Class, Teacher, School, StudentAppData, StudentGradeSummary, ClassCatalogVersion
 from .schemas import (
     StudentProfile, 
     StudentDashboard, 
     EnrollmentWithClass, 
     AssignmentWithClass,
     SubmissionWithAssignment,
+    GradeSummaryWithClass,
+    ClassGradebook,
+    ChangeFeed,
     StudentAppDataCreate,
+    StudentAppDataBatchCreate,
+    StudentAppDataBatchQuery,
     StudentAppDataUpdate,
+    StudentAppDataPatch,
     StudentAppDataResponse
 )
-from .auth import get_current_student, get_current_user, get_current_student_or_teacher
+from .app_data import (
+    RESPONSE_COLUMNS,
+    upsert_app_data,
+    upsert_app_data_batch,
+    get_app_data_batch,
+    replace_app_data,
+    patch_app_data
+)
+from .pagination import (
+    PageParams,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    cursor_datetime,
+    cursor_uuid,
+    after_desc,
+    desc_sort_key,
+    next_page
+)
+from .auth import (
+    get_current_student,
+    get_current_user,
+    get_current_student_or_teacher,
+    get_current_student_or_teacher_for_write,
+    get_current_teacher,
+    get_stream_token_payload,
+    get_stream_user,
+    resolve_student
+)
+from .catalog import get_classes, get_class_assignments
+from .responses import rows_response, row_response, json_response, model_response, models_response
+from .dashboard import load_dashboard
+from .gradebook import gradebook_json
+from .changes import load_changes
+from .events import SSE_MEDIA_TYPE, hub, event_stream
+from .metrics import METRICS_MEDIA_TYPE, METRICS_TOKEN, MetricsMiddleware, render as render_metrics
+from .query_budget import query_budget
+from .etag import (
+    conditional_response,
+    profile_fingerprint,
+    classes_fingerprint,
+    assignments_fingerprint,
+    grades_fingerprint,
+    grade_summary_fingerprint,
+    gradebook_fingerprint,
+    dashboard_fingerprint,
+    app_data_fingerprint
+)
+from .export import NDJSON_MEDIA_TYPE, export_students, export_submissions, export_app_data
 from typing import Optional
+from contextlib import asynccontextmanager
+import hmac
 import uuid as uuid_lib
 # from .admin import admin  # CRUDAdmin having async connection issues - disable for now
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect the shared cache backend and its cross-worker invalidation listener
+    await start_cache()
+    yield
+    await hub.close()
+    await stop_cache()
+
+
 app = FastAPI(
     title="Educational Data Backend",
     description="FERPA-compliant backend for educational prototypes",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend apps
@@ -54,8 +126,29 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Last-Modified", "Retry-After"],
 )
 
+# Outermost, so timings include every other middleware
+app.add_middleware(MetricsMiddleware)
+
+# Saturation: answer quickly with 503 + Retry-After instead of a 500 or a hung request
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    """No pooled connection became free within DB_POOL_TIMEOUT_SECONDS"""
+    print(f"Database pool exhausted on {request.url.path}: {pool_stats()}")
+    return await http_exception_handler(request, overloaded())
+
+
+@app.exception_handler(DBAPIError)
+async def statement_timeout_handler(request: Request, exc: DBAPIError):
+    """Statements cancelled by statement_timeout (SQLSTATE 57014) become 503s; anything else stays a 500"""
+    if getattr(exc.orig, "sqlstate", None) != "57014":
+        raise exc
+    print(f"Statement timeout on {request.url.path}")
+    return await http_exception_handler(request, overloaded("Request took too long, retry shortly"))
+
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -83,137 +176,223 @@ async def api_info():
             "student_classes": "/student/classes", 
             "student_assignments": "/student/assignments",
             "student_grades": "/student/grades",
-            "student_dashboard": "/student/dashboard"
+            "student_grade_summary": "/student/grades/summary",
+            "student_dashboard": "/student/dashboard",
+            "student_changes": "/student/changes"
         }
     }
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "database_pool": pool_stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics for this worker"""
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type=METRICS_MEDIA_TYPE)
 
 
 # Student endpoints
-@app.get("/student/profile", response_model=StudentProfile)
+@app.get("/student/profile", response_model=StudentProfile, dependencies=[query_budget(3)])
 async def get_student_profile(
+    request: Request,
+    response: Response,
     current_student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current student's profile with school information"""
-    student_with_school = db.query(Student).options(
-        joinedload(Student.school)
-    ).filter(Student.id == current_student.id).first()
+    not_modified = await conditional_response(
+        request, response, db, profile_fingerprint(current_student.id), not_found="Student not found"
+    )
+    if not_modified:
+        return not_modified
+    
+    student_with_school = await db.scalar(
+        select(Student).options(
+            joinedload(Student.school)
+        ).where(Student.id == current_student.id)
+    )
     
     return student_with_school
 
 
-@app.get("/student/classes", response_model=List[EnrollmentWithClass])
+@app.get("/student/classes", response_model=List[EnrollmentWithClass], dependencies=[query_budget(4)])
 async def get_student_classes(
+    request: Request,
+    response: Response,
     current_student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all classes the student is enrolled in"""
-    enrollments = db.query(Enrollment).options(
-        joinedload(Enrollment.class_).joinedload(Class.teacher)
-    ).filter(
-        Enrollment.student_id == current_student.id,
-        Enrollment.enrollment_status == "active"
-    ).all()
+    not_modified = await conditional_response(request, response, db, classes_fingerprint(current_student.id))
+    if not_modified:
+        return not_modified
+    
+    # Each class's catalog version tells the catalog cache whether its entry is current
+    rows = (await db.execute(
+        select(Enrollment, ClassCatalogVersion.class_version).outerjoin(
+            ClassCatalogVersion, ClassCatalogVersion.class_id == Enrollment.class_id
+        ).where(
+            Enrollment.student_id == current_student.id,
+            Enrollment.enrollment_status == "active"
+        )
+    )).all()
+    enrollments = [enrollment for enrollment, _ in rows]
     
-    return enrollments
+    # Class and teacher details are shared by the whole section, so they come from the catalog cache
+    classes = await get_classes(db, {enrollment.class_id: version for enrollment, version in rows})
+    
+    return models_response(EnrollmentWithClass, [
+        EnrollmentWithClass(
+            id=enrollment.id,
+            student_id=enrollment.student_id,
+            class_id=enrollment.class_id,
+            enrolled_at=enrollment.enrolled_at,
+            enrollment_status=enrollment.enrollment_status,
+            class_=classes[enrollment.class_id]
+        ) for enrollment in enrollments if enrollment.class_id in classes
+    ], response)
 
 
-@app.get("/student/assignments", response_model=List[AssignmentWithClass])
+@app.get("/student/assignments", response_model=List[AssignmentWithClass], dependencies=[query_budget(4)])
 async def get_student_assignments(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
     current_student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all assignments for student's enrolled classes"""
-    # Get class IDs student is enrolled in
-    enrolled_class_ids = db.query(Enrollment.class_id).filter(
-        Enrollment.student_id == current_student.id,
-        Enrollment.enrollment_status == "active"
-    ).subquery()
+    """Get assignments for student's enrolled classes, newest due date first (keyset paginated)"""
+    not_modified = await conditional_response(request, response, db, assignments_fingerprint(current_student.id))
+    if not_modified:
+        return not_modified
+    
+    # Get class IDs student is enrolled in, with the catalog version of each
+    # class's assignment list
+    versions = (await db.execute(
+        select(Enrollment.class_id, ClassCatalogVersion.assignments_version).outerjoin(
+            ClassCatalogVersion, ClassCatalogVersion.class_id == Enrollment.class_id
+        ).where(
+            Enrollment.student_id == current_student.id,
+            Enrollment.enrollment_status == "active"
+        )
+    )).all()
     
-    assignments = db.query(Assignment).options(
-        joinedload(Assignment.class_)
-    ).filter(
-        Assignment.class_id.in_(enrolled_class_ids)
-    ).order_by(Assignment.due_date.desc()).all()
+    # Assignment lists are shared by the whole section, so they come from the
+    # catalog cache and the page is assembled in memory
+    assignments = await get_class_assignments(db, dict(versions))
+    assignments.sort(key=lambda a: desc_sort_key(a.due_date, a.id), reverse=True)
     
-    return assignments
+    if page.cursor:
+        due_date, last_id = decode_cursor(page.cursor, 2)
+        after = desc_sort_key(cursor_datetime(due_date), cursor_uuid(last_id))
+        assignments = [a for a in assignments if desc_sort_key(a.due_date, a.id) < after]
+    
+    assignments = next_page(assignments[:page.limit + 1], page, response, lambda a: (a.due_date, a.id))
+    return models_response(AssignmentWithClass, assignments, response)
 
 
-@app.get("/student/grades", response_model=List[SubmissionWithAssignment])
+@app.get("/student/grades", response_model=List[SubmissionWithAssignment], dependencies=[query_budget(3)])
 async def get_student_grades(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
     current_student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all student's submission history with grades"""
-    submissions = db.query(Submission).options(
+    """Get student's submission history with grades, newest first (keyset paginated)"""
+    not_modified = await conditional_response(request, response, db, grades_fingerprint(current_student.id))
+    if not_modified:
+        return not_modified
+    
+    query = select(Submission).options(
         joinedload(Submission.assignment).joinedload(Assignment.class_)
-    ).filter(
+    ).where(
         Submission.student_id == current_student.id
-    ).order_by(Submission.submitted_at.desc()).all()
+    )
+    
+    if page.cursor:
+        submitted_at, last_id = decode_cursor(page.cursor, 2)
+        query = query.where(
+            after_desc(Submission.submitted_at, Submission.id, cursor_datetime(submitted_at), cursor_uuid(last_id))
+        )
     
-    return submissions
+    result = await db.execute(
+        query.order_by(Submission.submitted_at.desc(), Submission.id.desc()).limit(page.limit + 1)
+    )
+    submissions = result.scalars().all()
+    
+    submissions = next_page(submissions, page, response, lambda s: (s.submitted_at, s.id))
+    return models_response(SubmissionWithAssignment, submissions, response)
 
 
-@app.get("/student/dashboard", response_model=StudentDashboard)
+@app.get("/student/grades/summary", response_model=List[GradeSummaryWithClass], dependencies=[query_budget(3)])
+async def get_student_grade_summary(
+    request: Request,
+    response: Response,
+    current_student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get per-class grade totals for the student from the precomputed summary table"""
+    not_modified = await conditional_response(request, response, db, grade_summary_fingerprint(current_student.id))
+    if not_modified:
+        return not_modified
+    
+    result = await db.execute(
+        select(StudentGradeSummary).options(
+            joinedload(StudentGradeSummary.class_).joinedload(Class.teacher)
+        ).where(
+            StudentGradeSummary.student_id == current_student.id
+        ).order_by(StudentGradeSummary.class_id)
+    )
+    summaries = result.scalars().all()
+    
+    return models_response(GradeSummaryWithClass, summaries, response)
+
+
+@app.get("/student/dashboard", response_model=StudentDashboard, dependencies=[query_budget(3)])
 async def get_student_dashboard(
+    request: Request,
+    response: Response,
     current_student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get comprehensive student dashboard data"""
-    # Get student with school
-    student_with_school = db.query(Student).options(
-        joinedload(Student.school)
-    ).filter(Student.id == current_student.id).first()
-    
-    # Get enrolled classes
-    enrollments = db.query(Enrollment).options(
-        joinedload(Enrollment.class_).joinedload(Class.teacher)
-    ).filter(
-        Enrollment.student_id == current_student.id,
-        Enrollment.enrollment_status == "active"
-    ).all()
-    
-    # Get recent assignments (last 10)
-    enrolled_class_ids = [e.class_id for e in enrollments]
-    recent_assignments = db.query(Assignment).options(
-        joinedload(Assignment.class_)
-    ).filter(
-        Assignment.class_id.in_(enrolled_class_ids)
-    ).order_by(Assignment.due_date.desc()).limit(10).all()
-    
-    # Get recent submissions (last 10)
-    recent_submissions = db.query(Submission).options(
-        joinedload(Submission.assignment).joinedload(Assignment.class_)
-    ).filter(
-        Submission.student_id == current_student.id
-    ).order_by(Submission.submitted_at.desc()).limit(10).all()
+    """Get comprehensive student dashboard data in a single database round trip"""
+    not_modified = await conditional_response(request, response, db, dashboard_fingerprint(current_student.id))
+    if not_modified:
+        return not_modified
     
-    return {
-        "student": student_with_school,
-        "enrolled_classes": enrollments,
-        "recent_assignments": recent_assignments,
-        "recent_submissions": recent_submissions
-    }
+    return model_response(await load_dashboard(db, current_student.id), response)
+
+
+@app.get("/student/changes", response_model=ChangeFeed, dependencies=[query_budget(7)])
+async def get_student_changes(
+    cursor: Optional[str] = Query(None, description="cursor from the previous response; omit for a full sync"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum rows per feed"),
+    current_student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get assignments, submissions, enrollments and app data changed since cursor, plus deletions"""
+    return model_response(await load_changes(db, current_student.id, cursor, limit))
 
 
 # Auth test endpoint
-@app.get("/auth/test")
+@app.get("/auth/test", dependencies=[query_budget(0)])
 async def test_auth(current_user: dict = Depends(get_current_user)):
     """Test authentication - returns current user info"""
     return {"message": "Authentication successful", "user": current_user}
 
 
 # Student App Data endpoints
-@app.post("/student/app-data", response_model=StudentAppDataResponse)
+@app.post("/student/app-data", response_model=StudentAppDataResponse, dependencies=[query_budget(4)])
 async def store_app_data(
     app_data: StudentAppDataCreate,
-    current_user: dict = Depends(get_current_student_or_teacher),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_student_or_teacher_for_write),
+    db: AsyncSession = Depends(get_db)
 ):
     """Store or update app data for the authenticated student or teacher"""
     
@@ -221,71 +400,57 @@ async def store_app_data(
     if current_user["role"] == "student":
         student_id = current_user["student"].id
     else:  # teacher
-        # For teachers, create or find a special "teacher student" record
-        teacher_email = current_user["email"]
-        teacher_student = db.query(Student).filter(Student.email == teacher_email).first()
-        
-        if not teacher_student:
-            # Create a special student record for this teacher
-            teacher_student = Student(
-                school_id="00000000-0000-4000-8000-000000000001",  # Default school
-                supabase_user_id=current_user["user_id"],
-                email=teacher_email,
-                first_name="Teacher",
-                last_name="Account",
-                student_number=f"TEACHER-{current_user['user_id'][:8]}",
-                grade_level=99  # Special grade level for teachers
-            )
-            db.add(teacher_student)
-            db.commit()
-            db.refresh(teacher_student)
-        
-        student_id = teacher_student.id
+        student_id = current_user["workspace_id"]
     
-    # Check if data already exists
-    existing_data = db.query(StudentAppData).filter(
-        StudentAppData.student_id == student_id,
-        StudentAppData.app_key == app_data.app_key,
-        StudentAppData.data_key == app_data.data_key
-    ).first()
-    
-    if existing_data:
-        # Update existing data
-        existing_data.data_value = app_data.data_value
-        db.commit()
-        db.refresh(existing_data)
-        return StudentAppDataResponse(
-            app_key=existing_data.app_key,
-            data_key=existing_data.data_key,
-            data_value=existing_data.data_value,
-            created_at=existing_data.created_at,
-            updated_at=existing_data.updated_at
-        )
-    else:
-        # Create new data
-        db_app_data = StudentAppData(
-            student_id=student_id,
-            app_key=app_data.app_key,
-            data_key=app_data.data_key,
-            data_value=app_data.data_value
-        )
-        db.add(db_app_data)
-        db.commit()
-        db.refresh(db_app_data)
-        return StudentAppDataResponse(
-            app_key=db_app_data.app_key,
-            data_key=db_app_data.data_key,
-            data_value=db_app_data.data_value,
-            created_at=db_app_data.created_at,
-            updated_at=db_app_data.updated_at
-        )
+    # Insert or update in one statement
+    return await upsert_app_data(
+        db, student_id, app_data.app_key, app_data.data_key, app_data.data_value
+    )
+
+
+@app.post("/student/app-data/batch", response_model=List[StudentAppDataResponse], dependencies=[query_budget(4)])
+async def store_app_data_batch(
+    batch: StudentAppDataBatchCreate,
+    current_user: dict = Depends(get_current_student_or_teacher_for_write),
+    db: AsyncSession = Depends(get_db)
+):
+    """Store or update several app data keys in one transaction for the authenticated student or teacher"""
+    
+    # Determine the student_id to use
+    if current_user["role"] == "student":
+        student_id = current_user["student"].id
+    else:  # teacher
+        student_id = current_user["workspace_id"]
+    
+    return await upsert_app_data_batch(db, student_id, batch.items)
 
 
-@app.get("/student/app-data/{app_key}", response_model=List[StudentAppDataResponse])
+@app.post("/student/app-data/batch/get", response_model=List[StudentAppDataResponse], dependencies=[query_budget(4)])
+async def get_app_data_batch_by_keys(
+    query: StudentAppDataBatchQuery,
+    current_user: dict = Depends(get_current_student_or_teacher),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get an explicit list of app data keys in one query for the authenticated student or teacher"""
+    
+    # Determine the student_id to use
+    if current_user["role"] == "student":
+        student_id = current_user["student"].id
+    else:  # teacher
+        student_id = current_user["workspace_id"]
+        if student_id is None:
+            return []  # No data if no teacher workspace exists yet
+    
+    return models_response(StudentAppDataResponse, await get_app_data_batch(db, student_id, query.keys))
+
+
+@app.get("/student/app-data/{app_key}", response_model=List[StudentAppDataResponse], dependencies=[query_budget(5)])
 async def get_app_data_by_app(
     app_key: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_student_or_teacher),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all data for a specific app for the authenticated student or teacher"""
     
@@ -293,34 +458,32 @@ async def get_app_data_by_app(
     if current_user["role"] == "student":
         student_id = current_user["student"].id
     else:  # teacher
-        teacher_email = current_user["email"]
-        teacher_student = db.query(Student).filter(Student.email == teacher_email).first()
-        if not teacher_student:
-            return []  # No data if no teacher record exists yet
-        student_id = teacher_student.id
+        student_id = current_user["workspace_id"]
+        if student_id is None:
+            return []  # No data if no teacher workspace exists yet
+    
+    not_modified = await conditional_response(request, response, db, app_data_fingerprint(student_id, app_key))
+    if not_modified:
+        return not_modified
+    
+    result = await db.execute(
+        select(*RESPONSE_COLUMNS).where(
+            StudentAppData.student_id == student_id,
+            StudentAppData.app_key == app_key
+        )
+    )
     
-    app_data = db.query(StudentAppData).filter(
-        StudentAppData.student_id == student_id,
-        StudentAppData.app_key == app_key
-    ).all()
-    
-    return [
-        StudentAppDataResponse(
-            app_key=data.app_key,
-            data_key=data.data_key,
-            data_value=data.data_value,
-            created_at=data.created_at,
-            updated_at=data.updated_at
-        ) for data in app_data
-    ]
+    return rows_response(result, response)
 
 
-@app.get("/student/app-data/{app_key}/{data_key}", response_model=StudentAppDataResponse)
+@app.get("/student/app-data/{app_key}/{data_key}", response_model=StudentAppDataResponse, dependencies=[query_budget(5)])
 async def get_specific_app_data(
     app_key: str,
     data_key: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_student_or_teacher),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get specific data for an app and key for the authenticated student or teacher"""
     
@@ -328,228 +491,356 @@ async def get_specific_app_data(
     if current_user["role"] == "student":
         student_id = current_user["student"].id
     else:  # teacher
-        teacher_email = current_user["email"]
-        teacher_student = db.query(Student).filter(Student.email == teacher_email).first()
-        if not teacher_student:
+        student_id = current_user["workspace_id"]
+        if student_id is None:
             raise HTTPException(status_code=404, detail="App data not found")
-        student_id = teacher_student.id
     
-    app_data = db.query(StudentAppData).filter(
-        StudentAppData.student_id == student_id,
-        StudentAppData.app_key == app_key,
-        StudentAppData.data_key == data_key
-    ).first()
+    not_modified = await conditional_response(
+        request, response, db, app_data_fingerprint(student_id, app_key, data_key), not_found="App data not found"
+    )
+    if not_modified:
+        return not_modified
+    
+    app_data = (await db.execute(
+        select(*RESPONSE_COLUMNS).where(
+            StudentAppData.student_id == student_id,
+            StudentAppData.app_key == app_key,
+            StudentAppData.data_key == data_key
+        )
+    )).one_or_none()
     
     if not app_data:
         raise HTTPException(status_code=404, detail="App data not found")
     
-    return StudentAppDataResponse(
-        app_key=app_data.app_key,
-        data_key=app_data.data_key,
-        data_value=app_data.data_value,
-        created_at=app_data.created_at,
-        updated_at=app_data.updated_at
-    )
+    return row_response(app_data, response)
 
 
-@app.put("/student/app-data/{app_key}/{data_key}", response_model=StudentAppDataResponse)
+@app.put("/student/app-data/{app_key}/{data_key}", response_model=StudentAppDataResponse, dependencies=[query_budget(4)])
 async def update_app_data(
     app_key: str,
     data_key: str,
     update_data: StudentAppDataUpdate,
     current_student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update specific app data for the authenticated student"""
-    app_data = db.query(StudentAppData).filter(
-        StudentAppData.student_id == current_student.id,
-        StudentAppData.app_key == app_key,
-        StudentAppData.data_key == data_key
-    ).first()
+    app_data = await replace_app_data(
+        db, current_student.id, app_key, data_key, update_data.data_value
+    )
     
     if not app_data:
         raise HTTPException(status_code=404, detail="App data not found")
     
-    app_data.data_value = update_data.data_value
-    db.commit()
-    db.refresh(app_data)
+    return app_data
+
+
+@app.patch("/student/app-data/{app_key}/{data_key}", response_model=StudentAppDataResponse, dependencies=[query_budget(4)])
+async def patch_specific_app_data(
+    app_key: str,
+    data_key: str,
+    patch: StudentAppDataPatch,
+    current_student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db)
+):
+    """Partially update specific app data for the authenticated student"""
+    try:
+        app_data = await patch_app_data(db, current_student.id, app_key, data_key, patch)
+    except DBAPIError as e:
+        # Class 22 (data exception): operations that do not fit the stored
+        # document, e.g. incrementing a string
+        if not str(getattr(e.orig, "sqlstate", "")).startswith("22"):
+            raise
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Cannot apply patch: {e.orig.__cause__ or e.orig}")
     
-    return StudentAppDataResponse(
-        app_key=app_data.app_key,
-        data_key=app_data.data_key,
-        data_value=app_data.data_value,
-        created_at=app_data.created_at,
-        updated_at=app_data.updated_at
-    )
+    if not app_data:
+        raise HTTPException(status_code=404, detail="App data not found")
+    
+    return app_data
 
 
-@app.delete("/student/app-data/{app_key}/{data_key}")
+@app.delete("/student/app-data/{app_key}/{data_key}", dependencies=[query_budget(5)])
 async def delete_app_data(
     app_key: str,
     data_key: str,
     current_student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete specific app data for the authenticated student"""
-    app_data = db.query(StudentAppData).filter(
-        StudentAppData.student_id == current_student.id,
-        StudentAppData.app_key == app_key,
-        StudentAppData.data_key == data_key
-    ).first()
+    app_data = await db.scalar(
+        select(StudentAppData).where(
+            StudentAppData.student_id == current_student.id,
+            StudentAppData.app_key == app_key,
+            StudentAppData.data_key == data_key
+        )
+    )
     
     if not app_data:
         raise HTTPException(status_code=404, detail="App data not found")
     
-    db.delete(app_data)
-    db.commit()
+    await db.delete(app_data)
+    await db.commit()
     
     return {"message": "App data deleted successfully"}
 
 
-@app.delete("/student/app-data/{app_key}")
+@app.delete("/student/app-data/{app_key}", dependencies=[query_budget(5)])
 async def delete_app_data_by_app(
     app_key: str,
     current_student: Student = Depends(get_current_student),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete all data for a specific app for the authenticated student"""
-    app_data_count = db.query(StudentAppData).filter(
-        StudentAppData.student_id == current_student.id,
-        StudentAppData.app_key == app_key
-    ).count()
+    app_data_count = await db.scalar(
+        select(func.count()).select_from(StudentAppData).where(
+            StudentAppData.student_id == current_student.id,
+            StudentAppData.app_key == app_key
+        )
+    )
     
     if app_data_count == 0:
         raise HTTPException(status_code=404, detail="No app data found for this app")
     
-    db.query(StudentAppData).filter(
-        StudentAppData.student_id == current_student.id,
-        StudentAppData.app_key == app_key
-    ).delete()
-    db.commit()
+    await db.execute(
+        delete(StudentAppData).where(
+            StudentAppData.student_id == current_student.id,
+            StudentAppData.app_key == app_key
+        )
+    )
+    await db.commit()
     
     return {"message": f"Deleted {app_data_count} app data records"}
 
 
 # Cross-user app data endpoints (for teachers accessing student data)
-@app.post("/app-data/{student_id}", response_model=StudentAppDataResponse)
+@app.post("/app-data/{student_id}", response_model=StudentAppDataResponse, dependencies=[query_budget(1)])
 async def store_student_app_data(
     student_id: str,
     app_data: StudentAppDataCreate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Store or update app data for any student (teachers can access student data)"""
-    # Verify student exists
-    student = db.query(Student).filter(Student.id == student_id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    
-    # Check if data already exists
-    existing_data = db.query(StudentAppData).filter(
-        StudentAppData.student_id == student_id,
-        StudentAppData.app_key == app_data.app_key,
-        StudentAppData.data_key == app_data.data_key
-    ).first()
-    
-    if existing_data:
-        # Update existing data
-        existing_data.data_value = app_data.data_value
-        db.commit()
-        db.refresh(existing_data)
-        return StudentAppDataResponse(
-            app_key=existing_data.app_key,
-            data_key=existing_data.data_key,
-            data_value=existing_data.data_value,
-            created_at=existing_data.created_at,
-            updated_at=existing_data.updated_at
-        )
-    else:
-        # Create new data
-        db_app_data = StudentAppData(
-            student_id=student_id,
-            app_key=app_data.app_key,
-            data_key=app_data.data_key,
-            data_value=app_data.data_value
-        )
-        db.add(db_app_data)
-        db.commit()
-        db.refresh(db_app_data)
-        return StudentAppDataResponse(
-            app_key=db_app_data.app_key,
-            data_key=db_app_data.data_key,
-            data_value=db_app_data.data_value,
-            created_at=db_app_data.created_at,
-            updated_at=db_app_data.updated_at
+    # Insert or update in one statement; the student_id foreign key
+    # verifies the student exists
+    try:
+        return await upsert_app_data(
+            db, student_id, app_data.app_key, app_data.data_key, app_data.data_value
         )
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Student not found")
 
 
-@app.get("/app-data/{student_id}/{app_key}", response_model=List[StudentAppDataResponse])
+@app.get("/app-data/{student_id}/{app_key}", response_model=List[StudentAppDataResponse], dependencies=[query_budget(3)])
 async def get_student_app_data_by_app(
     student_id: str,
     app_key: str,
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all app data for a specific student and app (teachers can access student data)"""
+    """Get app data for a specific student and app, ordered by data_key (keyset paginated)"""
     # Verify student exists
-    student = db.query(Student).filter(Student.id == student_id).first()
+    student = await db.scalar(select(Student).where(Student.id == student_id))
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    app_data = db.query(StudentAppData).filter(
+    not_modified = await conditional_response(request, response, db, app_data_fingerprint(student_id, app_key))
+    if not_modified:
+        return not_modified
+    
+    query = select(*RESPONSE_COLUMNS).where(
         StudentAppData.student_id == student_id,
         StudentAppData.app_key == app_key
-    ).all()
-    
-    return [
-        StudentAppDataResponse(
-            app_key=data.app_key,
-            data_key=data.data_key,
-            data_value=data.data_value,
-            created_at=data.created_at,
-            updated_at=data.updated_at
-        ) for data in app_data
-    ]
+    )
+    
+    if page.cursor:
+        last_data_key, = decode_cursor(page.cursor, 1)
+        query = query.where(StudentAppData.data_key > last_data_key)
+    
+    result = await db.execute(
+        query.order_by(StudentAppData.data_key).limit(page.limit + 1)
+    )
+    app_data = next_page(result.all(), page, response, lambda d: (d.data_key,))
+    
+    return rows_response(app_data, response)
 
 
-@app.get("/app-data/{student_id}/{app_key}/{data_key}", response_model=StudentAppDataResponse)
+@app.get("/app-data/{student_id}/{app_key}/{data_key}", response_model=StudentAppDataResponse, dependencies=[query_budget(2)])
 async def get_specific_student_app_data(
     student_id: str,
     app_key: str,
     data_key: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get specific app data for any student (teachers can access student data)"""
-    app_data = db.query(StudentAppData).filter(
-        StudentAppData.student_id == student_id,
-        StudentAppData.app_key == app_key,
-        StudentAppData.data_key == data_key
-    ).first()
+    not_modified = await conditional_response(
+        request, response, db, app_data_fingerprint(student_id, app_key, data_key), not_found="App data not found"
+    )
+    if not_modified:
+        return not_modified
+    
+    app_data = (await db.execute(
+        select(*RESPONSE_COLUMNS).where(
+            StudentAppData.student_id == student_id,
+            StudentAppData.app_key == app_key,
+            StudentAppData.data_key == data_key
+        )
+    )).one_or_none()
     
     if not app_data:
         raise HTTPException(status_code=404, detail="App data not found")
     
-    return StudentAppDataResponse(
-        app_key=app_data.app_key,
-        data_key=app_data.data_key,
-        data_value=app_data.data_value,
-        created_at=app_data.created_at,
-        updated_at=app_data.updated_at
-    )
+    return row_response(app_data, response)
 
 
-@app.get("/students", response_model=List[StudentProfile])
+@app.get("/students", response_model=List[StudentProfile], dependencies=[query_budget(1)])
 async def get_all_students(
+    response: Response,
+    page: PageParams = Depends(),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all students (for teachers to see their students)"""
-    students = db.query(Student).options(
+    """Get students ordered by id (for teachers to see their students, keyset paginated)"""
+    query = select(Student).options(
         joinedload(Student.school)
-    ).all()
+    )
+    
+    if page.cursor:
+        last_id, = decode_cursor(page.cursor, 1)
+        query = query.where(Student.id > cursor_uuid(last_id))
+    
+    result = await db.execute(
+        query.order_by(Student.id).limit(page.limit + 1)
+    )
+    students = result.scalars().all()
+    
+    students = next_page(students, page, response, lambda s: (s.id,))
+    return models_response(StudentProfile, students, response)
+
+
+# Class analytics endpoints
+@app.get("/class/{class_id}/gradebook", response_model=ClassGradebook, dependencies=[query_budget(5)])
+async def get_class_gradebook(
+    class_id: uuid_lib.UUID,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_teacher),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get per-assignment score statistics and per-student totals for a class (teachers only)"""
+    not_modified = await conditional_response(request, response, db, gradebook_fingerprint(class_id))
+    if not_modified:
+        return not_modified
+    
+    # The fingerprint ETag doubles as the cache version: any submission change recomputes
+    body = await gradebook_json(db, class_id, response.headers["etag"])
+    if body is None:
+        raise HTTPException(status_code=404, detail="Class not found")
+    
+    return json_response(body, response)
+
+
+# Bulk export endpoints (streamed NDJSON, one JSON object per line)
+@app.get("/export/students")
+async def export_all_students(current_user: dict = Depends(get_current_teacher)):
+    """Stream every student with school information as NDJSON"""
+    return StreamingResponse(await export_students(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.get("/export/submissions")
+async def export_all_submissions(
+    class_id: Optional[uuid_lib.UUID] = None,
+    current_user: dict = Depends(get_current_teacher)
+):
+    """Stream every submission, optionally limited to one class, as NDJSON"""
+    return StreamingResponse(await export_submissions(class_id), media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.get("/export/app-data")
+async def export_all_app_data(
+    app_key: Optional[str] = None,
+    current_user: dict = Depends(get_current_teacher)
+):
+    """Stream every student app data record, optionally limited to one app, as NDJSON"""
+    return StreamingResponse(await export_app_data(app_key), media_type=NDJSON_MEDIA_TYPE)
+
+
+# Live change events (Server-Sent Events fed by Postgres LISTEN/NOTIFY)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.get("/events/student/{student_id}")
+async def stream_student_events(
+    student_id: uuid_lib.UUID,
+    app_key: Optional[str] = Query(None, description="Only app data events for this app (submission events are always sent)"),
+    current_user: dict = Depends(get_stream_user),
+    payload: dict = Depends(get_stream_token_payload),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream a student's app data and submission changes as Server-Sent Events
+
+    Students may only stream their own events; teachers may stream any student's.
+    """
+    if current_user["role"] != "teacher":
+        student = await resolve_student(payload, db)
+        if student.id != student_id:
+            raise HTTPException(
+                status_code=403,
+                detail="Access denied. Students can only stream their own events"
+            )
+    
+    if not await db.scalar(select(Student.id).where(Student.id == student_id)):
+        raise HTTPException(status_code=404, detail="Student not found")
     
-    return students
+    def accept(event: dict) -> bool:
+        return app_key is None or event.get("table") != "student_app_data" or event.get("app_key") == app_key
+    
+    subscription = await hub.subscribe([f"student:{student_id}"], accept)
+    return StreamingResponse(event_stream(subscription), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@app.get("/events/class/{class_id}")
+async def stream_class_events(
+    class_id: uuid_lib.UUID,
+    app_key: Optional[str] = Query(None, description="Only app data events for this app"),
+    current_user: dict = Depends(get_stream_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream submission changes and enrolled students' app data changes for a class (teachers only)"""
+    if current_user["role"] != "teacher":
+        raise HTTPException(
+            status_code=403,
+            detail=f"Access denied. User role is '{current_user['role']}', expected 'teacher'"
+        )
+    
+    if not await db.scalar(select(Class.id).where(Class.id == class_id)):
+        raise HTTPException(status_code=404, detail="Class not found")
+    
+    # Students enrolled when the stream opens; reconnect to pick up roster changes
+    student_ids = (await db.execute(
+        select(Enrollment.student_id).where(
+            Enrollment.class_id == class_id,
+            Enrollment.enrollment_status == "active"
+        )
+    )).scalars().all()
+    
+    def accept(event: dict) -> bool:
+        if event.get("table") == "submissions":
+            # Student subscriptions also carry their submissions in other classes
+            return event.get("class_id") == str(class_id)
+        return app_key is None or event.get("app_key") == app_key
+    
+    subscription = await hub.subscribe(
+        [f"class:{class_id}"] + [f"student:{student_id}" for student_id in student_ids], accept
+    )
+    return StreamingResponse(event_stream(subscription), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,257 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+import math
+import os
+import time
+from .cache import cache_stats
+from .database import QueryStats, current_query_stats, pool_stats
+from .events import hub
+from .query_budget import enforce_query_budget, records_statements
+
+load_dotenv()
+
+# Prometheus text exposition (version 0.0.4), kept in process. Each worker
+# serves its own counters, so scrape every worker (or run one per container).
+
+# Bearer token required by /metrics when set
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+LabelValues = Tuple[str, ...]
+
+# Every metric, in exposition order
+REGISTRY: list = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # label values -> [per-bucket counts (not cumulative), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+        self._lock = Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class CallbackCollector:
+    """Values read from other modules' stats at scrape time
+
+    The callback yields (name, help, type, labels dict, value) tuples.
+    """
+
+    def __init__(self, collect: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+        self._collect = collect
+        REGISTRY.append(self)
+
+    def collect(self) -> List[str]:
+        lines = []
+        seen = set()
+        for name, documentation, type_, labels, value in sorted(self._collect(), key=lambda g: g[0]):
+            if name not in seen:
+                seen.add(name)
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {type_}"]
+            lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(float(value))}")
+        return lines
+
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte", ("method", "route")
+)
+REQUEST_SIZE = Histogram(
+    "http_request_size_bytes", "Request body size (Content-Length)", ("method", "route"), SIZE_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size as sent", ("method", "route"), SIZE_BUCKETS
+)
+DB_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements executed per request", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds", "Time spent executing SQL statements per request", ("method", "route")
+)
+QUERY_BUDGET_VIOLATIONS = Counter(
+    "db_query_budget_exceeded_total", "Requests that ran more SQL statements than their route's budget", ("method", "route")
+)
+AUTH_DURATION = Histogram(
+    "auth_token_verification_seconds", "JWT verification time by outcome (cached, verified, rejected)", ("result",)
+)
+
+
+def observe_auth(started: float, result: str) -> None:
+    AUTH_DURATION.observe(time.perf_counter() - started, result=result)
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.collect()
+    return "\n".join(lines) + "\n"
+
+
+def route_label(scope) -> str:
+    """Route template (e.g. /app-data/{student_id}/{app_key}) so label values stay bounded"""
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, sizes and per-request SQL statement counts and time"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = QueryStats(record_statements=records_statements())
+        token = current_query_stats.set(stats)
+        status = 500
+        sent = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            current_query_stats.reset(token)
+            method = scope["method"]
+            route = route_label(scope)
+            REQUESTS.inc(method=method, route=route, status=status)
+            REQUEST_DURATION.observe(time.perf_counter() - started, method=method, route=route)
+            REQUEST_SIZE.observe(_content_length(scope), method=method, route=route)
+            RESPONSE_SIZE.observe(sent, method=method, route=route)
+            DB_QUERIES.observe(stats.count, method=method, route=route)
+            DB_TIME.observe(stats.seconds, method=method, route=route)
+
+        # Checked once the response is sent: in raise mode the error surfaces
+        # in the test client (or server log) without changing what was sent
+        if stats.budget is not None and stats.count > stats.budget:
+            QUERY_BUDGET_VIOLATIONS.inc(method=method, route=route)
+            enforce_query_budget(stats, method, route)
+
+
+def _content_length(scope) -> int:
+    for name, value in scope.get("headers", ()):
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+# Ever-increasing values in the stats() dicts; everything else is a gauge
+_COUNTER_STATS = {
+    "admitted_total", "rejected_total", "admission_wait_seconds_total", "export_rejected_total",
+    "hits", "misses", "evictions", "shared_hits", "shared_misses", "invalidations_received",
+    "notifications_received"
+}
+
+
+def _stat(prefix: str, name: str, value, documentation: str, labels: Optional[Dict[str, str]] = None):
+    labels = labels or {}
+    if name in _COUNTER_STATS:
+        metric = f"{prefix}_{name}" if name.endswith("_total") else f"{prefix}_{name}_total"
+        return metric, documentation, "counter", labels, value
+    return f"{prefix}_{name}", documentation, "gauge", labels, value
+
+
+def _runtime_stats():
+    """Connection pool, admission, cache and event stream state at scrape time"""
+    for name, value in pool_stats().items():
+        yield _stat("db", name, value, f"Database pool/admission: {name.replace('_', ' ')}")
+
+    for namespace, counters in cache_stats()["caches"].items():
+        for name, value in counters.items():
+            yield _stat("cache", name, value, f"Cache {name.replace('_', ' ')} per namespace", {"namespace": namespace})
+
+    for name, value in hub.stats().items():
+        yield _stat("events", name, value, f"Live event streams: {name.replace('_', ' ')}")
+
+
+CallbackCollector(_runtime_stats)
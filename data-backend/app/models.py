@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, DECIMAL, ForeignKey, Boolean
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Text, DECIMAL, ForeignKey, Boolean, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
+from decimal import Decimal
 import uuid
 
 
@@ -12,6 +13,7 @@ class School(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False)
     district = Column(String(255))
+    sis_id = Column(String(255), unique=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -26,12 +28,14 @@ class Student(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     school_id = Column(UUID(as_uuid=True), ForeignKey("schools.id"), nullable=False)
-    supabase_user_id = Column(UUID(as_uuid=True), unique=True, nullable=False)
+    supabase_user_id = Column(UUID(as_uuid=True), unique=True)
     email = Column(String(255), nullable=False, unique=True)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     student_number = Column(String(50))
     grade_level = Column(Integer)
+    username = Column(String(50))
+    sis_id = Column(String(255), unique=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -51,6 +55,8 @@ class Teacher(Base):
     email = Column(String(255), nullable=False)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
+    username = Column(String(50))
+    sis_id = Column(String(255), unique=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -69,6 +75,7 @@ class Class(Base):
     subject = Column(String(100))
     semester = Column(String(50))
     academic_year = Column(String(10))
+    sis_id = Column(String(255), unique=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -87,6 +94,7 @@ class Enrollment(Base):
     class_id = Column(UUID(as_uuid=True), ForeignKey("classes.id"), nullable=False)
     enrollment_status = Column(String(20), default="active")
     enrolled_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
     student = relationship("Student", back_populates="enrollments")
@@ -130,6 +138,9 @@ class Submission(Base):
 
 class StudentAppData(Base):
     __tablename__ = "student_app_data"
+    __table_args__ = (
+        UniqueConstraint("student_id", "app_key", "data_key"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     student_id = Column(UUID(as_uuid=True), ForeignKey("students.id"), nullable=False)
@@ -140,4 +151,51 @@ class StudentAppData(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    student = relationship("Student", back_populates="app_data")
\ No newline at end of file
+    student = relationship("Student", back_populates="app_data")
+
+class StudentGradeSummary(Base):
+    """Read model maintained by triggers on submissions (see the grade summaries migration)"""
+    __tablename__ = "student_grade_summaries"
+    
+    student_id = Column(UUID(as_uuid=True), ForeignKey("students.id"), primary_key=True)
+    class_id = Column(UUID(as_uuid=True), ForeignKey("classes.id"), primary_key=True)
+    submission_count = Column(Integer, nullable=False, default=0)
+    graded_count = Column(Integer, nullable=False, default=0)
+    score_total = Column(DECIMAL(12, 2), nullable=False, default=0)
+    points_possible_total = Column(Integer, nullable=False, default=0)
+    latest_letter_grade = Column(String(5))
+    latest_submitted_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    student = relationship("Student")
+    class_ = relationship("Class")
+    
+    @property
+    def average_percent(self):
+        """score_total as a percentage of points_possible_total"""
+        if not self.points_possible_total:
+            return None
+        return (Decimal(self.score_total) * 100 / self.points_possible_total).quantize(Decimal("0.01"))
+
+
+class ClassCatalogVersion(Base):
+    """Catalog cache versions maintained by triggers (see the class catalog versions migration)"""
+    __tablename__ = "class_catalog_versions"
+    
+    class_id = Column(UUID(as_uuid=True), ForeignKey("classes.id"), primary_key=True)
+    class_version = Column(BigInteger, nullable=False)
+    assignments_version = Column(BigInteger, nullable=False)
+
+class DeletedRecord(Base):
+    """Tombstone written by the record_deletions triggers (see the change feeds migration)"""
+    __tablename__ = "deleted_records"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    table_name = Column(Text, nullable=False)
+    record_id = Column(UUID(as_uuid=True), nullable=False)
+    student_id = Column(UUID(as_uuid=True))
+    class_id = Column(UUID(as_uuid=True))
+    app_key = Column(String(100))
+    data_key = Column(String(200))
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,103 @@
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_
+from typing import Any, Callable, List, Optional, Sequence
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+import base64
+import json
+import os
+import uuid
+
+load_dotenv()
+
+# Page size configuration for list endpoints
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Query parameters shared by keyset-paginated endpoints"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description=f"Value of the {NEXT_CURSOR_HEADER} header from the previous page")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps([None if value is None else str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Optional[str]]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    if (not isinstance(values, list) or len(values) != size
+            or not all(value is None or isinstance(value, str) for value in values)):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    return values
+
+
+def cursor_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a datetime sort key from a decoded cursor"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def cursor_uuid(value: Optional[str]) -> uuid.UUID:
+    """Parse an id sort key from a decoded cursor"""
+    try:
+        return uuid.UUID(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def after_desc(column, id_column, value, last_id):
+    """Keyset condition for rows after (value, last_id) in ORDER BY column DESC, id DESC
+
+    Postgres sorts NULLs first in descending order, so NULL values come
+    before every non-NULL value.
+    """
+    if value is None:
+        return or_(and_(column.is_(None), id_column < last_id), column.is_not(None))
+    return or_(column < value, and_(column == value, id_column < last_id))
+
+
+def desc_sort_key(value, row_id):
+    """Python sort key matching ORDER BY value DESC, id DESC (use with reverse=True)
+
+    For pages assembled in memory; like after_desc, NULL values sort first.
+    """
+    if value is None:
+        return (True, datetime.min.replace(tzinfo=timezone.utc), row_id)
+    return (False, value, row_id)
+
+
+def next_page(
+    rows: Sequence[Any],
+    page: PageParams,
+    response: Response,
+    cursor_for: Callable[[Any], Sequence[Any]]
+) -> Sequence[Any]:
+    """Trim the look-ahead row (queries fetch limit + 1) and set the next cursor header"""
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(cursor_for(rows[-1]))
+    return rows
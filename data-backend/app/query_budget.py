@@ -0,0 +1,66 @@
+from collections import Counter
+from fastapi import Depends
+from dotenv import load_dotenv
+import os
+from .database import QueryStats, current_query_stats
+
+load_dotenv()
+
+# What happens when a request runs more SQL statements than its route allows:
+# "log" (production), "raise" (tests and benchmarks: the request errors) or "off"
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")
+
+if QUERY_BUDGET_MODE not in ("off", "log", "raise"):
+    raise ValueError(f"Unknown QUERY_BUDGET_MODE '{QUERY_BUDGET_MODE}' (expected 'off', 'log' or 'raise')")
+
+
+def records_statements() -> bool:
+    """Whether requests keep their statement texts, to name the repeated one in raise mode"""
+    return QUERY_BUDGET_MODE == "raise"
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request executed more SQL statements than its route's budget (likely an N+1 query)"""
+
+
+def query_budget(max_queries: int):
+    """Route dependency declaring the most SQL statements one request may execute
+
+    Budgets are for the worst case, i.e. with every cache cold, including
+    the statements authentication runs. Usage:
+
+        @app.get("/path", dependencies=[query_budget(3)])
+    """
+    async def declare_budget():
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return Depends(declare_budget)
+
+
+def budget_violation(stats: QueryStats, method: str, route: str):
+    """Describe a budget overrun, or None if the request stayed within its budget"""
+    if stats.budget is None or stats.count <= stats.budget:
+        return None
+
+    message = f"{method} {route} executed {stats.count} SQL statements (budget {stats.budget})"
+    if stats.statements:
+        statement, repeats = Counter(stats.statements).most_common(1)[0]
+        if repeats > 1:
+            message += f"; ran {repeats} times: {' '.join(statement.split())[:300]}"
+    return message
+
+
+def enforce_query_budget(stats: QueryStats, method: str, route: str) -> bool:
+    """Log or raise for a request that exceeded its budget; returns True on a violation"""
+    if QUERY_BUDGET_MODE == "off":
+        return False
+
+    message = budget_violation(stats, method, route)
+    if message is None:
+        return False
+    if QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(message)
+    print(f"Query budget exceeded: {message}")
+    return True
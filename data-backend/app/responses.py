@@ -0,0 +1,76 @@
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from decimal import Decimal
+from typing import Any, Iterable, List, Optional, Type, Union
+import orjson
+
+# Fast response path for read endpoints. FastAPI normally validates a
+# returned value against response_model, dumps it to Python objects and
+# encodes those with the stdlib json module. Data that is already trusted
+# (validated models, RETURNING rows) can skip all of that: endpoints opt in by
+# returning one of these responses, while response_model still documents the
+# shape in OpenAPI. Output is byte-for-byte what the default path produces.
+
+
+def _default(value: Any) -> Any:
+    # Pydantic serialises Decimal (submission scores) as a string
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-encoded response formatted like pydantic (UTC as Z, Decimal as string)"""
+
+    def render(self, content: Any) -> bytes:
+        try:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits inside JSONB values
+            return to_json(content)
+
+
+def _forward_headers(response: Optional[Response]) -> Optional[dict]:
+    """Headers set on the injected Response (ETag, X-Next-Cursor, ...)"""
+    if response is None:
+        return None
+    return {key: value for key, value in response.headers.items() if key != "content-length"}
+
+
+def rows_response(rows: Iterable[Any], response: Optional[Response] = None) -> FastJSONResponse:
+    """Encode SQL rows (e.g. select(*RESPONSE_COLUMNS)) directly, without building models"""
+    return FastJSONResponse([row._asdict() for row in rows], headers=_forward_headers(response))
+
+
+def row_response(row: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    return FastJSONResponse(row._asdict(), headers=_forward_headers(response))
+
+
+_list_adapters = {}
+
+
+def _list_adapter(schema: Type) -> TypeAdapter:
+    adapter = _list_adapters.get(schema)
+    if adapter is None:
+        adapter = _list_adapters[schema] = TypeAdapter(List[schema])
+    return adapter
+
+
+def json_response(body: Union[str, bytes], response: Optional[Response] = None) -> Response:
+    """Send an already serialised JSON body"""
+    return Response(body, media_type="application/json", headers=_forward_headers(response))
+
+
+def model_response(model: Any, response: Optional[Response] = None) -> Response:
+    """Serialise an already validated pydantic model without re-validating it"""
+    return json_response(model.model_dump_json(), response)
+
+
+def models_response(schema: Type, items: List[Any], response: Optional[Response] = None) -> Response:
+    """Serialise a list as List[schema]; ORM objects are validated once, models not at all"""
+    adapter = _list_adapter(schema)
+    if not all(isinstance(item, schema) for item in items):
+        items = adapter.validate_python(items, from_attributes=True)
+    return json_response(adapter.dump_json(items), response)
@@ -0,0 +1,291 @@
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+import asyncpg
+import csv
+import os
+import time
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Bulk roster sync from SIS exports. Each file is COPYed into a temp staging
+# table and merged with one INSERT ... ON CONFLICT per entity, keyed on the
+# source system's sis_id, so the cost is a handful of set-based statements no
+# matter how many rows the district has. Rows that already match are left
+# alone (no write, no updated_at bump), which makes re-running a sync a no-op.
+
+# Entities in dependency order. Plain columns are copied as is; references
+# are resolved to ids through the parent's sis_id (rows whose parent is
+# unknown are skipped). Columns missing from a file are never overwritten,
+# except those with a default, which is applied to every listed row (so an
+# enrollment deactivated by an earlier snapshot becomes active again).
+ENTITIES = {
+    "schools": {
+        "table": "schools",
+        "key": ("sis_id",),
+        "columns": {"sis_id": "text", "name": "text", "district": "text"},
+        "required": ("sis_id", "name"),
+        "references": {}
+    },
+    "teachers": {
+        "table": "teachers",
+        "key": ("sis_id",),
+        "columns": {
+            "sis_id": "text", "email": "text", "first_name": "text", "last_name": "text", "username": "text"
+        },
+        "required": ("sis_id", "first_name", "last_name"),
+        "references": {"school_sis_id": ("school_id", "schools")}
+    },
+    "students": {
+        "table": "students",
+        "key": ("sis_id",),
+        "columns": {
+            "sis_id": "text", "email": "text", "first_name": "text", "last_name": "text",
+            "student_number": "text", "grade_level": "integer", "username": "text"
+        },
+        "required": ("sis_id", "first_name", "last_name"),
+        "references": {"school_sis_id": ("school_id", "schools")}
+    },
+    "classes": {
+        "table": "classes",
+        "key": ("sis_id",),
+        "columns": {
+            "sis_id": "text", "name": "text", "subject": "text", "semester": "text", "academic_year": "text"
+        },
+        "required": ("sis_id", "name"),
+        "references": {
+            "school_sis_id": ("school_id", "schools"),
+            "teacher_sis_id": ("teacher_id", "teachers")
+        }
+    },
+    "enrollments": {
+        "table": "enrollments",
+        "key": ("student_id", "class_id"),
+        "columns": {"enrollment_status": "text"},
+        "required": (),
+        "defaults": {"enrollment_status": "'active'"},
+        "references": {
+            "student_sis_id": ("student_id", "students"),
+            "class_sis_id": ("class_id", "classes")
+        }
+    }
+}
+
+# Status given to enrollments of SIS-managed classes that are missing from enrollments.csv
+INACTIVE_STATUS = "inactive"
+
+
+def read_header(path: str) -> List[str]:
+    """Column names from the first line of a CSV file"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), None)
+    if not header:
+        raise ValueError(f"{path} is empty")
+    return [column.strip() for column in header]
+
+
+def check_header(entity: str, path: str) -> List[str]:
+    """Validate a file's header against the entity; returns the columns in file order"""
+    spec = ENTITIES[entity]
+    known = set(spec["columns"]) | set(spec["references"])
+    header = read_header(path)
+
+    unknown = [column for column in header if column not in known]
+    if unknown:
+        raise ValueError(f"{path}: unknown columns {', '.join(unknown)}")
+    if len(set(header)) != len(header):
+        raise ValueError(f"{path}: duplicate columns")
+
+    required = set(spec["required"]) | set(spec["references"])
+    missing = sorted(required - set(header))
+    if missing:
+        raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+    return header
+
+
+def staging_table_sql(entity: str) -> str:
+    spec = ENTITIES[entity]
+    columns = [f"{name} {type_}" for name, type_ in spec["columns"].items()]
+    columns += [f"{name} text" for name in spec["references"]]
+    # line keeps file order so the last of several rows for one key wins
+    return (
+        f"create temp table roster_{entity} ("
+        f"line bigint generated always as identity, {', '.join(columns)}"
+        f") on commit drop"
+    )
+
+
+def merge_sql(entity: str, header: List[str]) -> str:
+    """One INSERT ... ON CONFLICT that applies the staged rows and counts what changed"""
+    spec = ENTITIES[entity]
+    defaults = spec.get("defaults", {})
+
+    # target column -> expression over the staging row and joined parents
+    values = {}
+    joins = []
+    for column in spec["columns"]:
+        if column in defaults:
+            values[column] = f"coalesce(r.{column}, {defaults[column]})"
+        else:
+            values[column] = f"r.{column}"
+    for index, (column, (target, parent)) in enumerate(spec["references"].items()):
+        alias = f"p{index}"
+        joins.append(f"join public.{parent} {alias} on {alias}.sis_id = r.{column}")
+        values[target] = f"{alias}.id"
+
+    # Defaulted columns always have a value, whether or not the file has them
+    present = {column for column in header if column in spec["columns"]} | set(defaults)
+    present |= {target for column, (target, _) in spec["references"].items() if column in header}
+    updates = [column for column in values if column in present and column not in spec["key"]]
+
+    key = ", ".join(spec["key"])
+    key_values = ", ".join(values[column] for column in spec["key"])
+    targets = ", ".join(values)
+    where = " and ".join(f"r.{column} is not null" for column in spec["required"]) or "true"
+
+    if updates:
+        conflict = (
+            f"do update set {', '.join(f'{column} = excluded.{column}' for column in updates)} "
+            f"where ({', '.join(f't.{column}' for column in updates)}) "
+            f"is distinct from ({', '.join(f'excluded.{column}' for column in updates)})"
+        )
+    else:
+        conflict = "do nothing"
+
+    return f"""
+        with source as (
+            select distinct on ({key_values}) {', '.join(f'{expr} as {column}' for column, expr in values.items())}
+            from roster_{entity} r
+            {' '.join(joins)}
+            where {where}
+            order by {key_values}, r.line desc
+        ),
+        merged as (
+            insert into public.{spec['table']} as t ({targets})
+            select {targets} from source
+            on conflict ({key}) {conflict}
+            returning (xmax = 0) as inserted
+        )
+        select (select count(*) from source) as matched,
+               count(*) filter (where inserted) as inserted,
+               count(*) filter (where not inserted) as updated
+        from merged
+    """
+
+
+# Enrollments of SIS-managed classes that the export no longer lists
+DEACTIVATE_SQL = f"""
+    update public.enrollments e set enrollment_status = '{INACTIVE_STATUS}'
+    from public.classes c
+    where c.id = e.class_id
+      and c.sis_id is not null
+      and e.enrollment_status is distinct from '{INACTIVE_STATUS}'
+      and not exists (
+          select 1 from roster_enrollments r
+          join public.students s on s.sis_id = r.student_sis_id
+          where r.class_sis_id = c.sis_id and s.id = e.student_id
+      )
+"""
+
+
+async def sync_roster(
+    files: Dict[str, str],
+    deactivate_missing: bool = True,
+    dry_run: bool = False,
+    database_url: Optional[str] = None
+) -> Dict[str, dict]:
+    """Sync roster CSV files ({entity: path}) in one transaction; returns per-entity counts
+
+    Any subset of ENTITIES may be given; parents that are not in this sync
+    must already exist with their sis_id. With deactivate_missing,
+    enrollments.csv is treated as a full snapshot: enrollments in
+    SIS-managed classes that it does not list are marked inactive.
+    """
+    unknown = set(files) - set(ENTITIES)
+    if unknown:
+        raise ValueError(f"Unknown roster entities: {', '.join(sorted(unknown))}")
+
+    headers = {entity: check_header(entity, path) for entity, path in files.items()}
+    stats = {}
+
+    conn = await asyncpg.connect(database_url or DATABASE_URL, server_settings={"timezone": "UTC"})
+    try:
+        tr = conn.transaction()
+        await tr.start()
+        try:
+            # Concurrent syncs would race on the same keys; run them one at a time
+            await conn.execute("select pg_advisory_xact_lock(hashtext('roster_sync'))")
+
+            for entity in ENTITIES:
+                if entity not in files:
+                    continue
+                started = time.perf_counter()
+
+                await conn.execute(staging_table_sql(entity))
+                copied = await conn.copy_to_table(
+                    f"roster_{entity}",
+                    source=files[entity],
+                    columns=headers[entity],
+                    format="csv",
+                    header=True,
+                    encoding="utf8"
+                )
+                staged = int(copied.split()[-1])
+                if entity == "enrollments":
+                    await conn.execute("create index on roster_enrollments (class_sis_id, student_sis_id)")
+                await conn.execute(f"analyze roster_{entity}")
+
+                row = await conn.fetchrow(merge_sql(entity, headers[entity]))
+                stats[entity] = {
+                    "staged": staged,
+                    "inserted": row["inserted"],
+                    "updated": row["updated"],
+                    "unchanged": row["matched"] - row["inserted"] - row["updated"],
+                    "skipped": staged - row["matched"]
+                }
+
+                if entity == "enrollments":
+                    deactivated = 0
+                    # An empty export is far more likely a broken file than a district with no enrollments
+                    if deactivate_missing and staged:
+                        deactivated = int((await conn.execute(DEACTIVATE_SQL)).split()[-1])
+                    stats[entity]["deactivated"] = deactivated
+
+                stats[entity]["seconds"] = round(time.perf_counter() - started, 3)
+        except BaseException:
+            await tr.rollback()
+            raise
+        else:
+            if dry_run:
+                await tr.rollback()
+            else:
+                await tr.commit()
+    finally:
+        await conn.close()
+
+    if not dry_run and any(
+        entity_stats["inserted"] or entity_stats["updated"] or entity_stats.get("deactivated")
+        for entity_stats in stats.values()
+    ):
+        await invalidate_roster_caches()
+
+    return stats
+
+
+async def invalidate_roster_caches() -> None:
+    """Drop cached students, classes and teacher lookups after a sync
+
+    The sync writes with plain SQL, so the ORM listeners that normally keep
+    these caches fresh never fire. With a shared backend this also reaches
+    every API worker; with the memory backend workers catch up within the
+    cache TTLs.
+    """
+    from .auth import student_cache, teacher_workspace_cache
+    from .cache import flush_pending
+    from .catalog import assignment_cache, class_cache
+    from .gradebook import gradebook_cache
+
+    for cache in (student_cache, teacher_workspace_cache, class_cache, assignment_cache, gradebook_cache):
+        cache.clear()
+    await flush_pending()
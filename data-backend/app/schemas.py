@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Any, Dict
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Any, Dict, Literal, Union
 from datetime import datetime
 from decimal import Decimal
 import uuid
@@ -144,6 +144,63 @@ class SubmissionWithAssignment(Submission):
     assignment: AssignmentWithClass
 
 
+class GradeSummary(BaseModel):
+    class_id: uuid.UUID
+    submission_count: int
+    graded_count: int
+    score_total: Decimal
+    points_possible_total: int
+    average_percent: Optional[Decimal] = None  # score_total / points_possible_total, 2 decimal places
+    latest_letter_grade: Optional[str] = None
+    latest_submitted_at: Optional[datetime] = None
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class GradeSummaryWithClass(GradeSummary):
+    class_: ClassWithTeacher
+
+
+class GradebookAssignment(BaseModel):
+    assignment_id: uuid.UUID
+    name: str
+    due_date: Optional[datetime] = None
+    points_possible: Optional[int] = None
+    submitted_count: int
+    graded_count: int
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    p25: Optional[float] = None
+    p75: Optional[float] = None
+    p90: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    std: Optional[float] = None
+    distribution: Dict[str, int]  # graded scores per letter band (percent of points possible)
+
+
+class GradebookStudent(BaseModel):
+    student_id: uuid.UUID
+    first_name: str
+    last_name: str
+    submitted_count: int
+    graded_count: int
+    missing_count: int  # past-due assignments without a submission
+    score_total: float
+    points_possible_total: int
+    percent: Optional[float] = None
+
+
+class ClassGradebook(BaseModel):
+    class_: ClassWithTeacher
+    student_count: int
+    assignment_count: int
+    assignments: List[GradebookAssignment]
+    students: List[GradebookStudent]
+
+
 class StudentDashboard(BaseModel):
     student: StudentProfile
     enrolled_classes: List[EnrollmentWithClass]
@@ -162,10 +219,41 @@ class StudentAppDataCreate(StudentAppDataBase):
     pass
 
 
+class StudentAppDataKey(BaseModel):
+    app_key: str
+    data_key: str
+
+
+class StudentAppDataBatchCreate(BaseModel):
+    items: List[StudentAppDataCreate] = Field(..., min_length=1, max_length=100)
+
+
+class StudentAppDataBatchQuery(BaseModel):
+    keys: List[StudentAppDataKey] = Field(..., min_length=1, max_length=100)
+
+
 class StudentAppDataUpdate(BaseModel):
     data_value: Dict[str, Any]
 
 
+class StudentAppDataPatchOperation(BaseModel):
+    op: Literal["set", "remove", "increment", "append"]
+    path: List[Union[str, int]] = Field(..., min_length=1)
+    # New value for set, amount for increment (default 1), item for append
+    value: Any = None
+    # For append: keep only the newest `limit` items
+    limit: Optional[int] = Field(default=None, ge=1)
+
+
+class StudentAppDataPatch(BaseModel):
+    # RFC 7396 JSON Merge Patch, applied before operations
+    merge: Optional[Dict[str, Any]] = None
+    # Path-based operations, applied in order
+    operations: List[StudentAppDataPatchOperation] = Field(default_factory=list, max_length=100)
+    # Create the key from an empty object if it does not exist yet
+    upsert: bool = False
+
+
 class StudentAppData(StudentAppDataBase):
     id: uuid.UUID
     student_id: uuid.UUID
@@ -181,4 +269,24 @@ class StudentAppDataResponse(BaseModel):
     data_key: str 
     data_value: Dict[str, Any]
     created_at: datetime
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+class DeletedRecord(BaseModel):
+    table_name: str  # assignments, submissions, enrollments or student_app_data
+    record_id: uuid.UUID
+    app_key: Optional[str] = None  # student_app_data rows are identified by app_key and data_key
+    data_key: Optional[str] = None
+    deleted_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ChangeFeed(BaseModel):
+    assignments: List[Assignment]
+    submissions: List[Submission]
+    enrollments: List[Enrollment]
+    app_data: List[StudentAppDataResponse]
+    deleted: List[DeletedRecord]
+    cursor: str  # pass back as ?cursor= on the next request
+    has_more: bool  # true if a feed was cut at limit; request again right away
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark for GET /student/dashboard assembly
+Compares the previous four sequential ORM queries with the single-statement
+dashboard query in app/dashboard.py, reporting p50/p99 latency
+
+Usage: uv run python -m benchmarks.dashboard [--student-id UUID] [--iterations N] [--concurrency C]
+"""
+
+import argparse
+import asyncio
+import time
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app.database import AsyncSessionLocal, async_engine
+from app.dashboard import load_dashboard
+from app.models import Student, Enrollment, Assignment, Submission, Class
+from app.schemas import StudentDashboard
+from .stats import summarize, format_row, TABLE_HEADER
+
+# Maya Chen from supabase/seed.sql (enrolled in both demo classes)
+DEFAULT_STUDENT_ID = "00000000-0000-4000-8000-000000003020"
+
+
+async def sequential_orm_dashboard(db, student_id) -> StudentDashboard:
+    """Baseline: the original four sequential joinedload queries"""
+    student_with_school = await db.scalar(
+        select(Student).options(joinedload(Student.school)).where(Student.id == student_id)
+    )
+
+    enrollments = (await db.execute(
+        select(Enrollment).options(
+            joinedload(Enrollment.class_).joinedload(Class.teacher)
+        ).where(
+            Enrollment.student_id == student_id,
+            Enrollment.enrollment_status == "active"
+        )
+    )).scalars().all()
+
+    enrolled_class_ids = [e.class_id for e in enrollments]
+    recent_assignments = (await db.execute(
+        select(Assignment).options(joinedload(Assignment.class_)).where(
+            Assignment.class_id.in_(enrolled_class_ids)
+        ).order_by(Assignment.due_date.desc(), Assignment.id.desc()).limit(10)
+    )).scalars().all()
+
+    recent_submissions = (await db.execute(
+        select(Submission).options(
+            joinedload(Submission.assignment).joinedload(Assignment.class_)
+        ).where(
+            Submission.student_id == student_id
+        ).order_by(Submission.submitted_at.desc(), Submission.id.desc()).limit(10)
+    )).scalars().all()
+
+    return StudentDashboard.model_validate({
+        "student": student_with_school,
+        "enrolled_classes": enrollments,
+        "recent_assignments": recent_assignments,
+        "recent_submissions": recent_submissions
+    })
+
+
+async def single_query_dashboard(db, student_id) -> StudentDashboard:
+    return await load_dashboard(db, student_id)
+
+
+async def measure(loader, student_id, iterations: int, concurrency: int) -> list:
+    """Run loader iterations times across concurrency workers; returns latencies in ms"""
+    samples = []
+    remaining = iterations
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            async with AsyncSessionLocal() as db:
+                start = time.perf_counter()
+                await loader(db, student_id)
+                samples.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--student-id", default=DEFAULT_STUDENT_ID)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    # Both paths must produce the same document
+    async with AsyncSessionLocal() as db:
+        before = await sequential_orm_dashboard(db, args.student_id)
+        after = await single_query_dashboard(db, args.student_id)
+    if before.model_dump_json() != after.model_dump_json():
+        raise SystemExit("Dashboard outputs differ between implementations")
+
+    cases = [
+        ("before: 4 sequential queries", sequential_orm_dashboard),
+        ("after: single statement", single_query_dashboard)
+    ]
+
+    print("# Student dashboard benchmark")
+    print(f"*{args.iterations} iterations, concurrency {args.concurrency}, student {args.student_id}*\n")
+    print(TABLE_HEADER)
+    for name, loader in cases:
+        await measure(loader, args.student_id, args.warmup, 1)
+        samples = await measure(loader, args.student_id, args.iterations, args.concurrency)
+        print(format_row(name, summarize(samples)))
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Synthetic district generator for the endpoint and load benchmarks
+Creates schools, teachers, classes, students, enrollments, assignments,
+submissions and app data in the local database with generate_series, so
+100k students take seconds rather than minutes. Rows are recognisable by
+their sis_id prefix (bench-) and ids are deterministic, so regenerating
+the same layout gives the same ids.
+
+Usage: uv run python -m benchmarks.district generate [--students N] [--schools N] ...
+       uv run python -m benchmarks.district show | drop
+"""
+
+import argparse
+import asyncio
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+import asyncpg
+from app.database import DATABASE_URL
+
+SIS_PREFIX = "bench-"
+DISTRICT_NAME = "Benchmark District"
+
+# App data written for every student (and read by the benchmarks)
+APP_KEYS = ("bench-reader", "bench-math")
+
+# Kinds encoded in the first id group, see bench_id()
+SCHOOL, TEACHER, CLASS, STUDENT, STUDENT_USER, ASSIGNMENT, TEACHER_USER = range(1, 8)
+
+# Row triggers that would run per generated row; the data they maintain is
+# backfilled in one statement instead (grade summaries) or not needed (notifications, tombstones)
+SKIPPED_TRIGGERS = (
+    ("submissions", "maintain_grade_summary"),
+    ("submissions", "notify_change"),
+    ("student_app_data", "notify_change"),
+    ("assignments", "record_deletions"),
+    ("submissions", "record_deletions"),
+    ("enrollments", "record_deletions"),
+    ("student_app_data", "record_deletions")
+)
+
+
+def bench_id(kind: int, n: int) -> uuid.UUID:
+    """Deterministic id of the n-th generated row of a kind"""
+    return uuid.UUID(f"be0c{kind:04x}-0000-4000-8000-{n:012x}")
+
+
+@dataclass
+class DistrictLayout:
+    students: int = 100_000
+    schools: int = 40
+    class_size: int = 25
+    classes_per_student: int = 6
+    classes_per_teacher: int = 5
+    assignments_per_class: int = 10
+    submission_rate: float = 0.6
+    app_data_keys: int = 3
+
+    @property
+    def students_per_school(self) -> int:
+        return math.ceil(self.students / self.schools)
+
+    @property
+    def sections(self) -> int:
+        """Sections of each period per school"""
+        return math.ceil(self.students_per_school / self.class_size)
+
+    @property
+    def classes_per_school(self) -> int:
+        return self.sections * self.classes_per_student
+
+    @property
+    def teachers_per_school(self) -> int:
+        return math.ceil(self.classes_per_school / self.classes_per_teacher)
+
+    @property
+    def classes(self) -> int:
+        return self.schools * self.classes_per_school
+
+    @property
+    def teachers(self) -> int:
+        return self.schools * self.teachers_per_school
+
+
+BENCH_ID_SQL = """
+create function pg_temp.bench_id(kind int, n bigint) returns uuid as $$
+    select ('be0c' || lpad(to_hex(kind), 4, '0') || '-0000-4000-8000-' || lpad(to_hex(n), 12, '0'))::uuid
+$$ language sql immutable
+"""
+
+SCHOOLS_SQL = f"""
+insert into public.schools (id, name, district, sis_id)
+select pg_temp.bench_id({SCHOOL}, s), 'Benchmark School ' || s, '{DISTRICT_NAME}', '{SIS_PREFIX}school-' || s
+from generate_series(0, $1::int - 1) s
+"""
+
+TEACHERS_SQL = f"""
+insert into public.teachers (id, school_id, supabase_user_id, email, first_name, last_name, sis_id)
+select
+    pg_temp.bench_id({TEACHER}, t),
+    pg_temp.bench_id({SCHOOL}, t / $2::int),
+    pg_temp.bench_id({TEACHER_USER}, t),
+    'bench-teacher-' || t || '@bench.test',
+    'Teacher', 'Bench ' || t,
+    '{SIS_PREFIX}teacher-' || t
+from generate_series(0, $1::int - 1) t
+"""
+
+# $1 classes, $2 classes per school, $3 sections, $4 teachers per school, $5 classes per teacher
+CLASSES_SQL = f"""
+insert into public.classes (id, school_id, teacher_id, name, subject, semester, academic_year, sis_id)
+select
+    pg_temp.bench_id({CLASS}, c),
+    pg_temp.bench_id({SCHOOL}, c / $2::int),
+    pg_temp.bench_id({TEACHER}, (c / $2::int) * $4::int + (c % $2::int) / $5::int),
+    'Period ' || ((c % $2::int) / $3::int + 1) || ' Section ' || ((c % $2::int) % $3::int + 1),
+    (array['Math', 'Reading', 'Science', 'History', 'Art', 'Music'])[((c % $2::int) / $3::int) % 6 + 1],
+    'Fall', '2026-27',
+    '{SIS_PREFIX}class-' || c
+from generate_series(0, $1::int - 1) c
+"""
+
+# $1 students, $2 students per school
+STUDENTS_SQL = f"""
+insert into public.students
+    (id, school_id, supabase_user_id, email, first_name, last_name, student_number, grade_level, username, sis_id)
+select
+    pg_temp.bench_id({STUDENT}, n),
+    pg_temp.bench_id({SCHOOL}, n / $2::int),
+    pg_temp.bench_id({STUDENT_USER}, n),
+    'bench-student-' || n || '@bench.test',
+    'Student', 'Bench ' || n,
+    'B' || lpad(n::text, 7, '0'),
+    3 + n % 6,
+    'bench' || n,
+    '{SIS_PREFIX}student-' || n
+from generate_series(0, $1::int - 1) n
+"""
+
+# $1 students, $2 students per school, $3 classes per school, $4 sections, $5 class size, $6 classes per student
+ENROLLMENTS_SQL = f"""
+insert into public.enrollments (student_id, class_id, enrollment_status)
+select
+    pg_temp.bench_id({STUDENT}, n),
+    pg_temp.bench_id(
+        {CLASS},
+        (n / $2::int) * $3::int + p * $4::int + ((n % $2::int + p * 7) % $2::int) / $5::int
+    ),
+    'active'
+from generate_series(0, $1::int - 1) n
+cross join generate_series(0, $6::int - 1) p
+"""
+
+# $1 classes, $2 assignments per class
+ASSIGNMENTS_SQL = f"""
+insert into public.assignments (id, class_id, name, description, due_date, points_possible, assignment_type)
+select
+    pg_temp.bench_id({ASSIGNMENT}, c * $2::int + a),
+    pg_temp.bench_id({CLASS}, c),
+    'Assignment ' || (a + 1),
+    'Generated benchmark assignment',
+    now() - make_interval(days => ($2::int - a) * 3),
+    (array[10, 20, 50, 100])[a % 4 + 1],
+    (array['homework', 'quiz', 'project', 'test'])[a % 4 + 1]
+from generate_series(0, $1::int - 1) c
+cross join generate_series(0, $2::int - 1) a
+"""
+
+# $1 submission rate; volatile columns keep the subquery from being flattened, so each row gets its own score
+SUBMISSIONS_SQL = f"""
+insert into public.submissions (student_id, assignment_id, score, letter_grade, submitted_at)
+select
+    student_id,
+    assignment_id,
+    round((pct * points_possible)::numeric, 2),
+    case when pct >= 0.9 then 'A' when pct >= 0.8 then 'B' when pct >= 0.7 then 'C'
+         when pct >= 0.6 then 'D' else 'F' end,
+    due_date - make_interval(mins => minutes_early)
+from (
+    select
+        e.student_id,
+        a.id as assignment_id,
+        a.points_possible,
+        a.due_date,
+        0.5 + random() * 0.5 as pct,
+        (random() * 2880)::int as minutes_early
+    from public.enrollments e
+    join public.assignments a on a.class_id = e.class_id
+    where e.student_id in (select id from public.students where sis_id like '{SIS_PREFIX}%')
+      and random() < $1::float8
+) generated
+"""
+
+# $1 students, $2 app keys, $3 data keys per app
+APP_DATA_SQL = f"""
+insert into public.student_app_data (student_id, app_key, data_key, data_value)
+select
+    pg_temp.bench_id({STUDENT}, n),
+    ($2::text[])[app],
+    'progress-' || k,
+    jsonb_build_object(
+        'level', (random() * 20)::int,
+        'completed', (random() * 200)::int,
+        'streak', (random() * 30)::int,
+        'history', (select jsonb_agg((random() * 100)::int) from generate_series(1, 20))
+    )
+from generate_series(0, $1::int - 1) n
+cross join generate_series(1, cardinality($2::text[])) app
+cross join generate_series(0, $3::int - 1) k
+"""
+
+# Same as the grade summaries migration's backfill, for the generated students
+GRADE_SUMMARIES_SQL = f"""
+insert into public.student_grade_summaries
+    (student_id, class_id, submission_count, graded_count, score_total, points_possible_total,
+     latest_letter_grade, latest_submitted_at)
+select
+    totals.student_id, totals.class_id, totals.submission_count, totals.graded_count,
+    totals.score_total, totals.points_possible_total, latest.letter_grade, latest.submitted_at
+from (
+    select
+        sub.student_id,
+        a.class_id,
+        count(*) as submission_count,
+        count(sub.score) as graded_count,
+        coalesce(sum(sub.score), 0) as score_total,
+        coalesce(sum(a.points_possible) filter (where sub.score is not null), 0) as points_possible_total
+    from public.submissions sub
+    join public.assignments a on a.id = sub.assignment_id
+    join public.students st on st.id = sub.student_id and st.sis_id like '{SIS_PREFIX}%'
+    group by sub.student_id, a.class_id
+) totals
+left join (
+    select distinct on (sub.student_id, a.class_id)
+        sub.student_id, a.class_id, sub.letter_grade, sub.submitted_at
+    from public.submissions sub
+    join public.assignments a on a.id = sub.assignment_id
+    join public.students st on st.id = sub.student_id and st.sis_id like '{SIS_PREFIX}%'
+    where sub.letter_grade is not null
+    order by sub.student_id, a.class_id, sub.submitted_at desc nulls last, sub.id desc
+) latest on latest.student_id = totals.student_id and latest.class_id = totals.class_id
+"""
+
+# Generated students plus the app data workspaces benchmark teachers created
+BENCH_STUDENTS = f"""
+    select id from public.students
+    where sis_id like '{SIS_PREFIX}%'
+       or supabase_user_id in (select supabase_user_id from public.teachers where sis_id like '{SIS_PREFIX}%')
+"""
+
+# Children first; with the row triggers skipped nothing else references these rows
+DROP_SQL = [
+    f"delete from public.student_app_data where student_id in ({BENCH_STUDENTS})",
+    f"delete from public.student_grade_summaries where student_id in ({BENCH_STUDENTS})",
+    f"delete from public.submissions where student_id in ({BENCH_STUDENTS})",
+    f"delete from public.enrollments where student_id in ({BENCH_STUDENTS})",
+    f"delete from public.assignments where class_id in (select id from public.classes where sis_id like '{SIS_PREFIX}%')",
+    f"delete from public.classes where sis_id like '{SIS_PREFIX}%'",
+    f"delete from public.students where id in ({BENCH_STUDENTS})",
+    f"delete from public.teachers where sis_id like '{SIS_PREFIX}%'",
+    f"delete from public.schools where sis_id like '{SIS_PREFIX}%'"
+]
+
+ANALYZED_TABLES = (
+    "schools", "teachers", "classes", "students", "enrollments", "assignments",
+    "submissions", "student_app_data", "student_grade_summaries"
+)
+
+
+async def _set_triggers(conn, enabled: bool) -> None:
+    action = "enable" if enabled else "disable"
+    for table, trigger in SKIPPED_TRIGGERS:
+        await conn.execute(f"alter table public.{table} {action} trigger {trigger}")
+
+
+async def _drop(conn) -> None:
+    for statement in DROP_SQL:
+        await conn.execute(statement)
+
+
+async def _step(conn, label: str, sql: str, *args) -> None:
+    started = time.perf_counter()
+    status = await conn.execute(sql, *args)
+    print(f"  {label:<16} {status.split()[-1]:>10} rows  {time.perf_counter() - started:6.1f} s")
+
+
+async def generate(layout: DistrictLayout, database_url: Optional[str] = None) -> None:
+    """Replace any previous benchmark district with one of the given layout"""
+    conn = await asyncpg.connect(database_url or DATABASE_URL, server_settings={"timezone": "UTC"})
+    try:
+        # Repeatable random scores and app data
+        await conn.execute("select setseed(0.42)")
+        async with conn.transaction():
+            # Table locks for the duration; run against an idle local database
+            await _set_triggers(conn, enabled=False)
+            await _drop(conn)
+            await conn.execute(BENCH_ID_SQL)
+
+            await _step(conn, "schools", SCHOOLS_SQL, layout.schools)
+            await _step(conn, "teachers", TEACHERS_SQL, layout.teachers, layout.teachers_per_school)
+            await _step(
+                conn, "classes", CLASSES_SQL, layout.classes, layout.classes_per_school,
+                layout.sections, layout.teachers_per_school, layout.classes_per_teacher
+            )
+            await _step(conn, "students", STUDENTS_SQL, layout.students, layout.students_per_school)
+            await _step(
+                conn, "enrollments", ENROLLMENTS_SQL, layout.students, layout.students_per_school,
+                layout.classes_per_school, layout.sections, layout.class_size, layout.classes_per_student
+            )
+            await _step(conn, "assignments", ASSIGNMENTS_SQL, layout.classes, layout.assignments_per_class)
+            await _step(conn, "submissions", SUBMISSIONS_SQL, layout.submission_rate)
+            await _step(conn, "grade summaries", GRADE_SUMMARIES_SQL)
+            await _step(conn, "app data", APP_DATA_SQL, layout.students, list(APP_KEYS), layout.app_data_keys)
+
+            await _set_triggers(conn, enabled=True)
+
+        for table in ANALYZED_TABLES:
+            await conn.execute(f"analyze public.{table}")
+    finally:
+        await conn.close()
+
+
+async def drop(database_url: Optional[str] = None) -> None:
+    """Remove every generated row"""
+    conn = await asyncpg.connect(database_url or DATABASE_URL)
+    try:
+        async with conn.transaction():
+            await _set_triggers(conn, enabled=False)
+            await _drop(conn)
+            await _set_triggers(conn, enabled=True)
+    finally:
+        await conn.close()
+
+
+@dataclass
+class SampleStudent:
+    id: uuid.UUID
+    user_id: uuid.UUID
+    class_ids: list
+    data_keys: list
+
+
+async def load_sample(size: int, seed: str = "bench", database_url: Optional[str] = None) -> list:
+    """A repeatable random sample of generated students with their classes and app data keys"""
+    conn = await asyncpg.connect(database_url or DATABASE_URL)
+    try:
+        rows = await conn.fetch(f"""
+            select
+                s.id,
+                s.supabase_user_id,
+                array(select e.class_id from public.enrollments e
+                      where e.student_id = s.id and e.enrollment_status = 'active' order by e.class_id) as class_ids,
+                array(select d.data_key from public.student_app_data d
+                      where d.student_id = s.id and d.app_key = $3 order by d.data_key) as data_keys
+            from public.students s
+            where s.sis_id like '{SIS_PREFIX}%'
+            order by md5(s.id::text || $2)
+            limit $1
+        """, size, seed, APP_KEYS[0])
+    finally:
+        await conn.close()
+
+    if not rows:
+        raise SystemExit("No benchmark district found; run: uv run python -m benchmarks.district generate")
+    return [SampleStudent(row["id"], row["supabase_user_id"], list(row["class_ids"]), list(row["data_keys"])) for row in rows]
+
+
+async def district_counts(database_url: Optional[str] = None) -> dict:
+    """Row counts of the generated district, for report headers"""
+    conn = await asyncpg.connect(database_url or DATABASE_URL)
+    try:
+        row = await conn.fetchrow(f"""
+            select
+                (select count(*) from public.schools where sis_id like '{SIS_PREFIX}%') as schools,
+                (select count(*) from public.classes where sis_id like '{SIS_PREFIX}%') as classes,
+                (select count(*) from public.students where sis_id like '{SIS_PREFIX}%') as students,
+                (select reltuples::bigint from pg_class where oid = 'public.enrollments'::regclass) as enrollments,
+                (select reltuples::bigint from pg_class where oid = 'public.submissions'::regclass) as submissions,
+                (select reltuples::bigint from pg_class where oid = 'public.student_app_data'::regclass) as app_data
+        """)
+    finally:
+        await conn.close()
+    return dict(row)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["generate", "drop", "show"])
+    defaults = DistrictLayout()
+    parser.add_argument("--students", type=int, default=defaults.students)
+    parser.add_argument("--schools", type=int, default=defaults.schools)
+    parser.add_argument("--class-size", type=int, default=defaults.class_size)
+    parser.add_argument("--classes-per-student", type=int, default=defaults.classes_per_student)
+    parser.add_argument("--classes-per-teacher", type=int, default=defaults.classes_per_teacher)
+    parser.add_argument("--assignments-per-class", type=int, default=defaults.assignments_per_class)
+    parser.add_argument("--submission-rate", type=float, default=defaults.submission_rate,
+                        help="Fraction of (student, assignment) pairs with a submission")
+    parser.add_argument("--app-data-keys", type=int, default=defaults.app_data_keys,
+                        help=f"Data keys per student for each of {', '.join(APP_KEYS)}")
+    args = parser.parse_args()
+
+    if args.command == "drop":
+        await drop()
+        print("🗑️  Benchmark district removed")
+        return
+
+    if args.command == "show":
+        print(await district_counts())
+        return
+
+    layout = DistrictLayout(
+        students=args.students,
+        schools=args.schools,
+        class_size=args.class_size,
+        classes_per_student=args.classes_per_student,
+        classes_per_teacher=args.classes_per_teacher,
+        assignments_per_class=args.assignments_per_class,
+        submission_rate=args.submission_rate,
+        app_data_keys=args.app_data_keys
+    )
+    print(f"🏫 Generating {DISTRICT_NAME}: {layout.schools} schools, {layout.students} students, "
+          f"{layout.classes} classes, {layout.teachers} teachers")
+    started = time.perf_counter()
+    await generate(layout)
+    print(f"✅ Done in {time.perf_counter() - started:.1f} s")
+    print("ℹ️  Restart the API before benchmarking so no cache holds rows from a previous district")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark: throughput and latency for every route in app/main.py
+Runs against a running API (uvicorn) backed by a generated district
+(python -m benchmarks.district generate), with tokens minted locally from
+JWT_SECRET_KEY for a random sample of the district's students and teachers.
+Each route gets warmup requests, then --requests timed requests from
+--concurrency workers. Save a report with --output and compare a later run
+against it with --compare.
+
+Usage: uv run python -m benchmarks.endpoints [--base-url URL] [--requests N] [--concurrency C]
+                                             [--only REGEX] [--skip REGEX] [--output report.json] [--compare baseline.json]
+
+Writes go to app keys under bench- (and PUT/PATCH overwrite generated app
+data), so benchmark against a disposable database.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import httpx
+from fastapi.routing import APIRoute
+from .district import APP_KEYS, bench_id, district_counts, load_sample, SampleStudent, TEACHER_USER
+from .stats import summarize
+from .tokens import auth_headers, mint_token
+
+# Path and JSON body of one request
+Request = Tuple[str, Optional[object]]
+
+SQL_METRIC = re.compile(r'^db_queries_per_request_(sum|count)\{method="([A-Z]+)",route="([^"]+)"\} (\S+)$')
+
+
+class Context:
+    """Sampled users and their tokens; picks a random user per request"""
+
+    def __init__(self, students: List[SampleStudent], teachers: int, seed: int, token_ttl: int = 3600):
+        self.rng = random.Random(seed)
+        # Unique keys for rows created and deleted by the same case
+        self.sequence = itertools.count()
+        self.students = students
+        self.student_headers = {
+            s.id: auth_headers(mint_token(s.user_id, "student", f"{s.user_id}@bench.test", token_ttl)) for s in students
+        }
+        self.teacher_headers = [
+            auth_headers(mint_token(bench_id(TEACHER_USER, n), "teacher", f"bench-teacher-{n}@bench.test", token_ttl))
+            for n in range(teachers)
+        ]
+        self.metrics_headers = auth_headers(os.environ["METRICS_TOKEN"]) if os.getenv("METRICS_TOKEN") else {}
+
+    def student(self) -> SampleStudent:
+        return self.rng.choice(self.students)
+
+    def data_key(self, student: SampleStudent) -> str:
+        return self.rng.choice(student.data_keys)
+
+    def class_id(self) -> str:
+        return str(self.rng.choice(self.student().class_ids))
+
+    def teacher(self) -> Dict[str, str]:
+        return self.rng.choice(self.teacher_headers)
+
+
+@dataclass
+class Case:
+    method: str
+    route: str
+    # Returns the headers, then the path and body of the timed request
+    build: Callable[[Context], Tuple[Dict[str, str], Request]]
+    # Untimed request made just before each timed one (e.g. create what a DELETE removes)
+    setup: Optional[Callable[[Context, Dict[str, str], Request], Request]] = None
+    # Fixed request count and concurrency for slow, large responses (exports)
+    requests: Optional[int] = None
+    concurrency: Optional[int] = None
+    # Time to the first body chunk, then disconnect (event streams)
+    stream: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}"
+
+
+def as_student(path: Callable[[Context, SampleStudent], Request]):
+    def build(ctx: Context):
+        student = ctx.student()
+        return ctx.student_headers[student.id], path(ctx, student)
+    return build
+
+
+def as_teacher(path: Callable[[Context], Request]):
+    def build(ctx: Context):
+        return ctx.teacher(), path(ctx)
+    return build
+
+
+def anonymous(path: str, metrics: bool = False):
+    def build(ctx: Context):
+        return (ctx.metrics_headers if metrics else {}), (path, None)
+    return build
+
+
+def app_data_value(ctx: Context) -> dict:
+    return {"level": ctx.rng.randrange(20), "completed": ctx.rng.randrange(200), "history": list(range(20))}
+
+
+def write_key(ctx: Context) -> dict:
+    return {"app_key": "bench-writes", "data_key": f"k{ctx.rng.randrange(20)}", "data_value": app_data_value(ctx)}
+
+
+def create_deleted(ctx: Context, headers, request: Request) -> Request:
+    """POST the row the timed DELETE removes"""
+    parts = request[0].split("/")
+    app_key, data_key = parts[3], parts[4] if len(parts) > 4 else "k0"
+    return "/student/app-data", {"app_key": app_key, "data_key": data_key, "data_value": {"n": 1}}
+
+
+READ_APP = APP_KEYS[0]
+WRITE_APP = APP_KEYS[1]
+
+
+def student_app_data_key(ctx: Context) -> Request:
+    student = ctx.student()
+    return f"/app-data/{student.id}/{READ_APP}/{ctx.data_key(student)}", None
+
+CASES = [
+    Case("GET", "/", anonymous("/")),
+    Case("GET", "/api", anonymous("/api")),
+    Case("GET", "/health", anonymous("/health")),
+    Case("GET", "/metrics", anonymous("/metrics", metrics=True)),
+    Case("GET", "/student/profile", as_student(lambda ctx, s: ("/student/profile", None))),
+    Case("GET", "/student/classes", as_student(lambda ctx, s: ("/student/classes", None))),
+    Case("GET", "/student/assignments", as_student(lambda ctx, s: ("/student/assignments", None))),
+    Case("GET", "/student/grades", as_student(lambda ctx, s: ("/student/grades", None))),
+    Case("GET", "/student/grades/summary", as_student(lambda ctx, s: ("/student/grades/summary", None))),
+    Case("GET", "/student/dashboard", as_student(lambda ctx, s: ("/student/dashboard", None))),
+    Case("GET", "/student/changes", as_student(lambda ctx, s: ("/student/changes", None))),
+    Case("GET", "/auth/test", as_student(lambda ctx, s: ("/auth/test", None))),
+    Case("POST", "/student/app-data", as_student(lambda ctx, s: ("/student/app-data", write_key(ctx)))),
+    Case("POST", "/student/app-data/batch", as_student(lambda ctx, s: (
+        "/student/app-data/batch", {"items": [write_key(ctx) for _ in range(10)]}
+    ))),
+    Case("POST", "/student/app-data/batch/get", as_student(lambda ctx, s: (
+        "/student/app-data/batch/get", {"keys": [{"app_key": READ_APP, "data_key": key} for key in s.data_keys]}
+    ))),
+    Case("GET", "/student/app-data/{app_key}", as_student(lambda ctx, s: (f"/student/app-data/{READ_APP}", None))),
+    Case("GET", "/student/app-data/{app_key}/{data_key}", as_student(lambda ctx, s: (
+        f"/student/app-data/{READ_APP}/{ctx.data_key(s)}", None
+    ))),
+    Case("PUT", "/student/app-data/{app_key}/{data_key}", as_student(lambda ctx, s: (
+        f"/student/app-data/{WRITE_APP}/{ctx.data_key(s)}", {"data_value": app_data_value(ctx)}
+    ))),
+    Case("PATCH", "/student/app-data/{app_key}/{data_key}", as_student(lambda ctx, s: (
+        f"/student/app-data/{WRITE_APP}/{ctx.data_key(s)}",
+        {"merge": {"streak": ctx.rng.randrange(30)}, "operations": [{"op": "increment", "path": ["completed"]}]}
+    ))),
+    Case("DELETE", "/student/app-data/{app_key}/{data_key}", as_student(lambda ctx, s: (
+        f"/student/app-data/bench-deletes/k{next(ctx.sequence)}", None
+    )), setup=create_deleted),
+    Case("DELETE", "/student/app-data/{app_key}", as_student(lambda ctx, s: (
+        f"/student/app-data/bench-deletes-{next(ctx.sequence)}", None
+    )), setup=create_deleted),
+    Case("POST", "/app-data/{student_id}", as_teacher(lambda ctx: (f"/app-data/{ctx.student().id}", write_key(ctx)))),
+    Case("GET", "/app-data/{student_id}/{app_key}", as_teacher(lambda ctx: (
+        f"/app-data/{ctx.student().id}/{READ_APP}", None
+    ))),
+    Case("GET", "/app-data/{student_id}/{app_key}/{data_key}", as_teacher(student_app_data_key)),
+    Case("GET", "/students", as_teacher(lambda ctx: ("/students", None))),
+    Case("GET", "/class/{class_id}/gradebook", as_teacher(lambda ctx: (f"/class/{ctx.class_id()}/gradebook", None))),
+    Case("GET", "/export/students", as_teacher(lambda ctx: ("/export/students", None)), requests=2, concurrency=1),
+    Case("GET", "/export/submissions", as_teacher(lambda ctx: ("/export/submissions", None)), requests=2, concurrency=1),
+    Case("GET", "/export/app-data", as_teacher(lambda ctx: ("/export/app-data", None)), requests=2, concurrency=1),
+    Case("GET", "/events/student/{student_id}", as_student(lambda ctx, s: (
+        f"/events/student/{s.id}?app_key={READ_APP}", None
+    )), stream=True),
+    Case("GET", "/events/class/{class_id}", as_teacher(lambda ctx: (f"/events/class/{ctx.class_id()}", None)), stream=True),
+]
+
+
+def check_coverage(cases: List[Case]) -> None:
+    """Every route in app/main.py has exactly one case, so new endpoints are benchmarked too"""
+    from app.main import app
+
+    routes = {
+        f"{method} {route.path}"
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods if method != "HEAD"
+    }
+    names = [case.name for case in cases]
+    missing = routes - set(names)
+    stale = set(names) - routes
+    duplicated = {name for name in names if names.count(name) > 1}
+    if missing or stale or duplicated:
+        raise SystemExit(
+            "Benchmark cases out of date with app/main.py:\n"
+            + "".join(f"  no case for {name}\n" for name in sorted(missing))
+            + "".join(f"  case for unknown route {name}\n" for name in sorted(stale))
+            + "".join(f"  duplicate case {name}\n" for name in sorted(duplicated))
+        )
+
+
+async def sql_per_request(client: httpx.AsyncClient, ctx: Context) -> Optional[Dict[str, Tuple[float, float]]]:
+    """(sum, count) of db_queries_per_request by "METHOD route" from /metrics, or None if unavailable"""
+    try:
+        response = await client.get("/metrics", headers=ctx.metrics_headers)
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+
+    totals: Dict[str, List[float]] = {}
+    for line in response.text.splitlines():
+        match = SQL_METRIC.match(line)
+        if match:
+            kind, method, route, value = match.groups()
+            totals.setdefault(f"{method} {route}", [0.0, 0.0])[0 if kind == "sum" else 1] = float(value)
+    return {name: (total, count) for name, (total, count) in totals.items()}
+
+
+async def send(client: httpx.AsyncClient, case: Case, ctx: Context) -> Tuple[float, Optional[str]]:
+    """One timed request; returns (latency ms, error or None)"""
+    headers, request = case.build(ctx)
+    path, body = request
+    if case.setup is not None:
+        setup_path, setup_body = case.setup(ctx, headers, request)
+        await client.post(setup_path, json=setup_body, headers=headers)
+
+    start = time.perf_counter()
+    try:
+        if case.stream:
+            async with client.stream(case.method, path, headers=headers) as response:
+                if response.status_code == 200:
+                    await response.aiter_raw().__anext__()
+                else:
+                    await response.aread()
+        else:
+            response = await client.request(case.method, path, json=body, headers=headers)
+    except httpx.HTTPError as e:
+        return (time.perf_counter() - start) * 1000, f"{type(e).__name__}: {e}"
+    latency = (time.perf_counter() - start) * 1000
+    if response.status_code >= 400:
+        return latency, f"{response.status_code} {response.text[:120] if not case.stream else ''}".strip()
+    return latency, None
+
+
+async def run_case(client: httpx.AsyncClient, case: Case, ctx: Context, requests: int, concurrency: int, warmup: int) -> dict:
+    samples = []
+    errors = []
+
+    async def worker(count: int, record: bool):
+        for _ in range(count):
+            latency, error = await send(client, case, ctx)
+            if record:
+                if error is None:
+                    samples.append(latency)
+                else:
+                    errors.append(error)
+
+    def split(total: int) -> List[int]:
+        return [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+    await asyncio.gather(*[worker(n, False) for n in split(warmup)])
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(n, True) for n in split(requests)])
+    elapsed = time.perf_counter() - started
+
+    stats = summarize(samples)
+    stats.update({
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "rps": len(samples) / elapsed if elapsed > 0 else 0.0
+    })
+    return stats
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _ms(value) -> str:
+    return f"{value:>8.2f}" if value == value else f"{'-':>8}"
+
+
+def print_report(report: dict) -> None:
+    meta = report["meta"]
+    district = meta["district"]
+    print("# Endpoint benchmark")
+    print(
+        f"*{meta['base_url']} at {meta['revision']}, {meta['requests']} requests per route, "
+        f"concurrency {meta['concurrency']}; district of {district['students']} students, "
+        f"{district['classes']} classes, ~{district['submissions']} submissions, ~{district['app_data']} app data rows*\n"
+    )
+    print(f"| {'Route':<52} | {'n':>6} | {'err':>4} | {'req/s':>8} | {'mean ms':>8} | {'p50 ms':>8} "
+          f"| {'p95 ms':>8} | {'p99 ms':>8} | {'max ms':>8} | {'SQL/req':>7} |")
+    print(f"| {'-' * 52} | {'-' * 6} | {'-' * 4} | {'-' * 8} | {'-' * 8} | {'-' * 8} | {'-' * 8} | {'-' * 8} | {'-' * 8} | {'-' * 7} |")
+    for name, stats in report["routes"].items():
+        queries = stats.get("sql_per_request")
+        print(
+            f"| {name:<52} | {stats['count']:>6} | {stats['errors']:>4} | {stats['rps']:>8.1f} | {_ms(stats['mean'])} "
+            f"| {_ms(stats['p50'])} | {_ms(stats['p95'])} | {_ms(stats['p99'])} | {_ms(stats['max'])} "
+            f"| {queries if queries is not None else '-':>7} |"
+        )
+
+    failed = {name: stats["first_error"] for name, stats in report["routes"].items() if stats["errors"]}
+    if failed:
+        print("\n**Errors**\n")
+        for name, error in failed.items():
+            print(f"- {name}: {error}")
+
+
+def print_comparison(baseline: dict, report: dict) -> None:
+    """Per-route change against a saved report; negative latency change is faster"""
+
+    def change(before, after) -> str:
+        if not before or before != before or after != after:
+            return f"{'-':>26}"
+        return f"{before:>8.2f} → {after:>8.2f} {(after - before) / before * 100:>+5.0f}%"
+
+    print(f"\n# Compared with {baseline['meta']['revision']} ({baseline['meta']['date']})\n")
+    print(f"| {'Route':<52} | {'p50 ms':>26} | {'p95 ms':>26} | {'p99 ms':>26} | {'req/s':>26} |")
+    print(f"| {'-' * 52} | {'-' * 26} | {'-' * 26} | {'-' * 26} | {'-' * 26} |")
+    for name, stats in report["routes"].items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            print(f"| {name:<52} | {'new':>26} | {'':>26} | {'':>26} | {'':>26} |")
+            continue
+        print(
+            f"| {name:<52} | {change(before['p50'], stats['p50'])} | {change(before['p95'], stats['p95'])} "
+            f"| {change(before['p99'], stats['p99'])} | {change(before['rps'], stats['rps'])} |"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per route")
+    parser.add_argument("--students", type=int, default=1000, help="Sampled students to mint tokens for")
+    parser.add_argument("--teachers", type=int, default=20, help="Teachers to mint tokens for")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="Benchmark routes whose 'METHOD /route' matches this regex")
+    parser.add_argument("--skip", help="Skip routes whose 'METHOD /route' matches this regex (e.g. /export/)")
+    parser.add_argument("--output", help="Write the report as JSON (for --compare)")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    check_coverage(CASES)
+    cases = [
+        case for case in CASES
+        if (not args.only or re.search(args.only, case.name)) and not (args.skip and re.search(args.skip, case.name))
+    ]
+    baseline = json.load(open(args.compare)) if args.compare else None
+
+    ctx = Context(await load_sample(args.students, str(args.seed)), args.teachers, args.seed)
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "base_url": args.base_url,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "district": await district_counts()
+        },
+        "routes": {}
+    }
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120.0) as client:
+        for case in cases:
+            before = await sql_per_request(client, ctx)
+            stats = await run_case(
+                client, case, ctx,
+                case.requests or args.requests,
+                case.concurrency or args.concurrency,
+                0 if case.requests else args.warmup
+            )
+            after = await sql_per_request(client, ctx)
+
+            stats["sql_per_request"] = None
+            if before is not None and after is not None and case.name in after:
+                total, count = after[case.name]
+                previous_total, previous_count = before.get(case.name, (0.0, 0.0))
+                if count > previous_count:
+                    # Includes the warmup requests
+                    stats["sql_per_request"] = round((total - previous_total) / (count - previous_count), 1)
+            report["routes"][case.name] = stats
+            print(f"  {case.name:<52} {stats['p50']:>8.2f} ms p50  {stats['rps']:>8.1f} req/s", flush=True)
+
+    print()
+    print_report(report)
+    if baseline is not None:
+        print_comparison(baseline, report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\n📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
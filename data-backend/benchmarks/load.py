@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator replaying classroom traffic against a running API
+Sessions arrive as a Poisson process at --rate per second (ramping up over
+--ramp-up seconds, like the 8:00 a.m. login wave) and are drawn from a mix of:
+
+  login     student opens the dashboard, then assignments, grade summary and app data
+  autosave  student app saving progress: a burst of POST /student/app-data
+  teacher   teacher reads the roster (/students), then students' app data
+
+Every request is scheduled in advance, so arrivals never wait for responses
+(open loop). Latency is measured from the time a request was scheduled to be
+sent, not from when the client got round to sending it, so a slow server
+cannot hide its queueing behind a stalled client (coordinated omission).
+Service time (from the actual send) and dispatch lag are reported alongside.
+
+Uses the district from benchmarks.district and tokens minted from
+JWT_SECRET_KEY; needs nothing but the API and its database.
+
+Usage: uv run python -m benchmarks.load [--base-url URL] [--rate SESSIONS/S] [--duration S] [--ramp-up S]
+                                        [--mix login=6,autosave=3,teacher=1] [--output report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+import httpx
+from .district import APP_KEYS, district_counts, load_sample
+from .endpoints import Context, app_data_value, git_revision
+from .stats import summarize
+
+READ_APP = APP_KEYS[0]
+
+
+@dataclass
+class Step:
+    """One request of a session, sent offset seconds after the session starts"""
+    offset: float
+    name: str
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: Optional[object] = None
+
+
+@dataclass
+class Result:
+    session: str
+    name: str
+    intended: float
+    # From the scheduled send time (includes client-side delay) and from the actual send
+    latency_ms: float
+    service_ms: float
+    dispatch_lag_ms: float
+    error: Optional[str]
+
+
+def login_session(ctx: Context, args) -> List[Step]:
+    """Dashboard on login, then the views a student opens next"""
+    student = ctx.student()
+    headers = ctx.student_headers[student.id]
+    return [
+        Step(0.0, "GET /student/dashboard", "GET", "/student/dashboard", headers),
+        Step(0.5, "GET /student/assignments", "GET", "/student/assignments", headers),
+        Step(1.0, "GET /student/grades/summary", "GET", "/student/grades/summary", headers),
+        Step(1.5, "GET /student/app-data/{app_key}", "GET", f"/student/app-data/{READ_APP}", headers)
+    ]
+
+
+def autosave_session(ctx: Context, args) -> List[Step]:
+    """An app saving progress every --autosave-interval seconds (with jitter)"""
+    student = ctx.student()
+    headers = ctx.student_headers[student.id]
+    steps = []
+    offset = 0.0
+    for save in range(args.autosave_saves):
+        steps.append(Step(
+            offset, "POST /student/app-data", "POST", "/student/app-data", headers,
+            {"app_key": "bench-autosave", "data_key": f"session-{save % 3}", "data_value": app_data_value(ctx)}
+        ))
+        offset += args.autosave_interval * ctx.rng.uniform(0.5, 1.5)
+    return steps
+
+
+def teacher_session(ctx: Context, args) -> List[Step]:
+    """Roster, then a look at several students' app data"""
+    headers = ctx.teacher()
+    steps = [Step(0.0, "GET /students", "GET", "/students", headers)]
+    for i in range(args.teacher_reads):
+        student = ctx.student()
+        steps.append(Step(
+            1.0 + i * 0.25, "GET /app-data/{student_id}/{app_key}", "GET",
+            f"/app-data/{student.id}/{READ_APP}", headers
+        ))
+        if student.data_keys:
+            steps.append(Step(
+                1.1 + i * 0.25, "GET /app-data/{student_id}/{app_key}/{data_key}", "GET",
+                f"/app-data/{student.id}/{READ_APP}/{ctx.data_key(student)}", headers
+            ))
+    return steps
+
+
+SESSIONS: Dict[str, Callable[[Context, argparse.Namespace], List[Step]]] = {
+    "login": login_session,
+    "autosave": autosave_session,
+    "teacher": teacher_session
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """'login=6,autosave=3,teacher=1' -> normalised weights"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SESSIONS:
+            raise SystemExit(f"Unknown session '{name}' in --mix (expected {', '.join(SESSIONS)})")
+        try:
+            weights[name] = float(weight or 1)
+        except ValueError:
+            raise SystemExit(f"Invalid weight '{weight}' for '{name}' in --mix")
+    total = sum(weights.values())
+    if total <= 0:
+        raise SystemExit("--mix weights must add up to more than 0")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def build_schedule(ctx: Context, args, mix: Dict[str, float]) -> List[tuple]:
+    """(intended send time, session name, step) for the whole run, in send order
+
+    Session starts form a Poisson process whose rate rises linearly to
+    --rate over --ramp-up seconds (thinning a process at the full rate).
+    """
+    arrivals = random.Random(args.seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    schedule = []
+    t = 0.0
+    while True:
+        t += arrivals.expovariate(args.rate)
+        if t >= args.duration:
+            break
+        if args.ramp_up > 0 and t < args.ramp_up and arrivals.random() > t / args.ramp_up:
+            continue
+        session = arrivals.choices(names, weights)[0]
+        for step in SESSIONS[session](ctx, args):
+            schedule.append((t + step.offset, session, step))
+
+    schedule.sort(key=lambda item: item[0])
+    return schedule
+
+
+async def send(client: httpx.AsyncClient, session: str, step: Step, intended: float, started: float) -> Result:
+    sent = time.perf_counter()
+    error = None
+    try:
+        response = await client.request(step.method, step.path, json=step.body, headers=step.headers)
+        if response.status_code >= 400:
+            error = f"{response.status_code} {response.text[:120]}"
+    except httpx.HTTPError as e:
+        error = f"{type(e).__name__}: {e}"
+    done = time.perf_counter()
+    return Result(
+        session=session,
+        name=step.name,
+        intended=intended,
+        latency_ms=(done - (started + intended)) * 1000,
+        service_ms=(done - sent) * 1000,
+        dispatch_lag_ms=(sent - (started + intended)) * 1000,
+        error=error
+    )
+
+
+async def run_schedule(client: httpx.AsyncClient, schedule: List[tuple], progress_interval: float) -> List[Result]:
+    """Fire every request at its intended time without waiting for earlier responses"""
+    tasks = []
+    started = time.perf_counter() + 0.5
+    next_progress = progress_interval
+
+    for intended, session, step in schedule:
+        delay = started + intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, session, step, intended, started)))
+
+        if intended >= next_progress:
+            in_flight = sum(1 for task in tasks if not task.done())
+            print(f"  t={intended:6.1f}s  sent {len(tasks):>7}  in flight {in_flight:>5}", flush=True)
+            next_progress += progress_interval
+
+    return list(await asyncio.gather(*tasks))
+
+
+def _ms(value) -> str:
+    return f"{value:>8.1f}" if value == value else f"{'-':>8}"
+
+
+def summarize_results(results: List[Result], duration: float, window: float) -> dict:
+    by_request: Dict[str, List[Result]] = {}
+    for result in results:
+        by_request.setdefault(f"{result.session}: {result.name}", []).append(result)
+
+    def group(items: List[Result]) -> dict:
+        # Failed requests (timeouts, 503s) are usually the slowest under
+        # overload, so they stay in the latency distribution; ok_latency
+        # shows successful requests alone
+        ok = [r for r in items if r.error is None]
+        return {
+            "count": len(items),
+            "errors": len(items) - len(ok),
+            "first_error": next((r.error for r in items if r.error), None),
+            "latency": summarize([r.latency_ms for r in items]),
+            "ok_latency": summarize([r.latency_ms for r in ok]),
+            "service": summarize([r.service_ms for r in items])
+        }
+
+    timeline = []
+    for i in range(math.ceil(duration / window) or 1):
+        start = i * window
+        items = [r for r in results if start <= r.intended < start + window]
+        if items:
+            summary = group(items)
+            timeline.append({"start": start, "offered_rps": len(items) / window, **summary})
+
+    return {
+        "requests": {name: group(items) for name, items in sorted(by_request.items())},
+        "total": group(results),
+        "timeline": timeline,
+        "dispatch_lag": summarize([r.dispatch_lag_ms for r in results])
+    }
+
+
+def print_report(report: dict) -> None:
+    meta = report["meta"]
+    district = meta["district"]
+    mix = ", ".join(f"{name} {weight:.0%}" for name, weight in meta["mix"].items())
+    print("# Classroom load test")
+    print(
+        f"*{meta['base_url']} at {meta['revision']}: {meta['rate']} sessions/s for {meta['duration']} s "
+        f"(ramp-up {meta['ramp_up']} s), mix {mix}; district of {district['students']} students*\n"
+    )
+    print(
+        "Latency is measured from each request's scheduled send time (coordinated-omission safe) "
+        "and includes failed requests; ok p99 counts successful requests only.\n"
+    )
+
+    header = (f"| {'Request':<62} | {'n':>6} | {'err':>5} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} "
+              f"| {'max ms':>8} | {'ok p99':>8} | {'svc p50':>8} | {'svc p99':>8} |")
+    print(header)
+    print("| " + " | ".join("-" * width for width in (62, 6, 5, 8, 8, 8, 8, 8, 8, 8)) + " |")
+    rows = list(report["requests"].items()) + [("all requests", report["total"])]
+    for name, stats in rows:
+        latency, service = stats["latency"], stats["service"]
+        print(
+            f"| {name:<62} | {stats['count']:>6} | {stats['errors']:>5} | {_ms(latency['p50'])} | {_ms(latency['p95'])} "
+            f"| {_ms(latency['p99'])} | {_ms(latency['max'])} | {_ms(stats['ok_latency']['p99'])} "
+            f"| {_ms(service['p50'])} | {_ms(service['p99'])} |"
+        )
+
+    print(f"\n| {'t (s)':>6} | {'offered/s':>9} | {'err':>5} | {'p50 ms':>8} | {'p99 ms':>8} | {'max ms':>8} |")
+    print(f"| {'-' * 6} | {'-' * 9} | {'-' * 5} | {'-' * 8} | {'-' * 8} | {'-' * 8} |")
+    for point in report["timeline"]:
+        latency = point["latency"]
+        print(
+            f"| {point['start']:>6.0f} | {point['offered_rps']:>9.1f} | {point['errors']:>5} | {_ms(latency['p50'])} "
+            f"| {_ms(latency['p99'])} | {_ms(latency['max'])} |"
+        )
+
+    lag = report["dispatch_lag"]
+    print(f"\nAchieved {report['achieved_rps']:.1f} req/s; dispatch lag p99 {lag['p99']:.1f} ms, max {lag['max']:.1f} ms")
+    if lag["p99"] > 50:
+        print("⚠️  The load generator itself fell behind schedule; latencies include that delay")
+
+    failed = {name: stats["first_error"] for name, stats in report["requests"].items() if stats["errors"]}
+    if failed:
+        print("\n**Errors**\n")
+        for name, error in failed.items():
+            print(f"- {name}: {error}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=20.0, help="Session arrivals per second at full load")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of session arrivals")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds to ramp the arrival rate from 0 to --rate")
+    parser.add_argument("--mix", default="login=6,autosave=3,teacher=1", help="Session weights")
+    parser.add_argument("--autosave-saves", type=int, default=5, help="Saves per autosave session")
+    parser.add_argument("--autosave-interval", type=float, default=2.0, help="Mean seconds between saves")
+    parser.add_argument("--teacher-reads", type=int, default=5, help="Students whose app data a teacher opens")
+    parser.add_argument("--students", type=int, default=2000, help="Sampled students to mint tokens for")
+    parser.add_argument("--teachers", type=int, default=50, help="Teachers to mint tokens for")
+    parser.add_argument("--connections", type=int, default=256, help="Maximum open HTTP connections")
+    parser.add_argument("--window", type=float, default=10.0, help="Seconds per timeline row")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    # Tokens must outlive the run: arrivals, the longest sessions and the client timeout
+    token_ttl = max(3600, math.ceil(args.duration) + 600)
+    ctx = Context(await load_sample(args.students, str(args.seed)), args.teachers, args.seed, token_ttl)
+    schedule = build_schedule(ctx, args, mix)
+    if not schedule:
+        raise SystemExit("No sessions scheduled; raise --rate or --duration")
+    span = schedule[-1][0]
+    print(f"🏫 {len(schedule)} requests scheduled over {span:.0f} s")
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60.0) as client:
+        started = time.perf_counter()
+        results = await run_schedule(client, schedule, args.window)
+        elapsed = time.perf_counter() - started
+
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "base_url": args.base_url,
+            "rate": args.rate,
+            "duration": args.duration,
+            "ramp_up": args.ramp_up,
+            "mix": mix,
+            "district": await district_counts()
+        },
+        "achieved_rps": sum(1 for r in results if r.error is None) / elapsed,
+        **summarize_results(results, span, args.window)
+    }
+
+    print()
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\n📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
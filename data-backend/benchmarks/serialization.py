@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of response serialisation for the nested schemas in app/schemas.py
+Compares FastAPI's default response_model path (re-validate, dump to Python
+objects, stdlib json) with the fast path in app/responses.py on synthetic
+payloads. CPU only, no database needed.
+
+Usage: uv run python -m benchmarks.serialization [--rows N] [--iterations N]
+"""
+
+import argparse
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app import models
+from app.responses import model_response, models_response, rows_response
+from app.schemas import (
+    StudentAppDataResponse,
+    StudentDashboard,
+    SubmissionWithAssignment
+)
+from .stats import summarize, format_row, table_header
+
+NOW = datetime(2026, 10, 17, 12, 0, 0, 123456, tzinfo=timezone.utc)
+
+AppDataRow = namedtuple("AppDataRow", ["app_key", "data_key", "data_value", "created_at", "updated_at"])
+
+
+def _id(n: int) -> uuid.UUID:
+    return uuid.UUID(int=n)
+
+
+def build_orm_graph(rows: int):
+    """Transient ORM objects shaped like a student with rows assignments and submissions"""
+    school = models.School(id=_id(1), name="Demo Elementary", district="Demo", created_at=NOW, updated_at=NOW)
+    teacher = models.Teacher(
+        id=_id(2), school_id=school.id, email="t@demo.test", first_name="Ana", last_name="Garcia",
+        created_at=NOW, updated_at=NOW
+    )
+    class_ = models.Class(
+        id=_id(3), school_id=school.id, teacher_id=teacher.id, teacher=teacher, name="3rd Grade",
+        subject="General", semester="Fall", academic_year="2026", created_at=NOW, updated_at=NOW
+    )
+    student = models.Student(
+        id=_id(4), school_id=school.id, school=school, supabase_user_id=_id(5), email="s@demo.test",
+        first_name="Maya", last_name="Chen", student_number="S-1", grade_level=3, created_at=NOW, updated_at=NOW
+    )
+    enrollment = models.Enrollment(
+        id=_id(6), student_id=student.id, class_id=class_.id, class_=class_,
+        enrollment_status="active", enrolled_at=NOW
+    )
+
+    assignments = []
+    submissions = []
+    for i in range(rows):
+        assignment = models.Assignment(
+            id=_id(1000 + i), class_id=class_.id, class_=class_, name=f"Worksheet {i}",
+            description="Practice problems " * 4, due_date=NOW - timedelta(days=i), points_possible=100,
+            assignment_type="homework", created_at=NOW, updated_at=NOW
+        )
+        assignments.append(assignment)
+        submissions.append(models.Submission(
+            id=_id(5000 + i), student_id=student.id, assignment_id=assignment.id, assignment=assignment,
+            score=Decimal("87.50"), letter_grade="B+", submitted_at=NOW - timedelta(days=i, hours=2),
+            created_at=NOW, updated_at=NOW
+        ))
+
+    return student, enrollment, assignments, submissions
+
+
+def build_app_data_rows(rows: int) -> List[AppDataRow]:
+    return [
+        AppDataRow(
+            "edubot", f"conversation-{i:05d}",
+            {"messages": [{"role": "user", "text": "What is 7 x 8?"}, {"role": "bot", "text": "56"}], "score": 0.75, "done": True},
+            NOW, NOW
+        )
+        for i in range(rows)
+    ]
+
+
+def fastapi_default(response_model):
+    """The stock path: serialize_response against response_model, then JSONResponse"""
+    field = create_model_field(name="Response", type_=response_model, mode="serialization")
+
+    def render(content):
+        # serialize_response never awaits for async endpoints; drive it without an event loop
+        coroutine = serialize_response(field=field, response_content=content)
+        try:
+            coroutine.send(None)
+        except StopIteration as done:
+            return JSONResponse(done.value).body
+        raise RuntimeError("serialize_response suspended")
+
+    return render
+
+
+def build_cases(rows: int):
+    student, enrollment, assignments, submissions = build_orm_graph(rows)
+    dashboard = StudentDashboard.model_validate({
+        "student": student,
+        "enrolled_classes": [enrollment],
+        "recent_assignments": assignments,
+        "recent_submissions": submissions
+    })
+    app_data = build_app_data_rows(rows)
+
+    default_dashboard = fastapi_default(StudentDashboard)
+    default_grades = fastapi_default(List[SubmissionWithAssignment])
+    default_app_data = fastapi_default(List[StudentAppDataResponse])
+
+    # (payload, default path, fast path); each returns the encoded body
+    return [
+        (
+            "dashboard",
+            lambda: default_dashboard(dashboard),
+            lambda: model_response(dashboard).body
+        ),
+        (
+            "grades (ORM rows)",
+            lambda: default_grades(submissions),
+            lambda: models_response(SubmissionWithAssignment, submissions).body
+        ),
+        (
+            "app data",
+            # Endpoints used to build StudentAppDataResponse objects by hand
+            lambda: default_app_data([StudentAppDataResponse(**row._asdict()) for row in app_data]),
+            lambda: rows_response(app_data).body
+        )
+    ]
+
+
+def measure(render, iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="Assignments/submissions/app data rows per payload")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    args = parser.parse_args()
+
+    cases = build_cases(args.rows)
+
+    # The fast path must produce exactly the same bytes
+    for name, default, fast in cases:
+        if default() != fast():
+            raise SystemExit(f"Serialised output differs for {name}")
+
+    print("# Response serialisation benchmark")
+    print(f"*{args.iterations} iterations, {args.rows} rows per payload*\n")
+    print(table_header("us"))
+    for name, default, fast in cases:
+        for label, render in ((f"{name}: default", default), (f"{name}: fast", fast)):
+            measure(render, args.warmup)
+            print(format_row(label, summarize(measure(render, args.iterations))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Latency statistics helpers shared by the benchmark scripts"""
+
+from typing import Dict, List
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not sorted_samples:
+        return float("nan")
+    rank = max(1, int(round(pct / 100 * len(sorted_samples))))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (milliseconds)"""
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else float("nan"),
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else float("nan")
+    }
+
+
+def format_row(name: str, stats: Dict[str, float]) -> str:
+    return (
+        f"| {name:<28} | {stats['count']:>6} | {stats['mean']:>8.2f} | {stats['p50']:>8.2f} "
+        f"| {stats['p95']:>8.2f} | {stats['p99']:>8.2f} | {stats['max']:>8.2f} |"
+    )
+
+
+def table_header(unit: str = "ms") -> str:
+    columns = "".join(f" {f'{name} {unit}':>8} |" for name in ("mean", "p50", "p95", "p99", "max"))
+    return (
+        f"| Case                         |      n |{columns}\n"
+        "| ---------------------------- | ------ | -------- | -------- | -------- | -------- | -------- |"
+    )
+
+
+TABLE_HEADER = table_header("ms")
@@ -0,0 +1,35 @@
+"""Locally minted Supabase-style access tokens for benchmark users"""
+
+import os
+import time
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from jose import jwt
+
+load_dotenv()
+
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+
+
+def mint_token(user_id, role: str, email: Optional[str] = None, ttl: int = 3600) -> str:
+    """HS256 token signed with JWT_SECRET_KEY, shaped like a Supabase access token"""
+    if not JWT_SECRET_KEY:
+        raise SystemExit("JWT_SECRET_KEY must be set to the API's secret to mint benchmark tokens")
+    now = int(time.time())
+    return jwt.encode(
+        {
+            "sub": str(user_id),
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": email,
+            "iat": now,
+            "exp": now + ttl,
+            "user_metadata": {"role": role}
+        },
+        JWT_SECRET_KEY,
+        algorithm="HS256"
+    )
+
+
+def auth_headers(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
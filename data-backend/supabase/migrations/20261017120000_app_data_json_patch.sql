@@ -0,0 +1,35 @@
+-- JSON Merge Patch (RFC 7396) support for student app data
+-- Lets the API apply partial updates to data_value inside Postgres instead of
+-- round-tripping whole documents through the application
+
+create or replace function public.jsonb_merge_patch(target jsonb, patch jsonb)
+returns jsonb as $$
+declare
+    result jsonb;
+    item record;
+begin
+    -- A non-object patch replaces the target entirely
+    if patch is null or jsonb_typeof(patch) <> 'object' then
+        return patch;
+    end if;
+
+    if target is null or jsonb_typeof(target) <> 'object' then
+        result := '{}'::jsonb;
+    else
+        result := target;
+    end if;
+
+    for item in select key, value from jsonb_each(patch) loop
+        if jsonb_typeof(item.value) = 'null' then
+            -- null removes the member
+            result := result - item.key;
+        else
+            result := result || jsonb_build_object(
+                item.key, public.jsonb_merge_patch(result -> item.key, item.value)
+            );
+        end if;
+    end loop;
+
+    return result;
+end;
+$$ language plpgsql immutable;
@@ -0,0 +1,80 @@
+-- Path-based operations on student app data, applied atomically in one UPDATE
+-- Supports set, remove, increment (counters) and append (event arrays) so
+-- clients never need a read-modify-write cycle for high-frequency updates
+
+create or replace function public.jsonb_apply_operations(target jsonb, operations jsonb)
+returns jsonb as $$
+declare
+    result jsonb := coalesce(target, '{}'::jsonb);
+    operation jsonb;
+    path text[];
+    current_value jsonb;
+    max_items integer;
+begin
+    for operation in select value from jsonb_array_elements(operations) loop
+        select coalesce(array_agg(part), '{}') into path
+        from jsonb_array_elements_text(operation -> 'path') as part;
+
+        if cardinality(path) = 0 then
+            raise exception 'operation path must not be empty' using errcode = '22023';
+        end if;
+
+        if operation ->> 'op' = 'remove' then
+            result := result #- path;
+            continue;
+        end if;
+
+        -- Create missing parent objects so writes to nested paths never silently no-op
+        for i in 1 .. cardinality(path) - 1 loop
+            if result #> path[1:i] is null or jsonb_typeof(result #> path[1:i]) = 'null' then
+                result := jsonb_set(result, path[1:i], '{}'::jsonb, true);
+            end if;
+        end loop;
+
+        current_value := result #> path;
+
+        case operation ->> 'op'
+            when 'set' then
+                result := jsonb_set(result, path, coalesce(operation -> 'value', 'null'::jsonb), true);
+
+            when 'increment' then
+                if current_value is not null and jsonb_typeof(current_value) not in ('number', 'null') then
+                    raise exception 'cannot increment non-numeric value at %', path using errcode = '22023';
+                end if;
+                result := jsonb_set(
+                    result,
+                    path,
+                    to_jsonb(
+                        coalesce((current_value #>> '{}')::numeric, 0)
+                        + coalesce((operation ->> 'value')::numeric, 1)
+                    ),
+                    true
+                );
+
+            when 'append' then
+                if current_value is null or jsonb_typeof(current_value) = 'null' then
+                    current_value := '[]'::jsonb;
+                elsif jsonb_typeof(current_value) <> 'array' then
+                    raise exception 'cannot append to non-array value at %', path using errcode = '22023';
+                end if;
+
+                current_value := current_value || jsonb_build_array(coalesce(operation -> 'value', 'null'::jsonb));
+
+                -- Optionally keep only the newest items
+                max_items := (operation ->> 'limit')::integer;
+                if max_items is not null and jsonb_array_length(current_value) > max_items then
+                    select coalesce(jsonb_agg(item order by position), '[]'::jsonb) into current_value
+                    from jsonb_array_elements(current_value) with ordinality as elements(item, position)
+                    where position > jsonb_array_length(current_value) - max_items;
+                end if;
+
+                result := jsonb_set(result, path, current_value, true);
+
+            else
+                raise exception 'unknown operation %', operation ->> 'op' using errcode = '22023';
+        end case;
+    end loop;
+
+    return result;
+end;
+$$ language plpgsql immutable;
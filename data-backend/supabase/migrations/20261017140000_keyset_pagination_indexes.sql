@@ -0,0 +1,14 @@
+-- Indexes backing keyset pagination on list endpoints
+-- Each index matches the endpoint's ORDER BY so pages are read in index order
+-- instead of sorting the full result set
+
+-- /student/grades: ORDER BY submitted_at DESC, id DESC per student
+create index if not exists idx_submissions_student_submitted_at
+    on public.submissions(student_id, submitted_at desc, id desc);
+
+-- /student/assignments: ORDER BY due_date DESC, id DESC within enrolled classes
+create index if not exists idx_assignments_class_due_date
+    on public.assignments(class_id, due_date desc, id desc);
+
+-- /students is ordered by the primary key and /app-data/{student_id}/{app_key}
+-- by the existing unique(student_id, app_key, data_key) index
@@ -0,0 +1,9 @@
+-- Track modification time on enrollments like every other table
+-- Needed for conditional GET validators (ETag/Last-Modified) on class and
+-- assignment lists, which change when enrollment status changes
+
+alter table public.enrollments
+    add column if not exists updated_at timestamp with time zone default timezone('utc'::text, now()) not null;
+
+create trigger handle_updated_at before update on public.enrollments
+    for each row execute function public.handle_updated_at();
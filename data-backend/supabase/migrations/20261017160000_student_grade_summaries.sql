@@ -0,0 +1,212 @@
+-- Per-student, per-class grade summary read model
+-- Maintained incrementally by triggers on submissions (and on assignments for
+-- class/points changes) so grade views are a single primary key lookup
+-- instead of a scan of the student's submission history
+
+create table public.student_grade_summaries (
+    student_id uuid not null references public.students(id) on delete cascade,
+    class_id uuid not null references public.classes(id) on delete cascade,
+    submission_count integer not null default 0,
+    graded_count integer not null default 0, -- submissions with a score
+    score_total decimal(12,2) not null default 0,
+    points_possible_total integer not null default 0, -- points possible of graded submissions
+    latest_letter_grade varchar(5), -- letter grade of the most recently submitted graded work
+    latest_submitted_at timestamp with time zone,
+    updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    primary key (student_id, class_id)
+);
+
+-- Enable Row Level Security
+alter table public.student_grade_summaries enable row level security;
+
+-- Students can see their own summaries
+create policy "Students can view own grade summaries" on public.student_grade_summaries
+    for select using (
+        student_id in (
+            select id from public.students where supabase_user_id = auth.uid()
+        )
+    );
+
+-- Service role can access all data (for API operations)
+create policy "Service role can access all grade summaries" on public.student_grade_summaries
+    for all using (auth.role() = 'service_role');
+
+-- Add or subtract one submission from a summary row
+create or replace function public.apply_grade_summary_delta(
+    p_student_id uuid,
+    p_class_id uuid,
+    p_sign integer,
+    p_score numeric,
+    p_points_possible integer
+)
+returns void as $$
+begin
+    insert into public.student_grade_summaries as s
+        (student_id, class_id, submission_count, graded_count, score_total, points_possible_total)
+    values (
+        p_student_id,
+        p_class_id,
+        p_sign,
+        case when p_score is null then 0 else p_sign end,
+        p_sign * coalesce(p_score, 0),
+        case when p_score is null then 0 else p_sign * coalesce(p_points_possible, 0) end
+    )
+    on conflict (student_id, class_id) do update set
+        submission_count = s.submission_count + excluded.submission_count,
+        graded_count = s.graded_count + excluded.graded_count,
+        score_total = s.score_total + excluded.score_total,
+        points_possible_total = s.points_possible_total + excluded.points_possible_total,
+        updated_at = timezone('utc'::text, now());
+end;
+$$ language plpgsql;
+
+-- Recompute the latest letter grade of one summary row (indexed by student)
+create or replace function public.refresh_grade_summary_latest(p_student_id uuid, p_class_id uuid)
+returns void as $$
+begin
+    update public.student_grade_summaries s set
+        (latest_letter_grade, latest_submitted_at) = (
+            select sub.letter_grade, sub.submitted_at
+            from public.submissions sub
+            join public.assignments a on a.id = sub.assignment_id
+            where sub.student_id = p_student_id
+              and a.class_id = p_class_id
+              and sub.letter_grade is not null
+            order by sub.submitted_at desc nulls last, sub.id desc
+            limit 1
+        ),
+        updated_at = timezone('utc'::text, now())
+    where s.student_id = p_student_id and s.class_id = p_class_id;
+end;
+$$ language plpgsql;
+
+-- Recompute one summary row from scratch
+create or replace function public.rebuild_grade_summary(p_student_id uuid, p_class_id uuid)
+returns void as $$
+begin
+    delete from public.student_grade_summaries
+    where student_id = p_student_id and class_id = p_class_id;
+
+    insert into public.student_grade_summaries
+        (student_id, class_id, submission_count, graded_count, score_total, points_possible_total)
+    select
+        sub.student_id,
+        a.class_id,
+        count(*),
+        count(sub.score),
+        coalesce(sum(sub.score), 0),
+        coalesce(sum(a.points_possible) filter (where sub.score is not null), 0)
+    from public.submissions sub
+    join public.assignments a on a.id = sub.assignment_id
+    where sub.student_id = p_student_id and a.class_id = p_class_id
+    group by sub.student_id, a.class_id;
+
+    perform public.refresh_grade_summary_latest(p_student_id, p_class_id);
+end;
+$$ language plpgsql;
+
+-- Row trigger on submissions: subtract the old row, add the new one
+create or replace function public.maintain_grade_summary()
+returns trigger as $$
+declare
+    old_class_id uuid;
+    new_class_id uuid;
+    old_points integer;
+    new_points integer;
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        select class_id, points_possible into old_class_id, old_points
+        from public.assignments where id = old.assignment_id;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        select class_id, points_possible into new_class_id, new_points
+        from public.assignments where id = new.assignment_id;
+    end if;
+
+    if tg_op = 'UPDATE'
+       and old.student_id = new.student_id
+       and old_class_id = new_class_id
+       and old.assignment_id = new.assignment_id
+       and old.score is not distinct from new.score
+       and old.letter_grade is not distinct from new.letter_grade
+       and old.submitted_at is not distinct from new.submitted_at then
+        -- Nothing summarised changed
+        return null;
+    end if;
+
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform public.apply_grade_summary_delta(old.student_id, old_class_id, -1, old.score, old_points);
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_grade_summary_delta(new.student_id, new_class_id, 1, new.score, new_points);
+    end if;
+
+    if tg_op in ('UPDATE', 'DELETE') then
+        delete from public.student_grade_summaries
+        where student_id = old.student_id and class_id = old_class_id and submission_count <= 0;
+
+        if old.letter_grade is not null then
+            perform public.refresh_grade_summary_latest(old.student_id, old_class_id);
+        end if;
+    end if;
+
+    if tg_op in ('INSERT', 'UPDATE') and new.letter_grade is not null then
+        perform public.refresh_grade_summary_latest(new.student_id, new_class_id);
+    end if;
+
+    return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create trigger maintain_grade_summary after insert or update or delete on public.submissions
+    for each row execute function public.maintain_grade_summary();
+
+-- Moving an assignment to another class or changing its points possible
+-- affects every summary row it contributes to
+create or replace function public.maintain_grade_summary_for_assignment()
+returns trigger as $$
+begin
+    perform public.rebuild_grade_summary(affected.student_id, affected.class_id)
+    from (
+        select distinct sub.student_id, c.class_id
+        from public.submissions sub
+        cross join (values (old.class_id), (new.class_id)) as c(class_id)
+        where sub.assignment_id = new.id
+    ) as affected;
+
+    return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create trigger maintain_grade_summary_for_assignment after update of class_id, points_possible on public.assignments
+    for each row
+    when (old.class_id is distinct from new.class_id or old.points_possible is distinct from new.points_possible)
+    execute function public.maintain_grade_summary_for_assignment();
+
+-- Backfill from existing submissions
+insert into public.student_grade_summaries
+    (student_id, class_id, submission_count, graded_count, score_total, points_possible_total)
+select
+    sub.student_id,
+    a.class_id,
+    count(*),
+    count(sub.score),
+    coalesce(sum(sub.score), 0),
+    coalesce(sum(a.points_possible) filter (where sub.score is not null), 0)
+from public.submissions sub
+join public.assignments a on a.id = sub.assignment_id
+group by sub.student_id, a.class_id;
+
+update public.student_grade_summaries s set
+    (latest_letter_grade, latest_submitted_at) = (
+        select sub.letter_grade, sub.submitted_at
+        from public.submissions sub
+        join public.assignments a on a.id = sub.assignment_id
+        where sub.student_id = s.student_id
+          and a.class_id = s.class_id
+          and sub.letter_grade is not null
+        order by sub.submitted_at desc nulls last, sub.id desc
+        limit 1
+    );
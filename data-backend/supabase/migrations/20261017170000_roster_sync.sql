@@ -0,0 +1,17 @@
+-- Bulk roster sync from SIS/LMS exports (see app/roster.py)
+-- sis_id is the source system's identifier, used as the merge key so nightly
+-- syncs are idempotent; rows created in the app keep sis_id null
+
+alter table public.schools add column if not exists sis_id varchar(255);
+alter table public.teachers add column if not exists sis_id varchar(255);
+alter table public.students add column if not exists sis_id varchar(255);
+alter table public.classes add column if not exists sis_id varchar(255);
+
+create unique index if not exists idx_schools_sis_id on public.schools(sis_id);
+create unique index if not exists idx_teachers_sis_id on public.teachers(sis_id);
+create unique index if not exists idx_students_sis_id on public.students(sis_id);
+create unique index if not exists idx_classes_sis_id on public.classes(sis_id);
+
+-- Rostered students exist before they have a Supabase account; they are
+-- linked later through user metadata (student_id) or supabase_user_id
+alter table public.students alter column supabase_user_id drop not null;
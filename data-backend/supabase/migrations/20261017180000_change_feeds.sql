@@ -0,0 +1,103 @@
+-- Incremental "changes since" feeds (see app/changes.py)
+-- Clients keep a cursor of (updated_at, id) positions and only fetch rows
+-- modified after it. Deleted rows leave a tombstone in deleted_records so
+-- clients can drop them too.
+
+-- Tombstones for rows deleted from the synced tables
+create table public.deleted_records (
+    id uuid default gen_random_uuid() primary key,
+    table_name text not null,
+    record_id uuid not null,
+    student_id uuid, -- submissions, enrollments, student_app_data
+    class_id uuid, -- assignments, enrollments
+    app_key varchar(100), -- student_app_data
+    data_key varchar(200), -- student_app_data
+    deleted_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+-- Enable Row Level Security
+alter table public.deleted_records enable row level security;
+
+-- Students can see tombstones of their own rows
+create policy "Students can view own deleted records" on public.deleted_records
+    for select using (
+        student_id in (
+            select id from public.students where supabase_user_id = auth.uid()
+        )
+    );
+
+-- Service role can access all data (for API operations)
+create policy "Service role can access all deleted records" on public.deleted_records
+    for all using (auth.role() = 'service_role');
+
+-- Statement level, so bulk deletes (e.g. all app data for an app) write all
+-- their tombstones with one insert
+create or replace function public.record_deletions()
+returns trigger as $$
+begin
+    insert into public.deleted_records (table_name, record_id, student_id, class_id, app_key, data_key)
+    select
+        tg_table_name,
+        d.id,
+        (to_jsonb(d) ->> 'student_id')::uuid,
+        (to_jsonb(d) ->> 'class_id')::uuid,
+        to_jsonb(d) ->> 'app_key',
+        to_jsonb(d) ->> 'data_key'
+    from deleted d;
+    return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create trigger record_deletions after delete on public.assignments
+    referencing old table as deleted
+    for each statement execute function public.record_deletions();
+
+create trigger record_deletions after delete on public.submissions
+    referencing old table as deleted
+    for each statement execute function public.record_deletions();
+
+create trigger record_deletions after delete on public.enrollments
+    referencing old table as deleted
+    for each statement execute function public.record_deletions();
+
+create trigger record_deletions after delete on public.student_app_data
+    referencing old table as deleted
+    for each statement execute function public.record_deletions();
+
+-- Remove tombstones older than the feed's retention; clients with an older
+-- cursor get 410 Gone and resync from scratch (run daily, e.g. with pg_cron)
+create or replace function public.purge_deleted_records(retention interval)
+returns bigint as $$
+    with purged as (
+        delete from public.deleted_records
+        where deleted_at < timezone('utc'::text, now()) - retention
+        returning 1
+    )
+    select count(*) from purged;
+$$ language sql security definer set search_path = public;
+
+-- Feed indexes: every feed reads ORDER BY updated_at, id within its scope.
+-- The assignments feed is a UNION ALL of its two change sources, each with
+-- its own keyset range: assignment edits in enrolled classes
+-- (idx_assignments_class_updated_at) and enrollment (re)joins that bring a
+-- class's existing assignments into scope (idx_enrollments_student_updated_at)
+create index if not exists idx_assignments_class_updated_at
+    on public.assignments(class_id, updated_at, id);
+
+create index if not exists idx_submissions_student_updated_at
+    on public.submissions(student_id, updated_at, id);
+
+create index if not exists idx_enrollments_student_updated_at
+    on public.enrollments(student_id, updated_at, id);
+
+create index if not exists idx_student_app_data_student_updated_at
+    on public.student_app_data(student_id, updated_at, id);
+
+create index if not exists idx_deleted_records_student
+    on public.deleted_records(student_id, deleted_at, id);
+
+create index if not exists idx_deleted_records_class
+    on public.deleted_records(class_id, deleted_at, id) where table_name = 'assignments';
+
+create index if not exists idx_deleted_records_deleted_at
+    on public.deleted_records(deleted_at);
@@ -0,0 +1,45 @@
+-- Live change notifications for the event stream endpoints (see app/events.py)
+-- Each API worker LISTENs on edu_changes and fans notifications out to its
+-- subscribed clients. Payloads only identify the changed row (NOTIFY payloads
+-- are limited to 8000 bytes); clients fetch the data they need.
+
+create or replace function public.notify_change()
+returns trigger as $$
+declare
+    rec record;
+    payload jsonb;
+begin
+    if tg_op = 'DELETE' then
+        rec := old;
+    else
+        rec := new;
+    end if;
+
+    payload := jsonb_build_object(
+        'table', tg_table_name,
+        'op', lower(tg_op),
+        'id', rec.id,
+        'student_id', rec.student_id
+    );
+
+    if tg_table_name = 'student_app_data' then
+        payload := payload || jsonb_build_object('app_key', rec.app_key, 'data_key', rec.data_key);
+    else
+        -- Submissions also go to subscribers of the assignment's class
+        payload := payload || jsonb_build_object(
+            'assignment_id', rec.assignment_id,
+            'class_id', (select class_id from public.assignments where id = rec.assignment_id)
+        );
+    end if;
+
+    -- Delivered on commit, and not at all if the transaction rolls back
+    perform pg_notify('edu_changes', payload::text);
+    return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create trigger notify_change after insert or update or delete on public.student_app_data
+    for each row execute function public.notify_change();
+
+create trigger notify_change after insert or update or delete on public.submissions
+    for each row execute function public.notify_change();
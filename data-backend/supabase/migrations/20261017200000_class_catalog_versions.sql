@@ -0,0 +1,63 @@
+-- Per-class versions for the catalog cache (see app/catalog.py)
+-- Bumped by triggers whenever a class, its teacher or its assignments change,
+-- however the write is made (API, roster sync, SQL), so a cached class or
+-- assignment list is checked with a primary key lookup per class instead of
+-- re-aggregating its assignments on every request. Versions come from one
+-- sequence, so a deleted and recreated class never reuses an old version.
+
+create sequence public.class_catalog_version_seq;
+
+create table public.class_catalog_versions (
+    class_id uuid primary key references public.classes(id) on delete cascade,
+    -- the class and its teacher (class cache entries)
+    class_version bigint not null default nextval('public.class_catalog_version_seq'),
+    -- the class's assignments, which embed the class (assignment cache entries)
+    assignments_version bigint not null default nextval('public.class_catalog_version_seq')
+);
+
+-- Enable Row Level Security
+alter table public.class_catalog_versions enable row level security;
+
+-- Service role can access all data (for API operations)
+create policy "Service role can access all class catalog versions" on public.class_catalog_versions
+    for all using (auth.role() = 'service_role');
+
+create or replace function public.bump_class_catalog_version()
+returns trigger as $$
+begin
+    if tg_table_name = 'classes' then
+        if tg_op = 'INSERT' then
+            insert into public.class_catalog_versions (class_id) values (new.id);
+        else
+            update public.class_catalog_versions set
+                class_version = nextval('public.class_catalog_version_seq'),
+                assignments_version = nextval('public.class_catalog_version_seq')
+            where class_id = new.id;
+        end if;
+    elsif tg_table_name = 'teachers' then
+        update public.class_catalog_versions set
+            class_version = nextval('public.class_catalog_version_seq')
+        where class_id in (select id from public.classes where teacher_id = new.id);
+    else
+        -- assignments: the old and new class when an assignment moves
+        update public.class_catalog_versions set
+            assignments_version = nextval('public.class_catalog_version_seq')
+        where class_id in (old.class_id, new.class_id);
+    end if;
+
+    return null;
+end;
+$$ language plpgsql security definer set search_path = public;
+
+create trigger bump_class_catalog_version after insert or update on public.classes
+    for each row execute function public.bump_class_catalog_version();
+
+create trigger bump_class_catalog_version after update on public.teachers
+    for each row execute function public.bump_class_catalog_version();
+
+create trigger bump_class_catalog_version after insert or update or delete on public.assignments
+    for each row execute function public.bump_class_catalog_version();
+
+-- Backfill existing classes
+insert into public.class_catalog_versions (class_id)
+select id from public.classes;
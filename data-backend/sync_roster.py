@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script to sync school rosters from SIS CSV exports
+Loads schools, teachers, students, classes and enrollments with COPY and
+set-based merges keyed on sis_id; re-running with the same files changes nothing
+
+Usage: uv run python sync_roster.py <directory with schools.csv, teachers.csv, ...> [--dry-run] [--keep-missing]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from app.cache import stop_cache
+from app.roster import ENTITIES, sync_roster
+
+
+def find_files(directory):
+    """Roster files present in directory, by entity"""
+    files = {}
+    for entity in ENTITIES:
+        path = os.path.join(directory, f"{entity}.csv")
+        if os.path.exists(path):
+            files[entity] = path
+    return files
+
+
+async def run(files, args):
+    try:
+        return await sync_roster(files, deactivate_missing=not args.keep_missing, dry_run=args.dry_run)
+    finally:
+        await stop_cache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Directory containing the roster CSV files")
+    parser.add_argument("--dry-run", action="store_true", help="Run the sync and report counts, then roll back")
+    parser.add_argument(
+        "--keep-missing", action="store_true",
+        help="Do not deactivate enrollments missing from enrollments.csv (for partial exports)"
+    )
+    args = parser.parse_args()
+
+    files = find_files(args.directory)
+    if not files:
+        print(f"❌ No roster files found in {args.directory} (expected {', '.join(f'{e}.csv' for e in ENTITIES)})")
+        sys.exit(1)
+
+    print("🏫 Syncing Roster")
+    print("=" * 60)
+    print("Files:", ", ".join(os.path.basename(path) for path in files.values()))
+    if args.dry_run:
+        print("Dry run: changes will be rolled back")
+    print()
+
+    started = time.perf_counter()
+    try:
+        stats = asyncio.run(run(files, args))
+    except Exception as e:
+        print(f"❌ Roster sync failed, nothing was changed: {str(e)}")
+        sys.exit(1)
+
+    print(f"{'Entity':<12} | {'Rows':>8} | {'Inserted':>8} | {'Updated':>8} | {'Unchanged':>9} | {'Skipped':>7} | {'Seconds':>7}")
+    print("-" * 80)
+    for entity, counts in stats.items():
+        print(
+            f"{entity:<12} | {counts['staged']:>8} | {counts['inserted']:>8} | {counts['updated']:>8} | "
+            f"{counts['unchanged']:>9} | {counts['skipped']:>7} | {counts['seconds']:>7.3f}"
+        )
+
+    if "enrollments" in stats:
+        print(f"\nDeactivated enrollments: {stats['enrollments']['deactivated']}")
+    if any(counts["skipped"] for counts in stats.values()):
+        print("⚠️  Skipped rows repeat a key, reference an unknown sis_id or miss a required value")
+
+    print(f"\n✨ {'Dry run finished' if args.dry_run else 'Sync complete'} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
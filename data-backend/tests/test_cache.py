@@ -0,0 +1,160 @@
+"""SharedCache with RedisBackend, using fakeredis as the Redis server workers share"""
+
+import asyncio
+import json
+import uuid
+import fakeredis
+import pytest
+from app import cache
+
+KEY_PREFIX = "test-cache"
+
+
+def redis_backend(server: fakeredis.FakeServer) -> cache.RedisBackend:
+    return cache.RedisBackend(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), key_prefix=KEY_PREFIX)
+
+
+def shared_cache(**kwargs) -> cache.SharedCache:
+    return cache.SharedCache(f"test-{uuid.uuid4().hex[:8]}", **kwargs)
+
+
+async def eventually(predicate, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.02)
+
+
+async def next_message(pubsub, timeout: float = 5.0) -> dict:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        message = await pubsub.get_message(timeout=0.1)
+        if message is not None:
+            return message
+    raise AssertionError("no message received in time")
+
+
+@pytest.fixture
+def server(monkeypatch) -> fakeredis.FakeServer:
+    """A fake Redis server behind this worker's cache backend"""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(cache, "backend", redis_backend(server))
+    monkeypatch.setattr(cache, "_backend_retry_at", 0.0)
+    monkeypatch.setattr(cache, "_loop", None)
+    return server
+
+
+def test_values_round_trip_through_shared_tier(server):
+    async def run():
+        values = shared_cache(ttl=60)
+        await values.set("k", {"a": [1, 2]})
+
+        # Another worker starts with an empty local tier
+        values.local.clear()
+        assert await values.get("k") == {"a": [1, 2]}
+        assert await values.get("missing") is None
+        assert values.stats()["shared_hits"] == 1
+        assert values.stats()["shared_misses"] == 1
+
+        # The shared hit was copied to the local tier
+        assert values.local.get("k") == {"a": [1, 2]}
+
+    asyncio.run(run())
+
+
+def test_shared_entries_expire(server):
+    async def run():
+        values = shared_cache(ttl=1)
+        client = cache.backend.client
+        await values.set("short", 1, ttl=0.2)
+        await values.set("capped", 2, ttl=600)
+
+        assert 0 < await client.pttl(f"{KEY_PREFIX}:{values.namespace}:short") <= 200
+        # Per-entry TTLs are capped at the cache-wide TTL
+        assert 200 < await client.pttl(f"{KEY_PREFIX}:{values.namespace}:capped") <= 1000
+
+        await asyncio.sleep(0.3)
+        values.local.clear()
+        assert await values.get("short") is None
+        assert await values.get("capped") == 2
+
+    asyncio.run(run())
+
+
+def test_invalidate_drops_shared_entry_and_notifies_workers(server):
+    async def run():
+        values = shared_cache(ttl=60)
+        other_worker = redis_backend(server)
+        pubsub = other_worker.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(other_worker.channel)
+
+        key = uuid.uuid4()
+        await values.set(key, "v")
+        values.invalidate(key)
+        await cache.flush_pending()
+
+        assert values.local.get(key) is None
+        assert await cache.backend.client.get(f"{KEY_PREFIX}:{values.namespace}:{key}") is None
+
+        message = await next_message(pubsub)
+        assert json.loads(message["data"]) == {"origin": cache.WORKER_ID, "namespace": values.namespace, "key": str(key)}
+        await pubsub.aclose()
+
+    asyncio.run(run())
+
+
+def test_invalidations_from_other_workers_drop_local_entries(server):
+    async def run():
+        values = shared_cache(ttl=60)
+        other_worker = redis_backend(server)
+        await cache.start_cache()
+        try:
+            await eventually(lambda: cache.backend.listening)
+
+            # UUID keys arrive as strings
+            key = uuid.uuid4()
+            values.local.set(key, "stale")
+            values.local.set("kept", "fresh")
+            await other_worker.publish({"origin": "other-worker", "namespace": values.namespace, "key": str(key)})
+            await eventually(lambda: values.local.get(key) is None)
+            assert values.local.get("kept") == "fresh"
+
+            # A namespace-wide invalidation (key None) clears the local tier
+            await other_worker.publish({"origin": "other-worker", "namespace": values.namespace, "key": None})
+            await eventually(lambda: values.local.get("kept") is None)
+            assert values.stats()["invalidations_received"] == 2
+
+            # This worker's own messages were already applied locally
+            values.local.set("own", 1)
+            await other_worker.publish({"origin": cache.WORKER_ID, "namespace": values.namespace, "key": "own"})
+            await asyncio.sleep(0.2)
+            assert values.local.get("own") == 1
+        finally:
+            await cache.stop_cache()
+
+    asyncio.run(run())
+
+
+def test_listener_retries_until_redis_is_up(server):
+    async def run():
+        values = shared_cache(ttl=60)
+        other_worker = redis_backend(server)
+        server.connected = False
+        await cache.start_cache()
+        try:
+            await asyncio.sleep(0.2)
+            assert not cache.backend.listening
+
+            # Cached while invalidations could not be received
+            values.local.set("k", "maybe stale")
+            server.connected = True
+            await eventually(lambda: cache.backend.listening)
+            assert values.local.get("k") is None
+
+            values.local.set("k", "v")
+            await other_worker.publish({"origin": "other-worker", "namespace": values.namespace, "key": "k"})
+            await eventually(lambda: values.local.get("k") is None)
+        finally:
+            await cache.stop_cache()
+
+    asyncio.run(run())
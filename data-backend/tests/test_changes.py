@@ -0,0 +1,260 @@
+"""Incremental change feeds (load_changes) against the database
+
+Every test takes the database fixture (conftest.py) and works on its own
+school, teacher, classes and student, deleted afterwards. The settle delay
+is 0 unless a test says otherwise, so a poll sees every committed write.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from app import changes
+from app.changes import FEEDS, NIL_ID, encode_positions, load_changes
+from app.database import AsyncSessionLocal
+
+
+def run(database, coroutine):
+    """asyncio.run, dropping pooled connections afterwards, which belong to that run's event loop"""
+    try:
+        return asyncio.run(coroutine)
+    finally:
+        database.sync_engine.dispose(close=False)
+
+
+async def execute(database, sql: str, **params):
+    """Run one statement in its own transaction; returns the first column of the first row, if any"""
+    async with database.begin() as conn:
+        result = await conn.execute(text(sql), params)
+        return result.scalar() if result.returns_rows else None
+
+
+async def poll(student_id, cursor=None, limit: int = 100):
+    async with AsyncSessionLocal() as db:
+        return await load_changes(db, student_id, cursor, limit)
+
+
+async def poll_all(student_id, cursor=None, limit: int = 100):
+    """Follow has_more until the feeds are drained; returns (pages, final cursor)"""
+    pages = []
+    while True:
+        page = await poll(student_id, cursor, limit)
+        pages.append(page)
+        cursor = page.cursor
+        if not page.has_more:
+            return pages, cursor
+
+
+def ids(pages, feed: str) -> list:
+    """Row identities in one feed: record_id for tombstones, data_key for app data (its responses carry no id)"""
+    field = {"deleted": "record_id", "app_data": "data_key"}.get(feed, "id")
+    return [getattr(row, field) for page in pages for row in getattr(page, feed)]
+
+
+class Roster:
+    """A student enrolled in class A (3 assignments, 2 submissions, 3 app data keys); class B is not theirs"""
+
+    def __init__(self, database):
+        self.database = database
+        self.school_id, self.teacher_id, self.student_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        self.class_a, self.class_b = uuid.uuid4(), uuid.uuid4()
+
+    async def create(self):
+        tag = self.student_id.hex[:8]
+        await execute(self.database, "insert into schools (id, name) values (:id, 'Feed School')", id=self.school_id)
+        await execute(
+            self.database,
+            "insert into teachers (id, school_id, email, first_name, last_name) values (:id, :school, :email, 'Tess', 'Teacher')",
+            id=self.teacher_id, school=self.school_id, email=f"{tag}@teachers.test"
+        )
+        for class_id in (self.class_a, self.class_b):
+            await execute(
+                self.database,
+                "insert into classes (id, school_id, teacher_id, name) values (:id, :school, :teacher, 'Feed Class')",
+                id=class_id, school=self.school_id, teacher=self.teacher_id
+            )
+        await execute(
+            self.database,
+            "insert into students (id, school_id, supabase_user_id, email, first_name, last_name) "
+            "values (:id, :school, gen_random_uuid(), :email, 'Ada', 'Student')",
+            id=self.student_id, school=self.school_id, email=f"{tag}@students.test"
+        )
+        self.assignments_a = [await self.add_assignment(self.class_a, f"A{i}") for i in range(3)]
+        self.assignments_b = [await self.add_assignment(self.class_b, f"B{i}") for i in range(2)]
+        self.enrollment_a = await self.enroll(self.class_a)
+        self.submissions = [await self.submit(assignment_id) for assignment_id in self.assignments_a[:2]]
+        self.data_keys = [f"k{i}" for i in range(3)]
+        self.app_data = [await self.put_app_data(data_key) for data_key in self.data_keys]
+
+    async def add_assignment(self, class_id, name: str) -> uuid.UUID:
+        return await execute(
+            self.database,
+            "insert into assignments (class_id, name, points_possible) values (:class_id, :name, 10) returning id",
+            class_id=class_id, name=name
+        )
+
+    async def enroll(self, class_id) -> uuid.UUID:
+        return await execute(
+            self.database,
+            "insert into enrollments (student_id, class_id) values (:student, :class_id) returning id",
+            student=self.student_id, class_id=class_id
+        )
+
+    async def submit(self, assignment_id) -> uuid.UUID:
+        return await execute(
+            self.database,
+            "insert into submissions (student_id, assignment_id, score) values (:student, :assignment, 9) returning id",
+            student=self.student_id, assignment=assignment_id
+        )
+
+    async def put_app_data(self, data_key: str, value: int = 1) -> uuid.UUID:
+        return await execute(
+            self.database,
+            "insert into student_app_data (student_id, app_key, data_key, data_value) "
+            "values (:student, 'feed', :key, jsonb_build_object('value', cast(:value as integer))) "
+            "on conflict (student_id, app_key, data_key) do update set data_value = excluded.data_value returning id",
+            student=self.student_id, key=data_key, value=value
+        )
+
+    async def delete(self):
+        classes = {"a": self.class_a, "b": self.class_b}
+        for sql in (
+            "delete from student_app_data where student_id = :student",
+            "delete from submissions where student_id = :student",
+            "delete from enrollments where student_id = :student",
+            "delete from assignments where class_id in (:a, :b)",
+            "delete from classes where id in (:a, :b)",
+            "delete from student_grade_summaries where student_id = :student",
+            "delete from students where id = :student",
+            "delete from teachers where id = :teacher",
+            "delete from schools where id = :school",
+            "delete from deleted_records where student_id = :student or class_id in (:a, :b)"
+        ):
+            await execute(
+                self.database, sql,
+                **{name: value for name, value in dict(
+                    student=self.student_id, teacher=self.teacher_id, school=self.school_id, **classes
+                ).items() if f":{name}" in sql}
+            )
+
+
+@pytest.fixture
+def roster(database, monkeypatch):
+    monkeypatch.setattr(changes, "CHANGES_SETTLE_SECONDS", 0)
+    roster = Roster(database)
+    run(database, roster.create())
+    yield roster
+    run(database, roster.delete())
+
+
+def test_full_sync_pages_through_every_feed_once(roster):
+    async def check():
+        pages, _ = await poll_all(roster.student_id, limit=2)
+        assert len(pages) == 2
+        assert pages[0].has_more and not pages[-1].has_more
+
+        assert sorted(ids(pages, "assignments")) == sorted(roster.assignments_a)
+        assert sorted(ids(pages, "submissions")) == sorted(roster.submissions)
+        assert ids(pages, "enrollments") == [roster.enrollment_a]
+        assert sorted(ids(pages, "app_data")) == roster.data_keys
+        # A full sync has nothing to delete
+        assert ids(pages, "deleted") == []
+
+    run(roster.database, check())
+
+
+def test_cursor_resumes_after_the_last_change(roster):
+    async def check():
+        _, cursor = await poll_all(roster.student_id)
+
+        quiet = await poll(roster.student_id, cursor)
+        assert all(getattr(quiet, feed) == [] for feed in FEEDS)
+
+        await roster.put_app_data("k1", value=2)
+        new_assignment = await roster.add_assignment(roster.class_a, "A3")
+        # Not the student's class
+        await roster.add_assignment(roster.class_b, "B2")
+
+        page = await poll(roster.student_id, quiet.cursor)
+        assert ids([page], "app_data") == ["k1"]
+        assert page.app_data[0].data_value == {"value": 2}
+        assert ids([page], "assignments") == [new_assignment]
+        assert page.submissions == [] and page.enrollments == []
+
+        again = await poll(roster.student_id, page.cursor)
+        assert all(getattr(again, feed) == [] for feed in FEEDS)
+
+    run(roster.database, check())
+
+
+def test_joining_a_class_brings_its_existing_assignments(roster):
+    async def check():
+        _, cursor = await poll_all(roster.student_id)
+
+        # Class B's assignments are older than the enrollment (the joined branch)
+        enrollment_b = await roster.enroll(roster.class_b)
+        pages, cursor = await poll_all(roster.student_id, cursor, limit=1)
+        assert sorted(ids(pages, "assignments")) == sorted(roster.assignments_b)
+        assert ids(pages, "enrollments") == [enrollment_b]
+
+        # Editing one afterwards sends it again, once (the edited branch)
+        await execute(
+            roster.database, "update assignments set name = 'B0 (edited)' where id = :id", id=roster.assignments_b[0]
+        )
+        page = await poll(roster.student_id, cursor)
+        assert ids([page], "assignments") == [roster.assignments_b[0]]
+        assert page.assignments[0].name == "B0 (edited)"
+
+    run(roster.database, check())
+
+
+def test_deletions_arrive_as_tombstones(roster):
+    async def check():
+        _, cursor = await poll_all(roster.student_id)
+
+        await execute(
+            roster.database, "delete from student_app_data where id = :id", id=roster.app_data[0]
+        )
+        await execute(roster.database, "delete from submissions where id = :id", id=roster.submissions[0])
+        await execute(roster.database, "delete from assignments where id = :id", id=roster.assignments_a[2])
+        # A class the student is not in: not theirs to delete
+        await execute(roster.database, "delete from assignments where id = :id", id=roster.assignments_b[1])
+
+        page = await poll(roster.student_id, cursor)
+        tombstones = {(row.table_name, row.record_id) for row in page.deleted}
+        assert tombstones == {
+            ("student_app_data", roster.app_data[0]),
+            ("submissions", roster.submissions[0]),
+            ("assignments", roster.assignments_a[2])
+        }
+
+        again = await poll(roster.student_id, page.cursor)
+        assert again.deleted == []
+
+    run(roster.database, check())
+
+
+def test_settle_delay_holds_back_recent_changes(roster, monkeypatch):
+    async def check():
+        monkeypatch.setattr(changes, "CHANGES_SETTLE_SECONDS", 3600)
+        held = await poll(roster.student_id)
+        assert all(getattr(held, feed) == [] for feed in FEEDS)
+
+        # Once settled they arrive, from the cursor that held them back
+        monkeypatch.setattr(changes, "CHANGES_SETTLE_SECONDS", 0)
+        pages, _ = await poll_all(roster.student_id, held.cursor)
+        assert sorted(ids(pages, "app_data")) == roster.data_keys
+        assert sorted(ids(pages, "assignments")) == sorted(roster.assignments_a)
+
+    run(roster.database, check())
+
+
+def test_cursor_older_than_tombstone_retention_is_gone(database):
+    expired = datetime.now(timezone.utc) - timedelta(days=changes.CHANGES_TOMBSTONE_RETENTION_DAYS + 1)
+    cursor = encode_positions(dict.fromkeys(FEEDS, (expired, NIL_ID)))
+
+    with pytest.raises(HTTPException) as error:
+        run(database, poll(uuid.uuid4(), cursor))
+    assert error.value.status_code == 410
@@ -0,0 +1,168 @@
+"""compute_gradebook on hand-built rows (no database needed)"""
+
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+from app.gradebook import compute_gradebook
+from app.schemas import ClassWithTeacher
+
+# Shaped like the rows load_gradebook selects
+StudentRow = namedtuple("StudentRow", "id first_name last_name")
+AssignmentRow = namedtuple("AssignmentRow", "id name due_date points_possible")
+SubmissionRow = namedtuple("SubmissionRow", "student_id assignment_id score")
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+PAST = NOW - timedelta(days=1)
+FUTURE = NOW + timedelta(days=1)
+
+
+def class_with_teacher() -> ClassWithTeacher:
+    school_id, teacher_id = uuid.uuid4(), uuid.uuid4()
+    return ClassWithTeacher(
+        id=uuid.uuid4(),
+        school_id=school_id,
+        teacher_id=teacher_id,
+        name="Period 1",
+        created_at=NOW,
+        updated_at=NOW,
+        teacher={
+            "id": teacher_id,
+            "school_id": school_id,
+            "first_name": "Maria",
+            "last_name": "Garcia",
+            "created_at": NOW,
+            "updated_at": NOW
+        }
+    )
+
+
+def student(name: str) -> StudentRow:
+    return StudentRow(uuid.uuid4(), name, "Student")
+
+
+def assignment(name: str, points_possible: int, due_date=PAST) -> AssignmentRow:
+    return AssignmentRow(uuid.uuid4(), name, due_date, points_possible)
+
+
+def submission(student_row, assignment_row, score) -> SubmissionRow:
+    return SubmissionRow(student_row.id, assignment_row.id, None if score is None else Decimal(str(score)))
+
+
+def gradebook(assignments, students, submissions):
+    return compute_gradebook(class_with_teacher(), assignments, students, submissions, now=NOW)
+
+
+def test_student_percent_is_weighted_by_points_possible():
+    quiz, test = assignment("Quiz", 10), assignment("Test", 90)
+    ada = student("Ada")
+    result = gradebook([quiz, test], [ada], [submission(ada, quiz, 10), submission(ada, test, 45)])
+
+    totals = result.students[0]
+    assert totals.score_total == 55
+    assert totals.points_possible_total == 100
+    # 55 of 100 points, not the 75% mean of 100% and 50%
+    assert totals.percent == 55.0
+
+
+def test_ungraded_submissions_do_not_count_towards_points_possible():
+    quiz, test = assignment("Quiz", 10), assignment("Test", 90)
+    ada = student("Ada")
+    result = gradebook([quiz, test], [ada], [submission(ada, quiz, 8), submission(ada, test, None)])
+
+    totals = result.students[0]
+    assert (totals.submitted_count, totals.graded_count) == (2, 1)
+    assert totals.points_possible_total == 10
+    assert totals.percent == 80.0
+
+    test_stats = result.assignments[1]
+    assert (test_stats.submitted_count, test_stats.graded_count) == (1, 0)
+    assert test_stats.mean is None and test_stats.median is None
+    assert sum(test_stats.distribution.values()) == 0
+
+
+def test_missing_counts_only_past_due_work_without_a_submission():
+    overdue = assignment("Overdue", 10, due_date=PAST)
+    submitted_late = assignment("Submitted", 10, due_date=PAST)
+    upcoming = assignment("Upcoming", 10, due_date=FUTURE)
+    undated = assignment("Undated", 10, due_date=None)
+    ada = student("Ada")
+    result = gradebook(
+        [overdue, submitted_late, upcoming, undated],
+        [ada],
+        # Submitted but not graded yet still is not missing
+        [submission(ada, submitted_late, None)]
+    )
+
+    assert result.students[0].missing_count == 1
+
+
+def test_student_without_submissions():
+    quiz = assignment("Quiz", 10)
+    ada, ben = student("Ada"), student("Ben")
+    result = gradebook([quiz], [ada, ben], [submission(ada, quiz, 9)])
+
+    totals = result.students[1]
+    assert totals.student_id == ben.id
+    assert (totals.submitted_count, totals.graded_count, totals.missing_count) == (0, 0, 1)
+    assert totals.score_total == 0
+    assert totals.points_possible_total == 0
+    assert totals.percent is None
+
+
+def test_assignment_statistics_and_distribution():
+    quiz = assignment("Quiz", 100)
+    roster = [student(name) for name in ("A", "B", "C", "D", "E")]
+    scores = [95, 85, 75, 65, 55]
+    result = gradebook([quiz], roster, [submission(s, quiz, score) for s, score in zip(roster, scores)])
+
+    stats = result.assignments[0]
+    assert (stats.submitted_count, stats.graded_count) == (5, 5)
+    assert stats.mean == 75.0
+    assert stats.median == 75.0
+    assert (stats.p25, stats.p75, stats.p90) == (65.0, 85.0, 91.0)
+    assert (stats.min, stats.max) == (55.0, 95.0)
+    assert stats.std == pytest.approx(14.14, abs=0.01)
+    assert stats.distribution == {"F": 1, "D": 1, "C": 1, "B": 1, "A": 1}
+
+
+def test_empty_class():
+    result = gradebook([], [], [])
+
+    assert (result.student_count, result.assignment_count) == (0, 0)
+    assert result.assignments == [] and result.students == []
+
+
+def test_roster_without_assignments():
+    ada = student("Ada")
+    result = gradebook([], [ada], [])
+
+    assert result.assignment_count == 0
+    totals = result.students[0]
+    assert (totals.submitted_count, totals.missing_count, totals.points_possible_total) == (0, 0, 0)
+    assert totals.percent is None
+
+
+def test_assignments_without_roster():
+    quiz = assignment("Quiz", 10)
+    result = gradebook([quiz], [], [])
+
+    stats = result.assignments[0]
+    assert (stats.submitted_count, stats.graded_count) == (0, 0)
+    assert stats.mean is None and stats.std is None
+    assert sum(stats.distribution.values()) == 0
+
+
+def test_all_zero_weight_class():
+    practice, warmup = assignment("Practice", 0), assignment("Warm-up", 0)
+    ada = student("Ada")
+    result = gradebook([practice, warmup], [ada], [submission(ada, practice, 3), submission(ada, warmup, 5)])
+
+    # Scores are still summarised, but there is nothing to take a percentage of
+    assert [stats.mean for stats in result.assignments] == [3.0, 5.0]
+    assert all(sum(stats.distribution.values()) == 0 for stats in result.assignments)
+    totals = result.students[0]
+    assert totals.score_total == 8
+    assert totals.points_possible_total == 0
+    assert totals.percent is None
@@ -0,0 +1,135 @@
+"""Per-route query budgets, enforced in raise mode (see conftest.py)
+
+Tests that execute SQL take the database fixture (conftest.py), which needs
+DATABASE_URL to reach a database with the migrations applied; the route
+checks also need supabase/seed.sql.
+"""
+
+import asyncio
+import time
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import query_budget as budgets
+from app.database import QueryStats, current_query_stats, get_db
+from app.metrics import QUERY_BUDGET_VIOLATIONS, MetricsMiddleware
+from app.models import Student
+from app.query_budget import QueryBudgetExceeded, budget_violation, query_budget
+
+# Demo student from supabase/seed.sql
+SEED_STUDENT_USER_ID = "00000000-0000-4000-8000-000000009020"
+
+
+def lazy_loading_app(budget: int) -> FastAPI:
+    """One route that lazy loads every student's enrollments: 1 + one query per student"""
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/students/enrollments", dependencies=[query_budget(budget)])
+    async def student_enrollments(db: AsyncSession = Depends(get_db)):
+        students = (await db.execute(select(Student).order_by(Student.id).limit(3))).scalars().all()
+        # Touching student.enrollments lazy loads it, one SELECT per student
+        return {str(student.id): await db.run_sync(lambda _: len(student.enrollments)) for student in students}
+
+    return app
+
+
+def test_raise_mode_is_on_for_tests():
+    assert budgets.QUERY_BUDGET_MODE == "raise"
+    assert budgets.records_statements()
+
+
+def test_violation_names_the_repeated_statement():
+    stats = QueryStats(record_statements=True)
+    stats.budget = 2
+    stats.statements = ["select 1"] + ["select * from enrollments\n  where student_id = $1"] * 3 + ["select 2"]
+    stats.count = len(stats.statements)
+
+    message = budget_violation(stats, "GET", "/things")
+    assert message.startswith("GET /things executed 5 SQL statements (budget 2)")
+    assert "ran 3 times: select * from enrollments where student_id = $1" in message
+
+    stats.budget = 5
+    assert budget_violation(stats, "GET", "/things") is None
+
+
+def test_failed_statement_is_counted(database):
+    """A statement that raises still counts, and leaves no start time on the pooled connection"""
+    async def run():
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            async with database.connect() as conn:
+                with pytest.raises(DBAPIError, match="division by zero"):
+                    await conn.exec_driver_sql("select 1 / 0")
+                assert stats.count == 1
+                assert stats.seconds > 0
+                assert conn.info["query_started"] == []
+
+                await conn.rollback()
+                await conn.exec_driver_sql("select 1")
+                assert stats.count == 2
+                assert conn.info["query_started"] == []
+        finally:
+            current_query_stats.reset(token)
+
+    asyncio.run(run())
+
+
+def test_lazy_load_per_row_exceeds_budget(database):
+    with TestClient(lazy_loading_app(budget=2)) as client:
+        with pytest.raises(QueryBudgetExceeded, match=r"executed 4 SQL statements \(budget 2\); ran 3 times"):
+            client.get("/students/enrollments")
+
+
+def test_within_budget_passes(database):
+    with TestClient(lazy_loading_app(budget=4)) as client:
+        assert client.get("/students/enrollments").status_code == 200
+
+
+def test_log_mode_reports_and_counts(database, monkeypatch, capsys):
+    monkeypatch.setattr(budgets, "QUERY_BUDGET_MODE", "log")
+    labels = {"method": "GET", "route": "/students/enrollments"}
+    before = QUERY_BUDGET_VIOLATIONS._values.get(tuple(labels.values()), 0)
+
+    with TestClient(lazy_loading_app(budget=2)) as client:
+        assert client.get("/students/enrollments").status_code == 200
+
+    out = capsys.readouterr().out
+    assert "Query budget exceeded: GET /students/enrollments executed 4 SQL statements (budget 2)" in out
+    # Statement texts are only recorded in raise mode
+    assert "ran 3 times" not in out
+    assert QUERY_BUDGET_VIOLATIONS._values[tuple(labels.values())] == before + 1
+
+
+def test_student_routes_stay_within_budget(database):
+    """The student read routes, with cold caches, against the seeded demo student"""
+    from app.main import app
+    from app.auth import JWT_SECRET_KEY
+
+    if not JWT_SECRET_KEY:
+        pytest.skip("JWT_SECRET_KEY not set")
+    token = jwt.encode(
+        {"sub": SEED_STUDENT_USER_ID, "exp": int(time.time()) + 600, "user_metadata": {"role": "student"}},
+        JWT_SECRET_KEY,
+        algorithm="HS256"
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(app) as client:
+        if client.get("/student/profile", headers=headers).status_code == 404:
+            pytest.skip("seed data not loaded")
+        for path in (
+            "/student/classes",
+            "/student/assignments",
+            "/student/grades",
+            "/student/grades/summary",
+            "/student/dashboard",
+            "/student/changes"
+        ):
+            # Raises QueryBudgetExceeded if the route goes over its budget
+            assert client.get(path, headers=headers).status_code == 200, path
@@ -0,0 +1,199 @@
+"""Roster sync: the generated merge SQL, and a round trip against the database
+
+The round trip takes the database fixture (conftest.py). Its rows use
+sis_ids unique to the test run and are deleted afterwards. Enrollment
+snapshots deactivate enrollments in every SIS-managed class, so it skips
+on a database that already has some (e.g. a benchmark district).
+"""
+
+import asyncio
+import os
+import uuid
+import asyncpg
+import pytest
+from app.roster import DEACTIVATE_SQL, ENTITIES, INACTIVE_STATUS, check_header, merge_sql, sync_roster
+
+
+def full_header(entity: str) -> list:
+    spec = ENTITIES[entity]
+    return list(spec["columns"]) + list(spec["references"])
+
+
+@pytest.mark.parametrize("entity", list(ENTITIES))
+def test_merge_sql_upserts_on_the_key_and_skips_unchanged_rows(entity):
+    spec = ENTITIES[entity]
+    sql = " ".join(merge_sql(entity, full_header(entity)).split())
+    updates = [column for column in spec["columns"] if column not in spec["key"]]
+    updates += [target for target, _ in spec["references"].values() if target not in spec["key"]]
+
+    assert f"insert into public.{spec['table']} as t" in sql
+    assert f"on conflict ({', '.join(spec['key'])}) do update set" in sql
+    for column in updates:
+        assert f"{column} = excluded.{column}" in sql
+    # Only rows whose values differ are written
+    assert (
+        f"where ({', '.join(f't.{column}' for column in updates)}) "
+        f"is distinct from ({', '.join(f'excluded.{column}' for column in updates)})"
+    ) in sql
+    # References resolve through the parent's sis_id; unknown parents drop the row
+    for index, (column, (target, parent)) in enumerate(spec["references"].items()):
+        assert f"join public.{parent} p{index} on p{index}.sis_id = r.{column}" in sql
+        assert f"p{index}.id as {target}" in sql
+    for column in spec["required"]:
+        assert f"r.{column} is not null" in sql
+    # The last of several rows for one key wins
+    assert "r.line desc" in sql
+
+
+def test_merge_sql_never_overwrites_columns_missing_from_the_file():
+    sql = " ".join(merge_sql("students", ["sis_id", "school_sis_id", "first_name", "last_name"]).split())
+
+    assert "first_name = excluded.first_name" in sql
+    assert "school_id = excluded.school_id" in sql
+    for column in ("email", "student_number", "grade_level", "username"):
+        assert f"{column} = excluded.{column}" not in sql
+
+
+def test_merge_sql_applies_defaults_when_the_file_lacks_the_column():
+    sql = " ".join(merge_sql("enrollments", ["student_sis_id", "class_sis_id"]).split())
+
+    assert "coalesce(r.enrollment_status, 'active') as enrollment_status" in sql
+    assert "on conflict (student_id, class_id) do update set enrollment_status = excluded.enrollment_status" in sql
+
+
+def test_merge_sql_without_updatable_columns_does_nothing_on_conflict(monkeypatch):
+    # An entity that is nothing but its key
+    monkeypatch.setitem(ENTITIES, "enrollments", dict(ENTITIES["enrollments"], columns={}, defaults={}))
+    sql = " ".join(merge_sql("enrollments", ["student_sis_id", "class_sis_id"]).split())
+
+    assert "on conflict (student_id, class_id) do nothing" in sql
+
+
+def test_deactivate_sql_only_touches_sis_managed_classes():
+    sql = " ".join(DEACTIVATE_SQL.split())
+
+    assert f"set enrollment_status = '{INACTIVE_STATUS}'" in sql
+    assert "c.sis_id is not null" in sql
+    assert f"e.enrollment_status is distinct from '{INACTIVE_STATUS}'" in sql
+    assert "not exists ( select 1 from roster_enrollments r" in sql
+
+
+def test_check_header_rejects_unknown_and_missing_columns(tmp_path):
+    path = tmp_path / "students.csv"
+    path.write_text("sis_id,first_name,last_name,nickname\n")
+    with pytest.raises(ValueError, match="unknown columns nickname"):
+        check_header("students", str(path))
+
+    path.write_text("sis_id,first_name\n")
+    with pytest.raises(ValueError, match="missing columns last_name, school_sis_id"):
+        check_header("students", str(path))
+
+
+def write_csv(directory, name: str, lines: list) -> str:
+    path = directory / f"{name}.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_sync_round_trip(database, tmp_path):
+    run = uuid.uuid4().hex[:8]
+    school, teacher, class_ = f"{run}-SCH", f"{run}-T1", f"{run}-C1"
+    ada, ben = f"{run}-S1", f"{run}-S2"
+    database_url = os.environ["DATABASE_URL"]
+
+    async def query(sql: str):
+        conn = await asyncpg.connect(database_url)
+        try:
+            return await conn.fetch(sql)
+        finally:
+            await conn.close()
+
+    if asyncio.run(query("select 1 from public.classes where sis_id is not null limit 1")):
+        pytest.skip("database has SIS-managed classes, whose enrollments the snapshot would deactivate")
+
+    files = {
+        "schools": write_csv(tmp_path, "schools", ["sis_id,name", f"{school},Test School"]),
+        "teachers": write_csv(tmp_path, "teachers", [
+            "sis_id,school_sis_id,first_name,last_name,email", f"{teacher},{school},Tess,Teacher,{run}@teachers.test"
+        ]),
+        "students": write_csv(tmp_path, "students", [
+            "sis_id,school_sis_id,first_name,last_name,grade_level",
+            f"{ada},{school},Ada,Lovelace,5",
+            f"{ben},{school},Ben,Franklin,5"
+        ]),
+        "classes": write_csv(tmp_path, "classes", [
+            "sis_id,school_sis_id,teacher_sis_id,name", f"{class_},{school},{teacher},Period 1"
+        ]),
+        "enrollments": write_csv(tmp_path, "enrollments", [
+            "student_sis_id,class_sis_id", f"{ada},{class_}", f"{ben},{class_}",
+            # Unknown student: skipped
+            f"{run}-NOBODY,{class_}"
+        ])
+    }
+    (tmp_path / "partial").mkdir()
+    partial = {
+        "students": write_csv(tmp_path / "partial", "students", [
+            "sis_id,school_sis_id,first_name,last_name", f"{ada},{school},Augusta,Lovelace"
+        ]),
+        "enrollments": write_csv(tmp_path / "partial", "enrollments", ["student_sis_id,class_sis_id", f"{ada},{class_}"])
+    }
+
+    async def enrollment_statuses():
+        rows = await query(f"""
+            select s.sis_id, e.enrollment_status from public.enrollments e
+            join public.students s on s.id = e.student_id
+            join public.classes c on c.id = e.class_id
+            where c.sis_id = '{class_}' order by s.sis_id
+        """)
+        return {row["sis_id"]: row["enrollment_status"] for row in rows}
+
+    async def run_syncs():
+        first = await sync_roster(files, database_url=database_url)
+        assert {entity: first[entity]["inserted"] for entity in files} == {
+            "schools": 1, "teachers": 1, "students": 2, "classes": 1, "enrollments": 2
+        }
+        assert first["enrollments"]["skipped"] == 1
+        assert await enrollment_statuses() == {ada: "active", ben: "active"}
+
+        # The same files again change nothing
+        again = await sync_roster(files, database_url=database_url)
+        for entity in files:
+            assert again[entity]["inserted"] == again[entity]["updated"] == 0, entity
+        assert again["enrollments"]["deactivated"] == 0
+
+        # A dry run reports what it would do and rolls back
+        dry = await sync_roster(partial, dry_run=True, database_url=database_url)
+        assert dry["enrollments"]["deactivated"] == 1
+        assert await enrollment_statuses() == {ada: "active", ben: "active"}
+
+        # Missing columns are kept; enrollments missing from the snapshot are deactivated
+        changed = await sync_roster(partial, database_url=database_url)
+        assert changed["students"]["updated"] == 1
+        assert changed["enrollments"]["deactivated"] == 1
+        assert await enrollment_statuses() == {ada: "active", ben: INACTIVE_STATUS}
+        [student] = await query(f"select first_name, grade_level from public.students where sis_id = '{ada}'")
+        assert (student["first_name"], student["grade_level"]) == ("Augusta", 5)
+
+        # Listed again (without a status column): reactivated
+        returned = await sync_roster({"enrollments": files["enrollments"]}, database_url=database_url)
+        assert returned["enrollments"]["updated"] == 1
+        assert await enrollment_statuses() == {ada: "active", ben: "active"}
+
+    async def clean_up():
+        conn = await asyncpg.connect(database_url)
+        try:
+            await conn.execute(f"""
+                delete from public.enrollments where class_id in (select id from public.classes where sis_id like '{run}-%');
+                delete from public.deleted_records where class_id in (select id from public.classes where sis_id like '{run}-%');
+                delete from public.classes where sis_id like '{run}-%';
+                delete from public.students where sis_id like '{run}-%';
+                delete from public.teachers where sis_id like '{run}-%';
+                delete from public.schools where sis_id like '{run}-%';
+            """)
+        finally:
+            await conn.close()
+
+    try:
+        asyncio.run(run_syncs())
+    finally:
+        asyncio.run(clean_up())